@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, astuple
+from contextlib import contextmanager
 from enum import Enum
 import numpy as np
 
@@ -13,6 +14,16 @@ class PlayZone:
     dx : int = 30 # from the center of a cell to the center of the next cell
     dz : int = 30 # from the center of a cell to the center of the next cell
 
+    size: int = 3 # number of cells per side
+
+    @classmethod
+    def forSize(cls, size: int, dx: int = 30, dz: int = 30):
+        """
+        Play zone of a size x size board centered on the origin
+        """
+        return cls(xmin=-size * dx / 2, zmin=-size * dz / 2, xmax=size * dx / 2, zmax=size * dz / 2,
+                   dx=dx, dz=dz, size=size)
+
 @dataclass
 class StorageZone:
 
@@ -21,6 +32,14 @@ class StorageZone:
     xmax: int = 75
     zmax: int = 75
 
+    @classmethod
+    def forPlayZone(cls, playZone: PlayZone):
+        """
+        Storage zone of one row of slots around the play zone
+        """
+        return cls(xmin=playZone.xmin - playZone.dx, zmin=playZone.zmin - playZone.dz,
+                   xmax=playZone.xmax + playZone.dx, zmax=playZone.zmax + playZone.dz)
+
 class Results(Enum):
     """
     Enum to define the results of the game
@@ -39,21 +58,67 @@ class CellState(Enum):
     EMPTY = 2
 
 
+def getDefaultWinLength(size: int) -> int:
+    """
+    3 in a row on the 3x3 board, 4 in a row on the larger boards
+    """
+    return min(size, 4)
+
+
+def getWinningLines(size: int, winLength: int) -> np.ndarray:
+    """
+    Flat cell indices of all the winLength long lines of a size x size board,
+    in the order they are checked by Board.getWinner: rows, columns, diagonals, anti-diagonals
+
+    Return:
+    -----------
+    lines           : numpy.ndarray. (nbLines, winLength) flat indices i * size + j
+    """
+    lines = []
+    for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+        for i in range(size):
+            for j in range(size):
+                cells = [(i + k * di, j + k * dj) for k in range(winLength)]
+                if all(0 <= a < size and 0 <= b < size for a, b in cells):
+                    lines.append([a * size + b for a, b in cells])
+    return np.array(lines, dtype=int).reshape(-1, winLength)
+
+WINNING_LINES = getWinningLines(3, 3)
+
+
 class Board:
 
     playZone: PlayZone = PlayZone()
     storageZone: StorageZone = StorageZone()
 
-    def __init__(self, state = None):
+    def __init__(self, state = None, size = None, winLength = None):
+        """
+        Parameters:
+        -----------
+        state           : list[list[int]]. Initial state, the size of the board is given by its shape
+        size            : int. Number of cells per side of an empty board, 3 by default
+        winLength       : int. Number of aligned pawns to win, see getDefaultWinLength
+        """
+        if state is not None:
+            size = len(state)
+        elif size is None:
+            size = 3
+
+        self.size = size
+        self.winLength = getDefaultWinLength(size) if winLength is None else winLength
+        self.lines = WINNING_LINES if (size, self.winLength) == (3, 3) else getWinningLines(size, self.winLength)
+        if size != self.playZone.size:
+            self.playZone = PlayZone.forSize(size, self.playZone.dx, self.playZone.dz)
+            self.storageZone = StorageZone.forPlayZone(self.playZone)
 
         if state is not None:
             self.state = np.array(state)
         else:
-            self.state = np.array([[CellState.EMPTY.value, CellState.EMPTY.value, CellState.EMPTY.value],
-                                    [CellState.EMPTY.value, CellState.EMPTY.value, CellState.EMPTY.value],
-                                    [CellState.EMPTY.value, CellState.EMPTY.value, CellState.EMPTY.value]])
+            self.state = np.full((size, size), CellState.EMPTY.value)
             
-        self.storage = [CellState.EMPTY.value]*12
+        self.storage = [CellState.EMPTY.value]*(4*size)
+        self.storageMask = 0 # bit k is set if the storage slot k is occupied, see setStorage
+        self.moves = [] # undo stack of (i, j, previous value), see push and pop
 
     def isInPlayZone(self, x: float, z: float) -> bool:
         return (self.playZone.xmin <= x <= self.playZone.xmax and
@@ -65,6 +130,25 @@ class Board:
                 self.storageZone.zmin <= z <= self.storageZone.zmax)
     
     
+    def areInPlayZone(self, x, z, margin=0.) -> np.ndarray:
+        """
+        Vectorized isInPlayZone: boolean mask of the positions (arrays x, z) in the play zone,
+        extended by margin (mm) on each side
+        """
+        x, z = np.asarray(x, dtype=np.float64), np.asarray(z, dtype=np.float64)
+        return ((self.playZone.xmin - margin <= x) & (x <= self.playZone.xmax + margin) &
+                (self.playZone.zmin - margin <= z) & (z <= self.playZone.zmax + margin))
+
+    def areInStorageZone(self, x, z) -> np.ndarray:
+        """
+        Vectorized isInStorageZone: boolean mask of the positions (arrays x, z) in the storage zone
+        """
+        x, z = np.asarray(x, dtype=np.float64), np.asarray(z, dtype=np.float64)
+        return (~self.areInPlayZone(x, z) &
+                (self.storageZone.xmin <= x) & (x <= self.storageZone.xmax) &
+                (self.storageZone.zmin <= z) & (z <= self.storageZone.zmax))
+
+
     # Visualization of the board play zone indices vs position coordinates (center of the cell)
     # +-----------------+-----------------+-----------------+
     # |  (0, 0)         |  (0, 1)         |  (0, 2)         |
@@ -90,15 +174,27 @@ class Board:
 
         return (i, j)
     
+    def positionsToCellIndices(self, x, z) -> tuple:
+        """
+        Vectorized positionToCellIndices: arrays of cell indices i and j of the positions (arrays x, z),
+        -1 for the positions outside of the play zone
+        """
+        x, z = np.asarray(x, dtype=np.float64), np.asarray(z, dtype=np.float64)
+        inside = self.areInPlayZone(x, z)
+        i = np.where(inside, np.floor_divide(np.where(inside, x, 0.) + self.playZone.xmax, self.playZone.dx), -1).astype(np.intp)
+        j = np.where(inside, np.floor_divide(np.where(inside, z, 0.) - self.playZone.zmax, -self.playZone.dz), -1).astype(np.intp)
+        return i, j
+    
     def cellIndicesToPosition(self, i: int, j: int) -> tuple:
         """
         Converts cell indices to position coordinates.
         """
-        x = (i - 1) * self.playZone.dx
-        z = (1 - j) * self.playZone.dz
+        c = (self.size - 1) / 2 # index of the center cell
+        x = (i - c) * self.playZone.dx
+        z = (c - j) * self.playZone.dz
         return (x, z)
     
-    # Visualization of the storage zone indices 
+    # Visualization of the storage zone indices (3x3 board, there are size slots per side)
     # |    | 0  | 1  | 2  |    |
     # | 9  |    |    |    | 3  |
     # | 10 |    |    |    | 4  |
@@ -115,39 +211,86 @@ class Board:
             if x < self.playZone.xmin: # zone up
                 i = int((z - self.playZone.zmax) // -self.playZone.dz )
             elif z < self.playZone.zmin: # zone right
-                i = int((x + self.playZone.xmax) //  self.playZone.dx ) + 3
+                i = int((x + self.playZone.xmax) //  self.playZone.dx ) + self.size
             elif x > self.playZone.xmax: # zone down
-                i = int((z - self.playZone.zmax) // -self.playZone.dz ) + 6
+                i = int((z - self.playZone.zmax) // -self.playZone.dz ) + 2 * self.size
             else: # zone left
-                i = int((x + self.playZone.xmax) //  self.playZone.dx ) + 9
+                i = int((x + self.playZone.xmax) //  self.playZone.dx ) + 3 * self.size
             return i
 
         return None
     
+    def positionsToStorageIndices(self, x, z) -> np.ndarray:
+        """
+        Vectorized positionToStorageIndex: array of the storage indices of the positions (arrays x, z),
+        -1 for the positions outside of the storage zone
+        """
+        x, z = np.asarray(x, dtype=np.float64), np.asarray(z, dtype=np.float64)
+        inside = self.areInStorageZone(x, z)
+        x, z = np.where(inside, x, 0.), np.where(inside, z, 0.)
+        rows = np.floor_divide(z - self.playZone.zmax, -self.playZone.dz)
+        columns = np.floor_divide(x + self.playZone.xmax, self.playZone.dx)
+
+        up = x < self.playZone.xmin
+        right = ~up & (z < self.playZone.zmin)
+        down = ~up & ~right & (x > self.playZone.xmax)
+        indices = np.select([up, right, down],
+                            [rows, columns + self.size, rows + 2 * self.size],
+                            columns + 3 * self.size) # zone left
+        return np.where(inside, indices, -1).astype(np.intp)
+    
     def storageIndexToPosition(self, cellIndex: int) -> tuple:
         """
         Converts storage indices to position coordinates.
         """
 
-        if 0 > cellIndex or cellIndex > 11:
+        if 0 > cellIndex or cellIndex >= 4 * self.size:
             return None
 
-        if 0 <= cellIndex <= 2:
-            x = - self.playZone.dx * 2
-            z = (1 - cellIndex % 3) * self.playZone.dz
-        elif 3 <= cellIndex <= 5:
-            x = (cellIndex % 3 - 1) * self.playZone.dx
-            z = - self.playZone.dz * 2
-        elif 6 <= cellIndex <= 8:
-            x = self.playZone.dx * 2
-            z = (1 - cellIndex % 3) * self.playZone.dz
+        c = (self.size - 1) / 2 # index of the center cell
+        side, k = divmod(cellIndex, self.size)
+        if side == 0:
+            x = - self.playZone.dx * (c + 1)
+            z = (c - k) * self.playZone.dz
+        elif side == 1:
+            x = (k - c) * self.playZone.dx
+            z = - self.playZone.dz * (c + 1)
+        elif side == 2:
+            x = self.playZone.dx * (c + 1)
+            z = (c - k) * self.playZone.dz
         else:
-            x = (cellIndex % 3 - 1) * self.playZone.dx
-            z = self.playZone.dz * 2
+            x = (k - c) * self.playZone.dx
+            z = self.playZone.dz * (c + 1)
 
         return (x, z)
 
 
+    def setStorage(self, index: int, value: int):
+        """
+        Set the content of the storage slot index (CellState value) and update storageMask
+        """
+        self.storage[index] = value
+        if value == CellState.EMPTY.value:
+            self.storageMask &= ~(1 << index)
+        else:
+            self.storageMask |= 1 << index
+
+
+    def clearStorage(self):
+        self.storage = [CellState.EMPTY.value]*len(self.storage)
+        self.storageMask = 0
+
+
+    def getStorageDistanceTable(self):
+        """
+        The distance table between the cells and the storage slots of this board geometry, built once
+        """
+        key = (self.size, astuple(self.playZone))
+        if key not in STORAGE_DISTANCE_TABLES:
+            STORAGE_DISTANCE_TABLES[key] = StorageDistanceTable(self)
+        return STORAGE_DISTANCE_TABLES[key]
+
+
     def getNextEmptyStorageIndex(self) -> int:
         """
         Returns the next empty storage index.
@@ -178,6 +321,46 @@ class Board:
             print("\n")
 
 
+    def getCell(self, i: int, j: int) -> int:
+        return self.state[i][j]
+
+
+    def setCell(self, i: int, j: int, value: int):
+        self.state[i][j] = value
+
+
+    def push(self, i: int, j: int, color: int):
+        """
+        Play color in the cell (i, j), the move can be undone with pop
+        """
+        self.moves.append((i, j, self.getCell(i, j)))
+        self.setCell(i, j, color)
+
+
+    def pop(self) -> tuple:
+        """
+        Undo the last move played with push
+
+        Return:
+        -----------
+        (i, j)          : tuple. The cell of the undone move
+        """
+        i, j, value = self.moves.pop()
+        self.setCell(i, j, value)
+        return (i, j)
+
+
+    def load(self, state=None):
+        """
+        Copy state into the board without allocating a new array, empty the board if state is None
+        """
+        if state is None:
+            self.state[:, :] = CellState.EMPTY.value
+        else:
+            self.state[:, :] = state
+        self.moves.clear()
+
+
     def hasWinner(self) -> bool:
         return self.getWinner() != Results.NONE.value
 
@@ -185,37 +368,265 @@ class Board:
     def getWinner(self):
         """
         Check if the board state given has a winner
-        Used in optimalStrategy and easyStrategy to block or to play the best move
+        Used by the strategies to block or to play the best move
 
         Return:
         -----------
         results        : int. The result of the next calculated move
         """
         
-        # Check rows
-        for row in self.state:
-            if (row == CellState.CAT.value).all() or (row == CellState.DOG.value).all():   
-                return row[0] # We have a winner
-
-        # Check columns
-        for colId in range(3):
-            col = np.array(self.state[:, colId])
-            if (col == CellState.CAT.value).all() or (col == CellState.DOG.value).all():
-                return col[0] # We have a winner
-
-        # Check diagonals
-        if self.state[0][0] == self.state[1][1] == self.state[2][2] and self.state[0][0] != CellState.EMPTY.value:
-            return self.state[0][0] # We have a winner
-        if self.state[0][2] == self.state[1][1] == self.state[2][0] and self.state[0][2] != CellState.EMPTY.value: 
-            return self.state[0][2] # We have a winner
+        # Check the lines, in the order rows, columns, diagonals
+        values = self.state.ravel()[self.lines]
+        complete = (values == values[:, :1]).all(axis=1) & (values[:, 0] != CellState.EMPTY.value)
+        if complete.any():
+            return values[np.argmax(complete), 0] # We have a winner
 
         # Game not finished yet
-        for row in self.state:
-            if (row == CellState.EMPTY.value).any():
-                return Results.NONE.value
+        if (self.state == CellState.EMPTY.value).any():
+            return Results.NONE.value
             
         # Then it's a draw
         return Results.DRAW.value
     
     def isEqual(self, state):
-        return (state == self.state).all()
\ No newline at end of file
+        return (state == self.state).all()
+
+
+    @staticmethod
+    def getWinners(states, winLength=None) -> np.ndarray:
+        """
+        Vectorized getWinner over a stack of boards
+
+        Parameters:
+        -----------
+        states          : numpy.ndarray. (N, size, size) board states
+        winLength       : int. Number of aligned pawns to win, see getDefaultWinLength
+
+        Return:
+        -----------
+        results         : numpy.ndarray. (N,) Results values of the boards
+        """
+        states = np.asarray(states)
+        size = states.shape[1]
+        if winLength is None:
+            winLength = getDefaultWinLength(size)
+        winningLines = WINNING_LINES if (size, winLength) == (3, 3) else getWinningLines(size, winLength)
+
+        lines = states.reshape(len(states), size * size)[:, winningLines] # (N, nbLines, winLength)
+        complete = ((lines == lines[:, :, :1]).all(axis=2) &
+                    (lines[:, :, 0] != CellState.EMPTY.value))
+
+        firstLine = np.argmax(complete, axis=1)
+        winners = lines[np.arange(len(states)), firstLine, 0]
+
+        inProgress = (states == CellState.EMPTY.value).any(axis=(1, 2))
+        results = np.where(inProgress, Results.NONE.value, Results.DRAW.value)
+        return np.where(complete.any(axis=1), winners, results)
+
+
+# Bit index of the cell (i, j) in the 9-bit masks of BitBoard
+#  0 | 1 | 2
+#  3 | 4 | 5
+#  6 | 7 | 8
+def getCellBit(i: int, j: int) -> int:
+    return 1 << (3 * i + j)
+
+FULL_MASK = 0b111111111
+WINNING_MASKS = tuple(int(sum(1 << k for k in line)) for line in WINNING_LINES)
+CELL_BITS = np.left_shift(1, np.arange(9)) # bits of the cells in the order of the flattened state
+
+
+class BitBoard(Board):
+    """
+    Board backend storing each side as a 9-bit integer mask, for the 3x3 board only.
+    Wins are checked against the eight precomputed line masks of WINNING_MASKS.
+
+    The public API is the same as Board, except that `state` is a read-only array built from the masks
+    when it is read: the moves go through play and undo (or push and pop), and a whole state through load.
+    """
+
+    def __init__(self, state = None, size = None, winLength = None):
+        if (state is not None and len(state) != 3) or size not in (None, 3) or winLength not in (None, 3):
+            raise ValueError("BitBoard only supports the 3x3 board with 3 in a row")
+        self.masks = [0, 0] # [dogs, cats]
+        self.cachedState = (None, None) # (masks, state) of the last state read
+        super().__init__(state)
+
+
+    @classmethod
+    def fromMasks(cls, dogs: int, cats: int):
+        """
+        Create a board directly from the two masks, without going through a state array
+        """
+        board = cls()
+        board.masks = [dogs, cats]
+        return board
+
+
+    @property
+    def state(self):
+        masks, state = self.cachedState
+        if masks != self.masks:
+            dogs, cats = self.masks
+            state = np.full(9, CellState.EMPTY.value)
+            state[(dogs & CELL_BITS) != 0] = CellState.DOG.value
+            state[(cats & CELL_BITS) != 0] = CellState.CAT.value
+            state = state.reshape(3, 3)
+            state.flags.writeable = False
+            self.cachedState = (list(self.masks), state)
+        return state
+
+
+    @state.setter
+    def state(self, state):
+        state = np.asarray(state).ravel()
+        self.masks = [int(CELL_BITS[state == CellState.DOG.value].sum()),
+                      int(CELL_BITS[state == CellState.CAT.value].sum())]
+
+
+    def getCell(self, i: int, j: int) -> int:
+        bit = getCellBit(i, j)
+        for color in (CellState.DOG.value, CellState.CAT.value):
+            if self.masks[color] & bit:
+                return color
+        return CellState.EMPTY.value
+
+
+    def setCell(self, i: int, j: int, value: int):
+        """
+        Set the cell (i, j) to value (CellState value)
+        """
+        bit = getCellBit(i, j)
+        self.masks[CellState.DOG.value] &= ~bit
+        self.masks[CellState.CAT.value] &= ~bit
+        if value != CellState.EMPTY.value:
+            self.masks[value] |= bit
+
+
+    def play(self, i: int, j: int, color: int):
+        """
+        Play color in the empty cell (i, j) by setting its bit, the move can be undone with undo
+        """
+        bit = 1 << (3 * i + j)
+        self.masks[color] |= bit
+        self.moves.append((i, j, bit, color))
+
+
+    def undo(self) -> tuple:
+        """
+        Undo the last move played with play by clearing its bit
+
+        Return:
+        -----------
+        (i, j)          : tuple. The cell of the undone move
+        """
+        i, j, bit, color = self.moves.pop()
+        self.masks[color] &= ~bit
+        return (i, j)
+
+
+    # The moves of the strategies are always played in empty cells
+    push = play
+    pop = undo
+
+
+    def getWinner(self):
+        """
+        Check if the board state given has a winner
+
+        Return:
+        -----------
+        results        : int. Results value of the board
+        """
+        dogs, cats = self.masks
+        for mask in WINNING_MASKS:
+            if dogs & mask == mask:
+                return Results.DOG.value
+            if cats & mask == mask:
+                return Results.CAT.value
+
+        if dogs | cats != FULL_MASK:
+            return Results.NONE.value
+
+        return Results.DRAW.value
+
+
+    def load(self, state=None):
+        if state is None:
+            self.masks = [0, 0]
+        else:
+            self.state = state
+        self.moves.clear()
+
+
+    def isEqual(self, state):
+        return BitBoard(state).masks == self.masks
+
+
+class StorageDistanceTable:
+    """
+    Distances from the center of each cell to the center of each storage slot,
+    with the slots sorted by distance for each cell. The positions are fixed for a given play zone.
+    """
+
+    def __init__(self, board: Board):
+        self.size = board.size
+        cells = np.array([board.cellIndicesToPosition(i, j) for i in range(board.size) for j in range(board.size)])
+        slots = np.array([board.storageIndexToPosition(k) for k in range(4 * board.size)])
+
+        self.slotPositions = [tuple(slot) for slot in slots]
+        self.distances = np.linalg.norm(cells[:, np.newaxis] - slots[np.newaxis], axis=2) # (nbCells, nbSlots)
+        self.sortedSlots = [[int(k) for k in order] for order in np.argsort(self.distances, axis=1, kind="stable")]
+
+
+    def getNearestEmptySlot(self, i: int, j: int, storageMask: int) -> int:
+        """
+        The nearest storage slot of the cell (i, j) which is not set in storageMask, None if all are occupied
+        """
+        for k in self.sortedSlots[i * self.size + j]:
+            if not storageMask >> k & 1:
+                return k
+        return None
+
+
+    def getDistance(self, i: int, j: int, k: int) -> float:
+        return self.distances[i * self.size + j, k]
+
+
+STORAGE_DISTANCE_TABLES = {} # (size, play zone) -> StorageDistanceTable
+
+
+class BoardPool:
+    """
+    Pool of reusable scratch boards, to avoid allocating boards in the strategies and detection loops
+    """
+
+    def __init__(self, boardClass=Board):
+        self.boardClass = boardClass
+        self.boards = {} # size -> free boards
+
+
+    def acquire(self, state=None, size=3) -> Board:
+        """
+        Get a scratch board loaded with state (or an empty board of the given size if state is None)
+        The board must be given back with release
+        """
+        if state is not None:
+            size = len(state)
+        boards = self.boards.setdefault(size, [])
+        board = boards.pop() if boards else self.boardClass(size=size)
+        board.load(state)
+        return board
+
+
+    def release(self, board: Board):
+        self.boards.setdefault(board.size, []).append(board)
+
+
+    @contextmanager
+    def scratch(self, state=None, size=3):
+        board = self.acquire(state, size)
+        try:
+            yield board
+        finally:
+            self.release(board)
\ No newline at end of file
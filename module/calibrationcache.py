@@ -0,0 +1,173 @@
+import json
+import os
+import numpy as np
+
+from dataclasses import dataclass, field
+
+from module.homography import Homography
+from module.projection import CameraProjection
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+# The calibration cache keeps what is derived from the calibration of the camera: the projection, the homography
+# of the board plane and the slot rasters. It is saved with the depth and the color images seen at that time,
+# a frame of the next startup is compared to them to check that the camera has not moved. The markers are not
+# used: they are on the gripper, which moves independently of the camera.
+# Bump CACHE_VERSION when the content of the cache changes, older caches are then ignored.
+
+CALIBRATION_CACHE_PATH = os.path.join(os.path.dirname(__file__), "calibration_cache.npz")
+CACHE_VERSION = 2
+DEPTH_FACTOR = 8 # Subsampling of the reference depth image
+IMAGE_FACTOR = 4 # Subsampling of the reference color image
+MAX_SHIFT = 4    # Largest shift between the reference and the startup images searched by validate, subsampled pixels
+
+
+def getDepthSignature(depth) -> np.ndarray:
+    """
+    Subsampled depth image, compared between the calibration and the startup
+    """
+    return np.asarray(depth)[::DEPTH_FACTOR, ::DEPTH_FACTOR].astype(np.float32)
+
+
+def getImageSignature(color) -> np.ndarray:
+    """
+    Subsampled grayscale image, normalized against the changes of lighting, compared between the calibration
+    and the startup
+    """
+    gray = np.asarray(color)[::IMAGE_FACTOR, ::IMAGE_FACTOR].mean(axis=2, dtype=np.float32)
+    return (gray - np.median(gray)) / (gray.std() + 1e-6)
+
+
+def getImageShift(reference, image, maxShift=MAX_SHIFT) -> tuple:
+    """
+    Shift of image against reference which best aligns the static parts of the scene
+
+    Return:
+    -----------
+    shift           : tuple. The (dy, dx) best shift, in pixels of the signatures
+    differences     : dict. (dy, dx) -> median absolute difference of the two images where they overlap
+    """
+    height, width = reference.shape
+    differences = {}
+    for dy in range(-maxShift, maxShift + 1):
+        for dx in range(-maxShift, maxShift + 1):
+            shifted = image[max(0, dy):height + min(0, dy), max(0, dx):width + min(0, dx)]
+            original = reference[max(0, -dy):height + min(0, -dy), max(0, -dx):width + min(0, -dx)]
+            differences[(dy, dx)] = float(np.median(np.abs(shifted - original)))
+    return min(differences, key=differences.get), differences
+
+
+def getRasterKey(key) -> tuple:
+    """
+    Rebuild the raster key (size, playZone, storageZone) from its JSON lists
+    """
+    return tuple(tuple(item) if isinstance(item, list) else item for item in key)
+
+
+@dataclass
+class CalibrationCache:
+    """
+    Calibration-derived data of DHResults, with the reference depth and color images to validate them
+    """
+    projection: CameraProjection
+    image: np.ndarray               # Subsampled color image at the calibration, see getImageSignature
+    depth: np.ndarray               # Subsampled depth image at the calibration, see getDepthSignature
+    homography: Homography = None   # Homography of the board plane, None if the plane was not calibrated
+    roi: tuple = None               # x1, y1, x2, y2 of the region of interest of the rasters
+    rasters: dict = field(default_factory=dict) # board geometry key -> (size, slots) of the SlotRaster
+
+
+    def save(self, path=CALIBRATION_CACHE_PATH):
+        """
+        Save the cache in a single npz file, the rasters are stored as arrays and their keys in the header
+        """
+        keys = list(self.rasters.keys())
+        header = {"version": CACHE_VERSION,
+                  "projection": self.projection.toDict(),
+                  "homography": self.homography.toDict() if self.homography is not None else None,
+                  "roi": list(self.roi) if self.roi is not None else None,
+                  "rasters": [{"key": key, "size": self.rasters[key][0]} for key in keys]}
+        arrays = {f"raster_{i}": self.rasters[key][1] for i, key in enumerate(keys)}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = path + ".tmp.npz"
+        np.savez(temporary, header=np.array(json.dumps(header, default=float)),
+                 image=self.image, depth=self.depth, **arrays)
+        os.replace(temporary, path)
+        logger.info(f"Calibration cache saved in {path}")
+
+
+    @classmethod
+    def load(cls, path=CALIBRATION_CACHE_PATH):
+        """
+        Load the cache of path
+
+        Return:
+        -----------
+        cache           : CalibrationCache. None if there is no cache, or if it is of another version or unreadable
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                header = json.loads(str(data["header"]))
+                if header.get("version") != CACHE_VERSION:
+                    logger.info(f"Ignoring the calibration cache {path} of version {header.get('version')}.")
+                    return None
+                homography = header["homography"]
+                rasters = {getRasterKey(raster["key"]): (raster["size"], data[f"raster_{i}"])
+                           for i, raster in enumerate(header["rasters"])}
+                return cls(projection=CameraProjection.fromDict(header["projection"]),
+                           image=data["image"],
+                           depth=data["depth"],
+                           homography=Homography.fromDict(homography) if homography is not None else None,
+                           roi=tuple(header["roi"]) if header["roi"] is not None else None,
+                           rasters=rasters)
+        except Exception as e:
+            logger.error(f"Could not read the calibration cache {path}: {e}")
+            return None
+
+
+    def validate(self, color, depth, depthTolerance=10., shiftTolerance=0.1) -> bool:
+        """
+        Check on one frame that the camera has not moved since the calibration
+
+        Parameters:
+        -----------
+        color           : numpy.ndarray. The color image of the frame
+        depth           : numpy.ndarray. The depth image of the frame
+        depthTolerance  : float. Maximum median difference between the reference and the frame depths
+        shiftTolerance  : float. Maximum gain of a shifted image over the unshifted one, in median absolute
+                          difference of the normalized images, see getImageShift
+
+        Return:
+        -----------
+        True if the depth and the color images match the calibration
+        """
+        if color is None or depth is None:
+            return False
+
+        # The medians are not sensitive to the pawns, the hands and the robot which moved since the calibration
+        signature = getDepthSignature(depth)
+        if signature.shape != self.depth.shape:
+            return False
+        valid = (signature > 0) & (self.depth > 0)
+        if not valid.any():
+            return False
+        difference = np.median(np.abs(signature[valid] - self.depth[valid]))
+        if difference > depthTolerance:
+            logger.info(f"Calibration cache: the depth changed by {difference:.1f}.")
+            return False
+
+        # A move parallel to the table barely changes the depth, but shifts the static parts of the image
+        image = getImageSignature(color)
+        if image.shape != self.image.shape:
+            return False
+        shift, differences = getImageShift(self.image, image)
+        if differences[(0, 0)] - differences[shift] > shiftTolerance:
+            logger.info(f"Calibration cache: the image moved by {shift} pixels (x{IMAGE_FACTOR}).")
+            return False
+        return True
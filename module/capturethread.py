@@ -0,0 +1,158 @@
+import threading
+import time
+import numpy as np
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+@dataclass(frozen=True)
+class CapturedFrame:
+    """
+    Frame published by the capture thread. The arrays are read-only copies owned by the frame.
+    """
+    index: int              # Number of the frame since the start of the capture
+    timestamp: float        # time.perf_counter() when the frame was received
+    color: np.ndarray       # Color image, None if it was not received
+    depth: np.ndarray       # Depth image, None if it was not received
+    markers: tuple          # Positions of the tracked markers
+
+
+def getReadOnlyCopy(array):
+    if array is None:
+        return None
+    array = np.array(array)
+    array.flags.writeable = False
+    return array
+
+
+class CaptureThread(threading.Thread):
+    """
+    Thread that owns the camera: it polls it and publishes timestamped color, depth and marker data.
+
+    The frames go through a double buffer: the thread builds the next frame in the back slot, then
+    swaps it with the front slot. Readers always get the latest complete frame without waiting for
+    the camera, older frames are dropped (latest frame wins). A frame is only published when the
+    camera delivered a new one.
+
+    In lockstep mode (e.g. to replay a session deterministically, see ReplayCamera), the camera is only
+    polled when a frame is requested with requestFrame: every request gives exactly the next frame.
+    The thread finishes when the camera reports the end of its frames (isFinished, if it has one).
+    """
+
+    def __init__(self, camera, period=0., lockstep=False):
+        """
+        Parameters:
+        -----------
+        camera          : EmioCamera. An opened camera, with update(), frame, depth_frame and trackers_pos
+        period          : float. Minimum time between two polls of the camera in seconds
+        lockstep        : bool. Poll the camera once per requestFrame instead of continuously
+        """
+        threading.Thread.__init__(self, name="capture", daemon=True)
+        self.camera = camera
+        self.period = period
+        self.lockstep = lockstep
+
+        self.buffers = [None, None] # Front and back slots of the double buffer
+        self.front = 0
+        self.condition = threading.Condition()
+        self.cameraLock = threading.Lock() # Held while the camera is polled, see paused
+        self.stopped = threading.Event()
+        self.finished = threading.Event() # Set when the camera has no more frames
+        self.nbRequests = 0 # Frames requested in lockstep mode
+        self.nbFrames = 0
+        self.lastFrame = None # Last color image of the camera which was published
+
+
+    def run(self):
+        while not self.stopped.is_set():
+            if self.lockstep:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.nbRequests > self.nbFrames or self.stopped.is_set(), timeout=0.1)
+                    if self.nbRequests <= self.nbFrames:
+                        continue
+
+            t0 = time.perf_counter()
+            with self.cameraLock:
+                try:
+                    self.camera.update()
+                    if self.camera.frame is not None and self.camera.frame is not self.lastFrame:
+                        self.lastFrame = self.camera.frame
+                        self.publish(self.camera.frame, self.camera.depth_frame, self.camera.trackers_pos)
+                except Exception as e:
+                    logger.error(f"Error while capturing a frame: {e}")
+
+            if hasattr(self.camera, "isFinished") and self.camera.isFinished():
+                logger.info("The camera has no more frames, the capture is finished.")
+                with self.condition:
+                    self.finished.set()
+                    self.condition.notify_all()
+                return
+
+            elapsed = time.perf_counter() - t0
+            self.stopped.wait(max(self.period - elapsed, 0.001))
+
+
+    def requestFrame(self):
+        """
+        In lockstep mode, ask the thread to poll the camera for the next frame
+        """
+        with self.condition:
+            self.nbRequests = max(self.nbRequests, self.nbFrames) + 1
+            self.condition.notify_all()
+
+
+    def publish(self, color, depth, markers):
+        """
+        Write a new frame in the back slot and swap it to the front
+        """
+        back = 1 - self.front
+        self.buffers[back] = CapturedFrame(index=self.nbFrames,
+                                           timestamp=time.perf_counter(),
+                                           color=getReadOnlyCopy(color),
+                                           depth=getReadOnlyCopy(depth),
+                                           markers=tuple(tuple(position) for position in (markers if markers is not None else [])))
+        with self.condition:
+            self.front = back
+            self.nbFrames += 1
+            self.condition.notify_all()
+
+
+    def getLatestFrame(self) -> CapturedFrame:
+        """
+        Return the latest frame without blocking, None if no frame was captured yet
+        """
+        return self.buffers[self.front]
+
+
+    def waitForFrame(self, afterIndex=-1, timeout=1.) -> CapturedFrame:
+        """
+        Wait for a frame more recent than afterIndex
+
+        Return:
+        -----------
+        frame           : CapturedFrame. The latest frame, it may be older than afterIndex after the timeout
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.nbFrames > afterIndex + 1 or self.finished.is_set(), timeout=timeout)
+        return self.getLatestFrame()
+
+
+    @contextmanager
+    def paused(self):
+        """
+        Give an exclusive access to the camera, e.g. for the calibration
+        """
+        with self.cameraLock:
+            yield self.camera
+
+
+    def stop(self):
+        with self.condition:
+            self.stopped.set()
+            self.condition.notify_all()
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,127 @@
+import time
+import numpy as np
+
+
+class DetectionConsensus:
+    """
+    Temporal consensus of the detections over a sliding window of frames.
+
+    A ring buffer keeps, for the last nbFrames frames, the histogram of the detected classes and
+    the centers of the boxes of the tracked classes. The scene is stable when every frame of the
+    window has the same histogram and every tracked box of the newest frame is associated with a
+    box of the same class, less than matchDistance pixels away, in every other frame.
+    The history is kept between the calls of DHResults.update, frames older than maxAge are ignored.
+    """
+
+    def __init__(self, nbClasses: int, trackedClasses: tuple, nbFrames=3, matchDistance=15., maxAge=5., maxBoxes=64):
+        """
+        Parameters:
+        -----------
+        nbClasses       : int. Number of classes of the detector
+        trackedClasses  : tuple. Classes which must agree between the frames (e.g. the pawns)
+        nbFrames        : int. Number of agreeing frames for a stable scene
+        matchDistance   : float. Maximum distance in pixels between two associated boxes
+        maxAge          : float. Frames older than maxAge seconds are ignored
+        maxBoxes        : int. Initial number of boxes per frame of the buffers
+        """
+        self.nbClasses = nbClasses
+        self.trackedClasses = np.array(trackedClasses)
+        self.nbFrames = nbFrames
+        self.matchDistance = matchDistance
+        self.maxAge = maxAge
+
+        self.histograms = np.zeros((nbFrames, nbClasses), dtype=np.int64)
+        self.timestamps = np.full(nbFrames, -np.inf)
+        self.counts = np.zeros(nbFrames, dtype=np.intp)
+        self.allocate(maxBoxes)
+        self.head = 0 # Slot of the next frame
+
+
+    def allocate(self, maxBoxes):
+        self.maxBoxes = maxBoxes
+        self.classes = np.full((self.nbFrames, maxBoxes), -1, dtype=np.int64)
+        self.centers = np.zeros((self.nbFrames, maxBoxes, 2), dtype=np.float64)
+
+
+    def clear(self):
+        self.timestamps[:] = -np.inf
+        self.head = 0
+
+
+    def push(self, cls, xydwh, timestamp=None) -> bool:
+        """
+        Add the detections of a new frame to the window
+
+        Parameters:
+        -----------
+        cls             : numpy.ndarray. (n,) classes of the boxes
+        xydwh           : numpy.ndarray. (n, 5) boxes, the centers are the first two columns
+        timestamp       : float. time.perf_counter() of the frame, now by default
+
+        Return:
+        -----------
+        stable          : bool. True if the window agrees, see isStable
+        """
+        cls = np.asarray(cls, dtype=np.int64)
+        tracked = np.isin(cls, self.trackedClasses)
+        n = int(tracked.sum())
+        if n > self.maxBoxes:
+            # Grow the buffers, the previous frames are kept
+            classes, centers = self.classes, self.centers
+            self.allocate(max(n, 2 * self.maxBoxes))
+            self.classes[:, :classes.shape[1]] = classes
+            self.centers[:, :centers.shape[1]] = centers
+
+        slot = self.head
+        self.histograms[slot] = np.bincount(cls, minlength=self.nbClasses)[:self.nbClasses]
+        self.timestamps[slot] = time.perf_counter() if timestamp is None else timestamp
+        self.counts[slot] = n
+        self.classes[slot, :n] = cls[tracked]
+        self.classes[slot, n:] = -1
+        if n:
+            self.centers[slot, :n] = np.asarray(xydwh)[tracked, 0:2]
+        self.head = (slot + 1) % self.nbFrames
+
+        return self.isStable(self.timestamps[slot])
+
+
+    def refresh(self, timestamp=None) -> bool:
+        """
+        The newest frame is seen again (e.g. the prediction was skipped because the image did not change):
+        its timestamp is refreshed, but it does not count as a new agreeing frame
+
+        Return:
+        -----------
+        stable          : bool. True if the window agrees, see isStable
+        """
+        newest = (self.head - 1) % self.nbFrames
+        if np.isfinite(self.timestamps[newest]):
+            self.timestamps[newest] = time.perf_counter() if timestamp is None else timestamp
+        return self.isStable(self.timestamps[newest])
+
+
+    def isStable(self, now=None) -> bool:
+        """
+        Return True if the last nbFrames frames, not older than maxAge, agree
+        """
+        if not np.isfinite(self.timestamps).all():
+            return False # The window is not full yet
+        newest = (self.head - 1) % self.nbFrames
+        if now is None:
+            now = self.timestamps[newest]
+        if (now - self.timestamps > self.maxAge).any():
+            return False
+
+        if (self.histograms != self.histograms[newest]).any():
+            return False
+
+        n = self.counts[newest]
+        if n == 0:
+            return True
+
+        # Distance between each tracked box of the newest frame and each box of the other frames
+        centers = self.centers[newest, :n]
+        distances = np.linalg.norm(centers[None, :, None, :] - self.centers[:, None, :, :], axis=-1)
+        sameClass = self.classes[newest, :n][None, :, None] == self.classes[:, None, :]
+        matched = (sameClass & (distances <= self.matchDistance)).any(axis=2)
+        return bool(matched.all())
@@ -0,0 +1,148 @@
+import numpy as np
+
+from enum import Enum
+
+
+class DepthEstimators(Enum):
+    """
+    Enum to define the robust estimators of the depth of a bounding box
+    """
+    MEDIAN = 'median'
+    TRIMMED_MEAN = 'trimmed_mean'
+    CENTER_PERCENTILE = 'center_percentile'
+
+
+class DepthEstimator:
+    """
+    Robust depth of all the bounding boxes of a frame in one pass.
+
+    Each box is sampled on a fixed gridSize x gridSize grid with fancy indexing, the invalid
+    depths (0) are ignored. The samples of all the boxes are sorted at once, and the estimator
+    is read from the sorted rows. The scratch buffers are kept between frames and only grow
+    when a frame has more boxes than their capacity.
+    """
+
+    def __init__(self, estimator=DepthEstimators.MEDIAN, gridSize=16, trim=0.2, centerFraction=0.5, percentile=50.):
+        """
+        Parameters:
+        -----------
+        estimator       : DepthEstimators. The estimator of the depth
+        gridSize        : int. Number of samples per row and column of a box
+        trim            : float. Fraction of the samples removed at each end by the trimmed mean
+        centerFraction  : float. Fraction of the width and height of the box sampled by the center percentile
+        percentile      : float. Percentile of the center patch used by the center percentile
+        """
+        self.estimator = DepthEstimators(estimator)
+        self.gridSize = gridSize
+        self.trim = trim
+        self.centerFraction = centerFraction
+        self.percentile = percentile
+
+        self.steps = (np.arange(gridSize) + 0.5) / gridSize # Position of the samples in a box, in [0, 1)
+        self.allocate(64)
+
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        nbSamples = self.gridSize * self.gridSize
+        self.samples = np.empty((capacity, nbSamples), dtype=np.float64)
+        self.sums = np.empty((capacity, nbSamples + 1), dtype=np.float64)
+        self.depths = np.empty(capacity, dtype=np.float64)
+
+
+    def sample(self, depthImage, bounds):
+        """
+        Sample the depth image on the grid of each box
+
+        Parameters:
+        -----------
+        depthImage      : numpy.ndarray. The depth image
+        bounds          : numpy.ndarray. (n, 4) boxes x1, y1, x2, y2 in pixels, x2 and y2 excluded
+
+        Return:
+        -----------
+        samples         : numpy.ndarray. (n, gridSize * gridSize) sorted samples, NaN for the invalid depths
+        counts          : numpy.ndarray. (n,) number of valid samples of each box
+        """
+        n = len(bounds)
+        if n > self.capacity:
+            self.allocate(max(n, 2 * self.capacity))
+
+        bounds = np.asarray(bounds, dtype=np.float64)
+        x1, y1, x2, y2 = bounds[:, 0], bounds[:, 1], bounds[:, 2], bounds[:, 3]
+        if self.estimator == DepthEstimators.CENTER_PERCENTILE:
+            margin = (1. - self.centerFraction) / 2
+            x1, x2 = x1 + margin * (x2 - x1), x2 - margin * (x2 - x1)
+            y1, y2 = y1 + margin * (y2 - y1), y2 - margin * (y2 - y1)
+
+        height, width = depthImage.shape[:2]
+        columns = np.clip((x1[:, None] + self.steps * (x2 - x1)[:, None]).astype(np.intp), 0, width - 1)
+        rows = np.clip((y1[:, None] + self.steps * (y2 - y1)[:, None]).astype(np.intp), 0, height - 1)
+
+        samples = self.samples[:n]
+        samples.reshape(n, self.gridSize, self.gridSize)[:] = depthImage[rows[:, :, None], columns[:, None, :]]
+        samples[samples <= 0] = np.nan
+        samples[(x2 <= x1) | (y2 <= y1)] = np.nan # Empty boxes
+        samples.sort(axis=1) # NaN are sorted last
+
+        counts = self.samples.shape[1] - np.isnan(samples).sum(axis=1)
+        return samples, counts
+
+
+    def getPercentile(self, samples, counts, percentile):
+        """
+        Percentile of the valid samples of each row, with the linear interpolation of np.percentile
+        """
+        position = percentile / 100. * np.maximum(counts - 1, 0)
+        lower = np.floor(position).astype(np.intp)
+        upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+        low = np.take_along_axis(samples, lower[:, None], axis=1)[:, 0]
+        high = np.take_along_axis(samples, upper[:, None], axis=1)[:, 0]
+        return low + (high - low) * (position - lower)
+
+
+    def getTrimmedMean(self, samples, counts):
+        """
+        Mean of the valid samples of each row, without the trim fraction of the lowest and highest samples
+        """
+        n = len(samples)
+        sums = self.sums[:n]
+        sums[:, 0] = 0.
+        np.cumsum(np.nan_to_num(samples, nan=0.), axis=1, out=sums[:, 1:])
+
+        cut = np.floor(self.trim * counts).astype(np.intp)
+        kept = counts - 2 * cut
+        total = np.take_along_axis(sums, (counts - cut)[:, None], axis=1)[:, 0] - np.take_along_axis(sums, cut[:, None], axis=1)[:, 0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total / kept
+
+
+    def estimate(self, depthImage, bounds, out=None) -> np.ndarray:
+        """
+        Estimate the depth of each box
+
+        Parameters:
+        -----------
+        depthImage      : numpy.ndarray. The depth image
+        bounds          : numpy.ndarray. (n, 4) boxes x1, y1, x2, y2 in pixels, x2 and y2 excluded
+        out             : numpy.ndarray. Optional (n,) array where to write the depths
+
+        Return:
+        -----------
+        depths          : numpy.ndarray. (n,) depth of each box, NaN if the box has no valid depth
+        """
+        n = len(bounds)
+        if out is None:
+            out = self.depths[:n] if n <= self.capacity else np.empty(n)
+        if n == 0:
+            return out
+
+        samples, counts = self.sample(depthImage, bounds)
+        if self.estimator == DepthEstimators.TRIMMED_MEAN:
+            out[:] = self.getTrimmedMean(samples, counts)
+        elif self.estimator == DepthEstimators.CENTER_PERCENTILE:
+            out[:] = self.getPercentile(samples, counts, self.percentile)
+        else:
+            out[:] = self.getPercentile(samples, counts, 50.)
+        out[counts == 0] = np.nan
+        return out
@@ -0,0 +1,148 @@
+import argparse
+import glob
+import os
+import numpy as np
+import cv2 as cv
+
+from dataclasses import asdict
+
+from module.detectors import DetectorConfig, RegionOfInterest, DETECTOR_CONFIG_PATH, benchmarkDetector, createDetector
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+# Benchmark of the detector configurations on recorded frames, the best one is saved and loaded by DHResults:
+#   python -m module.detectorbenchmark "yolov4/picture_for_database/data_base/*/*.jpg"
+# The agreement of a configuration is measured against the detections of the reference configuration
+# (the default one: DarkHelp with tiles), the fastest configuration that agrees enough is selected.
+
+DATABASE_PATTERN = os.path.join(os.path.dirname(__file__), '..', 'yolov4', 'picture_for_database', 'data_base', '*', '*.jpg')
+
+
+def getConfigurations(thresholds=(0.25, 0.35, 0.45), detectors=("darkhelp", "opencv")) -> list:
+    """
+    Configurations to compare: with and without tiles for DarkHelp, for each threshold
+    """
+    configurations = []
+    for threshold in thresholds:
+        if "darkhelp" in detectors:
+            configurations.append(DetectorConfig(detector="darkhelp", threshold=threshold, tiles=True, combineTiles=True))
+            configurations.append(DetectorConfig(detector="darkhelp", threshold=threshold, tiles=True, combineTiles=False))
+            configurations.append(DetectorConfig(detector="darkhelp", threshold=threshold, tiles=False, combineTiles=False))
+        if "opencv" in detectors:
+            configurations.append(DetectorConfig(detector="opencv", threshold=threshold, tiles=False, combineTiles=False))
+    return configurations
+
+
+def getDetectionAgreement(reference: tuple, detections: tuple, matchDistance=15.) -> float:
+    """
+    F1 score of the detections against the reference detections of the same image.
+    A detection matches a reference box of the same class if their centers are less than matchDistance pixels apart,
+    each reference box is matched at most once (greedy, closest pairs first).
+
+    Parameters:
+    -----------
+    reference       : tuple. cls, conf and rect (x, y, w, h) of the reference detections
+    detections      : tuple. cls, conf and rect of the detections to compare
+    """
+    referenceCls, _, referenceRect = reference
+    cls, _, rect = detections
+    if len(referenceCls) == 0 and len(cls) == 0:
+        return 1.
+    if len(referenceCls) == 0 or len(cls) == 0:
+        return 0.
+
+    referenceCenters = referenceRect[:, 0:2] + referenceRect[:, 2:4] / 2
+    centers = rect[:, 0:2] + rect[:, 2:4] / 2
+    distances = np.linalg.norm(referenceCenters[:, None] - centers[None, :], axis=2)
+    distances[referenceCls[:, None] != cls[None, :]] = np.inf
+
+    nbMatches = 0
+    for index in np.argsort(distances, axis=None):
+        r, d = np.unravel_index(index, distances.shape)
+        if distances[r, d] > matchDistance:
+            break
+        nbMatches += 1
+        distances[r, :] = np.inf
+        distances[:, d] = np.inf
+
+    return 2. * nbMatches / (len(referenceCls) + len(cls))
+
+
+def benchmarkConfiguration(config: DetectorConfig, images: list, repeats=1, batchSize=1) -> tuple:
+    """
+    Run the configuration on the images, see benchmarkDetector
+
+    Return:
+    -----------
+    detections      : list[tuple]. The detections of each image
+    latency         : float. Mean prediction time per image in seconds
+    """
+    detector = createDetector(config)
+    try:
+        latency, detections = benchmarkDetector(detector, images, batchSize, repeats)
+    finally:
+        detector.close()
+    return detections, latency
+
+
+def selectConfiguration(results: list, minAgreement=0.95) -> dict:
+    """
+    Fastest configuration whose mean agreement is at least minAgreement, the most agreeing one otherwise
+    """
+    agreeing = [result for result in results if result["agreement"] >= minAgreement]
+    if agreeing:
+        return min(agreeing, key=lambda result: result["latency_ms"])
+    return max(results, key=lambda result: result["agreement"])
+
+
+def runBenchmark(paths: list, configurations: list, reference=None, repeats=1, minAgreement=0.95, batchSize=1) -> tuple:
+    """
+    Benchmark the configurations on the images of paths, masked to the region of interest as in DHResults
+
+    Return:
+    -----------
+    best            : DetectorConfig. The selected configuration
+    results         : list[dict]. Latency and agreement of each configuration
+    """
+    roi = RegionOfInterest()
+    images = [roi.mask(image) for image in (cv.imread(path) for path in paths) if image is not None]
+    if not images:
+        raise ValueError("No image to benchmark.")
+
+    reference = reference if reference is not None else DetectorConfig()
+    referenceDetections, _ = benchmarkConfiguration(reference, images)
+
+    results = []
+    for config in configurations:
+        try:
+            detections, latency = benchmarkConfiguration(config, images, repeats, batchSize)
+        except Exception as e:
+            logger.error(f"Could not benchmark {config}: {e}")
+            continue
+        agreement = np.mean([getDetectionAgreement(r, d) for r, d in zip(referenceDetections, detections)])
+        results.append({"config": asdict(config), "latency_ms": latency * 1e3, "agreement": float(agreement)})
+        logger.info(f"{config}: {latency * 1e3:.1f} ms per image, agreement {agreement:.3f}")
+
+    if not results:
+        raise ValueError("No configuration could be benchmarked.")
+    best = selectConfiguration(results, minAgreement)
+    return DetectorConfig(**best["config"]), results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select the fastest detector configuration on recorded frames")
+    parser.add_argument("patterns", nargs="*", default=[DATABASE_PATTERN], help="glob patterns of the images")
+    parser.add_argument("--detectors", nargs="+", default=["darkhelp", "opencv"])
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.25, 0.35, 0.45])
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=1, help="number of images per prediction")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--output", default=DETECTOR_CONFIG_PATH)
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.patterns for path in glob.glob(pattern))
+    best, results = runBenchmark(paths, getConfigurations(args.thresholds, args.detectors),
+                                 repeats=args.repeats, minAgreement=args.min_agreement, batchSize=args.batch)
+    best.save(args.output, nbImages=len(paths), results=results)
+    logger.info(f"Best configuration {best} saved in {args.output}")
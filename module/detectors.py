@@ -0,0 +1,286 @@
+import ctypes
+import json
+import os
+import time
+import numpy as np
+import cv2 as cv
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+
+try:
+    import DarkHelp
+except ImportError: # The OpenCV backend does not need DarkHelp
+    DarkHelp = None
+
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+# Both backends load the same Darknet model
+MODEL_DIRECTORY = os.path.dirname(__file__)
+CFG_PATH = os.path.join(MODEL_DIRECTORY, 'model.cfg')
+NAMES_PATH = os.path.join(MODEL_DIRECTORY, 'classes.names')
+WEIGHTS_PATH = os.path.join(MODEL_DIRECTORY, 'model.weights')
+
+THRESHOLD = 0.35
+NMS_THRESHOLD = 0.45
+
+# Configuration chosen by the benchmark of module.detectorbenchmark, specific to the machine
+DETECTOR_CONFIG_PATH = os.path.join(MODEL_DIRECTORY, 'detector_config.json')
+
+
+@dataclass
+class DetectorConfig:
+    """
+    Backend and settings of the detector
+    """
+    detector: str = "darkhelp"      # see DETECTORS
+    threshold: float = THRESHOLD
+    tiles: bool = True              # DarkHelp only
+    combineTiles: bool = True       # DarkHelp only, combine the predictions cut by the edges of the tiles
+    tileEdgeFactor: float = 0.      # DarkHelp only
+    tileRectFactor: float = 1.      # DarkHelp only
+
+    def save(self, path=DETECTOR_CONFIG_PATH, **extra):
+        """
+        Save the configuration in a JSON file, with optional extra information (e.g. the benchmark results)
+        """
+        with open(path, "w") as file:
+            json.dump({"config": asdict(self), **extra}, file, indent=1)
+
+    @classmethod
+    def load(cls, path=DETECTOR_CONFIG_PATH):
+        """
+        Load the configuration saved in path, the default configuration if there is none
+        """
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as file:
+            config = cls(**json.load(file)["config"])
+        logger.info(f"Detector configuration loaded from {path}: {config}")
+        return config
+
+
+@dataclass(frozen=True)
+class RegionOfInterest:
+    """
+    Region of the color image where the game is played, in pixels (corners included)
+    """
+    x1: int = 30
+    y1: int = 30
+    x2: int = 400
+    y2: int = 450
+
+    @property
+    def width(self) -> int:
+        return self.x2 - self.x1 + 1
+
+    @property
+    def height(self) -> int:
+        return self.y2 - self.y1 + 1
+
+    @property
+    def slices(self) -> tuple:
+        """
+        Slices to crop an image to the region: image[roi.slices] is a view, without copy
+        """
+        return (slice(self.y1, self.y2 + 1), slice(self.x1, self.x2 + 1))
+
+    def mask(self, image, out=None) -> np.ndarray:
+        """
+        Image black outside of the region, at its size: the input of the detectors
+
+        Parameters:
+        -----------
+        image           : numpy.ndarray. The color image
+        out             : numpy.ndarray. Array to write into, only its region is written so it must already be black
+                          outside of the region (e.g. the output of a previous call). A new array if None
+        """
+        if out is None:
+            out = np.zeros(image.shape, dtype=np.uint8)
+        np.copyto(out[self.slices], image[self.slices], casting="unsafe")
+        return out
+
+
+def getNoDetections():
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), np.empty((0, 4), dtype=np.float64)
+
+
+class Detector(ABC):
+    """
+    Interface of the object detectors used by DHResults.
+
+    predict takes a batch of BGR images and returns, for each image, the columnar arrays of its detections:
+    cls (n,) the best class, conf (n,) its probability and rect (n, 4) the x, y of the top left corner,
+    the width and the height of the box in pixels of the image.
+    """
+    name = ""
+
+    @abstractmethod
+    def predict(self, images: list) -> list:
+        pass
+
+
+    def close(self):
+        pass
+
+
+class DarkHelpDetector(Detector):
+    """
+    Detector using DarkHelp (Darknet), with tiles. DarkHelp has no batch API: the images are predicted one by one.
+    """
+    name = "darkhelp"
+
+    def __init__(self, config=None):
+        if DarkHelp is None:
+            raise ImportError("DarkHelp is not installed, use the OpenCV detector instead.")
+        config = config if config is not None else DetectorConfig()
+
+        self.dh = DarkHelp.CreateDarkHelpNN(CFG_PATH.encode("utf-8"), NAMES_PATH.encode("utf-8"), WEIGHTS_PATH.encode("utf-8"))
+        DarkHelp.SetThreshold(self.dh, config.threshold)
+        DarkHelp.SetAnnotationLineThickness(self.dh, 1)
+        DarkHelp.EnableTiles(self.dh, config.tiles)
+        DarkHelp.EnableCombineTilePredictions(self.dh, config.combineTiles)
+        DarkHelp.EnableOnlyCombineSimilarPredictions(self.dh, False)
+        DarkHelp.SetTileEdgeFactor(self.dh, config.tileEdgeFactor)
+        DarkHelp.SetTileRectFactor(self.dh, config.tileRectFactor)
+
+
+    def predict(self, images: list) -> list:
+        results = []
+        for image in images:
+            image = np.ascontiguousarray(image, dtype=np.uint8)
+            DarkHelp.Predict(self.dh, image.shape[1], image.shape[0],
+                             image.ctypes.data_as(ctypes.POINTER(ctypes.c_uint8)),
+                             image.size)
+
+            # The Python wrapper of DarkHelp only gives the results as JSON: parse it once
+            predictions = json.loads(DarkHelp.GetPredictionResults(self.dh))['file'][0]['prediction']
+            if not predictions:
+                results.append(getNoDetections())
+                continue
+            cls = np.array([p['best_class'] for p in predictions], dtype=np.int64)
+            conf = np.array([p['best_probability'] for p in predictions], dtype=np.float64)
+            rect = np.array([[p['rect']['x'], p['rect']['y'], p['rect']['width'], p['rect']['height']] for p in predictions],
+                            dtype=np.float64)
+            results.append((cls, conf, rect))
+        return results
+
+
+    def close(self):
+        if self.dh is not None:
+            DarkHelp.DestroyDarkHelpNN(self.dh)
+            self.dh = None
+
+
+def decodeYoloOutputs(outputs: list, nbImages: int, nbClasses: int, threshold=THRESHOLD):
+    """
+    Decode the outputs of the YOLO layers of a batch
+
+    Parameters:
+    -----------
+    outputs         : list[numpy.ndarray]. One array per YOLO layer, rows of center x, center y, width, height
+                      (relative to the image), objectness, then the probability of each class
+    nbImages        : int. Number of images of the batch
+    nbClasses       : int. Number of classes of the model
+
+    Return:
+    -----------
+    detections      : list[tuple]. For each image, cls, conf and the relative boxes (n, 4) x, y, w, h of the top left corner
+    """
+    rows = np.concatenate([output.reshape(nbImages, -1, 5 + nbClasses) for output in outputs], axis=1)
+    detections = []
+    for image in rows:
+        scores = image[:, 5:]
+        cls = np.argmax(scores, axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+        kept = conf > threshold
+        boxes = image[kept, 0:4].astype(np.float64)
+        boxes[:, 0:2] -= boxes[:, 2:4] / 2
+        detections.append((cls[kept].astype(np.int64), conf[kept].astype(np.float64), boxes))
+    return detections
+
+
+class OpenCVDetector(Detector):
+    """
+    Detector using the DNN module of OpenCV on the same Darknet model, the images are predicted in one batch.
+    Without tiles: the images are resized to the input size of the network.
+    """
+    name = "opencv"
+
+    def __init__(self, config=None, nmsThreshold=NMS_THRESHOLD):
+        config = config if config is not None else DetectorConfig(detector="opencv")
+        self.net = cv.dnn.readNetFromDarknet(CFG_PATH, WEIGHTS_PATH)
+        self.net.setPreferableBackend(cv.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv.dnn.DNN_TARGET_CPU)
+        self.outputNames = self.net.getUnconnectedOutLayersNames()
+
+        self.threshold = config.threshold
+        self.nmsThreshold = nmsThreshold
+        with open(NAMES_PATH) as file:
+            self.nbClasses = len([line for line in file if line.strip()])
+
+        # Input size of the network, from the [net] section of the configuration
+        self.width, self.height = 640, 480
+        with open(CFG_PATH) as file:
+            for line in file:
+                key, _, value = line.partition('=')
+                if key.strip() == 'width':
+                    self.width = int(value)
+                elif key.strip() == 'height':
+                    self.height = int(value)
+                elif line.startswith('[') and not line.startswith('[net]'):
+                    break
+
+
+    def predict(self, images: list) -> list:
+        if not images:
+            return []
+        blob = cv.dnn.blobFromImages(images, 1 / 255., (self.width, self.height), swapRB=True, crop=False)
+        self.net.setInput(blob)
+        outputs = self.net.forward(self.outputNames)
+
+        results = []
+        for image, (cls, conf, boxes) in zip(images, decodeYoloOutputs(outputs, len(images), self.nbClasses, self.threshold)):
+            height, width = image.shape[:2]
+            rect = boxes * [width, height, width, height]
+            kept = cv.dnn.NMSBoxesBatched(rect.tolist(), conf.tolist(), cls.tolist(), self.threshold, self.nmsThreshold)
+            kept = np.array(kept, dtype=np.intp).flatten()
+            results.append((cls[kept], conf[kept], rect[kept]))
+        return results
+
+
+DETECTORS = {
+                DarkHelpDetector.name : DarkHelpDetector,
+                OpenCVDetector.name   : OpenCVDetector,
+            }
+
+
+def createDetector(config=None) -> Detector:
+    """
+    Create the detector of config, by default the configuration saved by the benchmark (see DetectorConfig.load)
+    """
+    if config is None:
+        config = DetectorConfig.load()
+    if config.detector not in DETECTORS:
+        raise ValueError(f"Unknown detector {config.detector}, expected one of {list(DETECTORS)}")
+    return DETECTORS[config.detector](config)
+
+
+def benchmarkDetector(detector: Detector, images: list, batchSize=1, repeats=3) -> tuple:
+    """
+    Time the predictions of the detector on the images, see module.detectorbenchmark
+
+    Return:
+    -----------
+    latency         : float. Mean prediction time per image in seconds
+    detections      : list[tuple]. The detections of each image of the last repeat
+    """
+    detector.predict(images[:batchSize]) # Warm up
+    t0 = time.perf_counter()
+    for _ in range(max(repeats, 1)):
+        detections = []
+        for start in range(0, len(images), batchSize):
+            detections.extend(detector.predict(images[start:start + batchSize]))
+    return (time.perf_counter() - t0) / (max(repeats, 1) * len(images)), detections
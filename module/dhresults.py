@@ -1,16 +1,24 @@
   
-import json
-import os
-import ctypes
 import numpy as np
 import cv2 as cv
 import time
 
 from emioapi import EmioCamera
 
+from dataclasses import astuple
 from enum import Enum
-import DarkHelp
 
+from module.calibrationcache import CalibrationCache, CALIBRATION_CACHE_PATH, getDepthSignature, getImageSignature
+from module.capturethread import CaptureThread
+from module.consensus import DetectionConsensus
+from module.detectors import RegionOfInterest, createDetector
+from module.depthestimator import DepthEstimator, DepthEstimators
+from module.motiongate import MotionGate
+from module.predictionbuffers import PredictionBuffers
+from module.homography import Homography, SlotRaster, getBoardPlaneHeight
+from module.projection import CameraProjection
+from module.scene import SceneSnapshot
+from module.session import SessionRecorder
 from module.loggerconfig import getLogger
 logger = getLogger()
 
@@ -25,92 +33,253 @@ class Classes(Enum):
     HAND = 3
 
 
-def getDarkHelpClassificationModel():
-    """
-    Create and initialize the DarkHelp classification model
-    """
-    base_path = os.path.dirname(__file__)
-    cfg_path = os.path.join(base_path, 'model.cfg')
-    names_path = os.path.join(base_path, 'classes.names')
-    weights_path = os.path.join(base_path, 'model.weights')
-    dh = DarkHelp.CreateDarkHelpNN(cfg_path.encode("utf-8"), names_path.encode("utf-8"), weights_path.encode("utf-8")) 
-    DarkHelp.SetThreshold(dh, 0.35)
-    DarkHelp.SetAnnotationLineThickness(dh, 1)
-    DarkHelp.EnableTiles(dh, True)
-    DarkHelp.EnableCombineTilePredictions(dh, True)
-    DarkHelp.EnableOnlyCombineSimilarPredictions(dh, False)
-    DarkHelp.SetTileEdgeFactor(dh, 0.)
-    DarkHelp.SetTileRectFactor(dh, 1.)
-    return dh
-
-
 class DHResults:
     """
-    Class that handle the DarkHelp prediction and put them in an easy to use format
+    Class that handle the predictions of the detector and put them in an easy to use format
     """
-    def __init__(self):
-        self.xydwh = []     # list of [x, y, d, w, h], 
+    def __init__(self, detector=None, camera=None, calibrationPath=None):
+        """
+        Parameters:
+        -----------
+        detector        : Detector. The backend of the prediction, DarkHelpDetector by default
+        camera          : The camera, EmioCamera by default, or a ReplayCamera to play a recorded session
+        calibrationPath : str. The calibration cache, see module.calibrationcache. CALIBRATION_CACHE_PATH by default
+                          with the EmioCamera, no cache by default with another camera (e.g. a ReplayCamera)
+        """
+        self.xydwh = np.empty((0, 5)) # array of [x, y, d, w, h], 
                            # x and y are the center of the bounding box, 
-                           # d is the median depth
+                           # d is the robust depth (see DepthEstimator), NaN once the board plane is calibrated
                            # w is the width and h is the height of the bounding box
-        self.conf = []     # list of confidence
-        self.cls  = []     # list of classes (what we detect on the image), 
+        self.conf = np.empty(0)  # array of confidence
+        self.cls  = np.empty(0, dtype=np.int64) # array of classes (what we detect on the image), 
                            # 0: dog, 1: cat, 2: empty, 3: hand
 
-        self.dh = getDarkHelpClassificationModel()
+        self.predictions = PredictionBuffers()
+        self.motionGate = MotionGate()
+        self.consensus = DetectionConsensus(nbClasses=len(Classes), trackedClasses=(Classes.DOG.value, Classes.CAT.value))
+        self.depthEstimator = DepthEstimator(DepthEstimators.MEDIAN)
+
+        # The detector sees the region of interest at its place and scale in a full frame, black elsewhere,
+        # as the masked image the model was trained on. Only the region is copied into the buffer on each frame
+        self.roi = RegionOfInterest()
+        self.detectorImage = None # Allocated on the first frame, see predict
+
+        self.detector = detector if detector is not None else createDetector()
 
         #hand detection
         self.handDetectedTime = 0 # time in seconds
         self.handDetectedTimer = 2 # seconds
 
         # Initialize the camera
-        self.camera = EmioCamera(show=False, track_markers=True, compute_point_cloud=False)
+        self.camera = camera if camera is not None else EmioCamera(show=False, track_markers=True, compute_point_cloud=False)
         try:
             self.camera.open()
         except Exception as e:
             logger.error(f"Error opening camera: {e}")
 
+        # The capture thread owns the camera, the frames are read from it
+        self.capture = CaptureThread(self.camera, lockstep=getattr(self.camera, "lockstep", False))
+        self.capture.start()
+        # Projection of the detections to the simulation frame, fitted on the calibration of the camera
+        self.projection = None
+        self.homography = None # Homography of the board plane, see calibratePlane
+        self.slotRasters = {}  # board geometry -> SlotRaster
+        self.positions = np.empty((0, 2)) # x, z of the detections in the simulation frame
+        self.approximatePositions = None  # x, z of the detections without a valid depth, see update
+        # The projection, the homography and the rasters are loaded from the cache if the camera has not moved
+        if calibrationPath is None and isinstance(self.camera, EmioCamera):
+            calibrationPath = CALIBRATION_CACHE_PATH
+        self.calibrationPath = calibrationPath
+        self.calibrationReference = None # image and depth signatures of the frame of the calibration
+        self.isCalibrationCached = self.loadCalibration()
+        if not self.isCalibrationCached:
+            self.updateProjection()
+
+        self.updateIndex = 0 # Number of updates, identifies the detections of the snapshots
+        self.snapshot = None
+        self.snapshotKey = None
+
+        self.frame = None # Last frame used
+        self.frameIndex = -1
+
+        self.recorder = None # SessionRecorder, see startRecording
+
 
     def __del__(self):
+        self.stopRecording()
+        self.capture.stop()
         self.camera.close()
 
 
     def getFrame(self):
         """
-        Access the last frame of the camera
-        Wait for a coherent pair of frames: depth and color
+        Access the last frame of the capture thread
+        Wait for a frame newer than the last one used, with a coherent pair of images: depth and color
+        In lockstep mode (replay of a session), the next frame is requested, and EOFError is raised
+        at the end of the session
         
         Return:
         -----------
-        state           : bool. True if the depth image and RGB image are correctly received; False otherwise.
         color_image     : numpy.ndarray. The color image returned by the camera
         depth_image     : numpy.ndarray. The depth image returned by the camera
         """
 
-        self.camera.update()
-        depth_frame = self.camera.depth_frame
-        color_frame = self.camera.frame
-     
-        if depth_frame is None or color_frame is None:
+        if self.capture.lockstep:
+            self.capture.requestFrame()
+        frame = self.capture.waitForFrame(self.frameIndex)
+        if frame is None or frame.index == self.frameIndex:
+            if self.capture.finished.is_set():
+                raise EOFError("The camera has no more frames (end of the replayed session).")
             logger.error('Problem with accessing the frames.')
-            return color_frame, depth_frame
+            return None, None
+        self.frame = frame
+        self.frameIndex = frame.index
 
-        return color_frame, depth_frame
+        if frame.depth is None or frame.color is None:
+            logger.error('Problem with accessing the frames.')
+
+        return frame.color, frame.depth
     
 
     def getProcessedImages(self):
         """
-        Get images from camera and applies an ROI on it 
+        Get images from camera and crop the color image to the ROI
+
+        Return:
+        -----------
+        color_image     : numpy.ndarray. The full color image
+        roi_image       : numpy.ndarray. The color image cropped to the ROI (a view of color_image)
+        depth_image     : numpy.ndarray. The full depth image
         """
         color_image, depth_image = self.getFrame()
 
-        masked_image = None
+        roi_image = None
         if color_image is not None:
-            mask = np.zeros(color_image.shape[:2], dtype="uint8")
-            cv.rectangle(mask, (30, 30), (400, 450), 255, -1)
-            masked_image = cv.bitwise_and(color_image, color_image, mask=mask)
+            roi_image = color_image[self.roi.slices]
+
+        return color_image, roi_image, depth_image
+
+
+    def updateProjection(self):
+        """
+        Fit the projection on the camera, to call again after a calibration of the camera.
+        The calibration cache is not saved, see saveCalibration
+        """
+        with self.capture.paused() as camera: # The capture thread does not use the camera during the fit
+            try:
+                self.projection = CameraProjection.fit(camera.image_to_simulation)
+            except Exception as e:
+                logger.error(f"Could not compute the projection of the camera: {e}")
+        self.homography = None
+        self.slotRasters.clear()
+
+        # The first frame after the fit is the reference of the validation of the cache at the next startup
+        self.calibrationReference = None
+        if self.calibrationPath is not None:
+            latest = self.capture.getLatestFrame()
+            frame = self.capture.waitForFrame(latest.index if latest is not None else -1)
+            if frame is not None and frame.color is not None and frame.depth is not None:
+                self.calibrationReference = (getImageSignature(frame.color), getDepthSignature(frame.depth))
+
+
+    def loadCalibration(self) -> bool:
+        """
+        Load the calibration cache, and check it with the color and the depth images of the current frame
+
+        Return:
+        -----------
+        True if the cache is valid and loaded, False if the camera must be calibrated again
+        """
+        if self.calibrationPath is None:
+            return False
+        t0 = time.perf_counter()
+        cache = CalibrationCache.load(self.calibrationPath)
+        if cache is None:
+            return False
+        frame = self.capture.waitForFrame()
+        if frame is None or not cache.validate(frame.color, frame.depth):
+            logger.info("The calibration cache does not match the camera, it must be calibrated again.")
+            return False
+
+        self.projection = cache.projection
+        self.homography = cache.homography
+        self.calibrationReference = (cache.image, cache.depth)
+        self.slotRasters.clear()
+        if self.homography is not None and cache.roi == astuple(self.roi):
+            for key, (size, slots) in cache.rasters.items():
+                self.slotRasters[key] = SlotRaster(self.homography, self.roi, size, slots)
+        logger.info(f"Calibration cache loaded in {(time.perf_counter() - t0) * 1e3:.1f} ms.")
+        return True
+
+
+    def saveCalibration(self):
+        """
+        Save the projection, the homography and the rasters in the calibration cache,
+        once the calibration is confirmed (see calibrationStep and planeCalibrationStep in play.py)
+        """
+        if self.calibrationPath is None or self.projection is None or self.calibrationReference is None:
+            return
+        image, depth = self.calibrationReference
+        rasters = {key: (raster.size, raster.slots) for key, raster in self.slotRasters.items()}
+        cache = CalibrationCache(projection=self.projection, image=image, depth=depth,
+                                 homography=self.homography, roi=astuple(self.roi), rasters=rasters)
+        try:
+            cache.save(self.calibrationPath)
+        except OSError as e:
+            logger.error(f"Could not save the calibration cache: {e}")
+
+
+    def calibratePlane(self, board, minPawns=4, maxSpread=10.) -> bool:
+        """
+        Compute the homography of the board plane at the height of the pawns of the storage slots,
+        measured with the depth image of the last update. Once calibrated, the positions no longer use
+        the depth image. Explicit calibration step, see planeCalibrationStep in play.py.
+
+        Parameters:
+        -----------
+        board           : Board. The board giving the storage slots, its raster is computed
+        minPawns        : int. Minimum number of pawns on the storage slots
+        maxSpread       : float. Maximum difference of height between the pawns, in mm (e.g. a pawn held by a hand)
+
+        Return:
+        -----------
+        True if the plane is calibrated, False if the pawns do not give a reliable height
+        """
+        if self.projection is None:
+            return False
+        isPawn = (self.cls == Classes.DOG.value) | (self.cls == Classes.CAT.value)
+        height = getBoardPlaneHeight(self.projection.project(self.xydwh[isPawn]), board, minPawns, maxSpread)
+        if height is None:
+            return False
+
+        self.homography = Homography.fromProjection(self.projection, height)
+        self.slotRasters.clear()
+        self.getSlotRaster(board)
+        logger.info(f"Board plane calibrated at the height {height:.1f} mm.")
+        return True
+
+
+    def getSlotRaster(self, board) -> SlotRaster:
+        key = (board.size, astuple(board.playZone), astuple(board.storageZone))
+        if key not in self.slotRasters:
+            self.slotRasters[key] = SlotRaster.build(self.homography, board, self.roi)
+        return self.slotRasters[key]
+
+
+    def startRecording(self, directory: str, chunkSize=256):
+        """
+        Record the frames used by update and their detections in a session directory, see module.session
+        """
+        self.stopRecording()
+        metadata = {"projection": self.projection.toDict()} if self.projection is not None else None
+        self.recorder = SessionRecorder(directory, chunkSize, metadata=metadata)
+        logger.info(f"Recording the session in {directory}")
 
-        return color_image, masked_image, depth_image
+
+    def stopRecording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
 
     def updateAndDisplayAnnotatedImage(self, extra=True):
@@ -118,25 +287,30 @@ class DHResults:
         self.displayAnnotatedImage(color_image, extra=extra)
 
 
-    def checkConsistency(self, cls_list):
+    def predict(self, color_image, depth_image):
         """
-            Check consistency in prediction results: same results over n consecutive number of frame
+        Run the prediction on the ROI of the color image and store the detections in cls, conf and xydwh
         """
-        nbFrames = 3
-        if len(cls_list) < nbFrames:
-            return False
-        
-        while len(cls_list) > nbFrames:
-            cls_list.pop(0) 
+        # The buffer is allocated on the first frame, only the region is copied into it afterwards
+        reused = self.detectorImage is not None and self.detectorImage.shape == color_image.shape
+        self.detectorImage = self.roi.mask(color_image, out=self.detectorImage if reused else None)
 
-        for i in range(nbFrames-1):
-            if (cls_list[i] == Classes.CAT.value).sum() != (cls_list[i] == Classes.CAT.value).sum():
-                return False
-            
-            if (cls_list[i] == Classes.DOG.value).sum() != (cls_list[i] == Classes.DOG.value).sum():
-                return False
+        # Update the model prediction, the boxes are in the coordinates of the full frame
+        cls, conf, rect = self.detector.predict([self.detectorImage])[0]
 
-        return True
+        predictions = self.predictions
+        predictions.fill(cls, conf, rect, depth_image.shape)
+        size = predictions.count
+
+        # Robust depth of all the boxes at once, only needed until the board plane is calibrated
+        if self.homography is None:
+            self.depthEstimator.estimate(depth_image, predictions.bounds[:size], out=predictions.xydwh[:size, 2])
+        else:
+            predictions.xydwh[:size, 2] = np.nan
+
+        self.cls  = predictions.cls[:size]
+        self.conf = predictions.conf[:size]
+        self.xydwh = predictions.xydwh[:size]
 
 
     def update(self):
@@ -144,55 +318,63 @@ class DHResults:
         Update the value of the predictions
         """
 
-        cls_list = []
-
-        while not self.checkConsistency(cls_list): 
-            self.xydwh = []     
-            self.conf = []       
-            self.cls  = []  
-
-            color_image, masked_image, depth_image = self.getProcessedImages()
+        # Loop until the consensus window agrees, its history is kept from the previous updates
+        stable = False
+        while not stable:
+            color_image, roi_image, depth_image = self.getProcessedImages()
             if color_image is None:
                 continue
 
-            image_data = np.ascontiguousarray(masked_image, dtype=np.uint8)
+            # Reuse the last stable detections while the ROI does not change. Until the window is stable,
+            # every frame is predicted: a reused prediction must not count as a new agreeing frame
+            if not self.consensus.isStable(time.perf_counter()):
+                self.motionGate.reset()
+            predicted = not self.motionGate.isUnchanged(roi_image)
+            if predicted:
+                self.predict(color_image, depth_image)
+
+            if self.recorder is not None:
+                index = self.recorder.recordFrame(self.frame.timestamp, color_image, depth_image, self.frame.markers)
+                self.recorder.recordDetections(index, self.cls, self.conf, self.xydwh)
+
+            if predicted:
+                stable = self.consensus.push(self.cls, self.xydwh)
+            else:
+                stable = self.consensus.refresh()
+
+        # Positions of all the detections in one matrix product
+        if self.homography is not None:
+            self.positions = self.homography.apply(self.xydwh[:, 0:2])
+        elif self.projection is not None:
+            self.positions = self.projection.projectToPlane(self.xydwh)
+        else:
+            self.positions = np.full((len(self.cls), 2), np.nan)
+
+        # The boxes without a valid depth are projected at the median depth of the others, the cubes lying on the
+        # table: rough positions, enough to tell if these detections may be in the play zone, see SceneSnapshot
+        self.approximatePositions = None
+        invalid = np.isnan(self.positions).any(axis=1)
+        if self.homography is None and self.projection is not None and invalid.any() and not invalid.all():
+            xydwh = self.xydwh.copy()
+            xydwh[invalid, 2] = np.median(xydwh[~invalid, 2])
+            self.approximatePositions = self.projection.projectToPlane(xydwh)
+        self.updateIndex += 1
 
-            # Update the model prediction
-            DarkHelp.Predict(self.dh, 640, 480, 
-                            image_data.ctypes.data_as(ctypes.POINTER(ctypes.c_uint8)),
-                            640*480*3)
-            
-            json_string = DarkHelp.GetPredictionResults(self.dh)
-            data = json.loads(json_string)
-
-            # Store the information in a easy to use (looking like YOLO standard) object
-            size=int(data['file'][0]['count'])
-
-            for i in range(size):
-                self.cls.append(data['file'][0]['prediction'][i]['best_class'])
-                self.conf.append(data['file'][0]['prediction'][i]['best_probability'])
-                x=data['file'][0]['prediction'][i]['rect']['x']
-                y=data['file'][0]['prediction'][i]['rect']['y']
-                w=data['file'][0]['prediction'][i]['rect']['width']
-                h=data['file'][0]['prediction'][i]['rect']['height']
-                x=x+w/2
-                y=y+h/2
-
-                x1 = max(0, int(x - w / 2))
-                y1 = max(0, int(y - h / 2))
-                x2 = min(depth_image.shape[1], int(x + w / 2))
-                y2 = min(depth_image.shape[0], int(y + h / 2))
-                depth_values = depth_image[y1:y2, x1:x2].flatten()
-                d = np.median(depth_values[depth_values > 0])
-    
-                self.xydwh.append([x,y,d,w,h])
+        return color_image, depth_image
 
-            self.cls  = np.array(self.cls)
-            self.conf = np.array(self.conf)
-            self.xydwh = np.array(self.xydwh)
-            cls_list.append(self.cls)
 
-        return color_image, depth_image
+    def getSnapshot(self, board) -> SceneSnapshot:
+        """
+        Analysis of the last detections against the zones of board, computed once per update and board geometry
+        """
+        key = (self.updateIndex, board.size, astuple(board.playZone), astuple(board.storageZone))
+        if self.snapshotKey != key:
+            raster = self.getSlotRaster(board) if self.homography is not None else None
+            self.snapshot = SceneSnapshot.build(self.updateIndex, self.cls, self.conf, self.positions, board,
+                                                pixels=self.xydwh[:, 0:2], raster=raster,
+                                                approximatePositions=self.approximatePositions)
+            self.snapshotKey = key
+        return self.snapshot
     
 
     def displayAnnotatedImage(self, color_image=None, extra=False):
@@ -205,7 +387,8 @@ class DHResults:
         """
 
         if color_image is None:
-            color_image = self.camera.frame
+            frame = self.capture.getLatestFrame()
+            color_image = frame.color if frame is not None else None
         if color_image is None:
             return
 
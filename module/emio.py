@@ -6,7 +6,7 @@ from utils.header import addHeader, addSolvers
 
 # The simulation of Emio which solves the IK problem
 def createScene(rootnode,
-                camera
+                capture
                 ):
     
     from module.moveemio import MoveEmio
@@ -67,6 +67,6 @@ def createScene(rootnode,
     emio.CenterPart.Effector.Distance.PositionEffector.maxSpeed.value = 100
     rootnode.addObject(MoveEmio(target=effectorTarget, 
                                 emio=emio, 
-                                camera=camera))
+                                capture=capture))
 
     return rootnode
@@ -0,0 +1,158 @@
+import numpy as np
+
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+def getBoardPlaneHeight(positions, board, minPawns=4, maxSpread=10.) -> float:
+    """
+    Height of the board plane, measured on the pawns of the storage slots
+
+    Parameters:
+    -----------
+    positions       : numpy.ndarray. (n, 3) x, y, z of the pawns in the simulation frame, NaN if unknown
+    board           : Board. The board giving the storage slots
+    minPawns        : int. Minimum number of pawns on the storage slots
+    maxSpread       : float. Maximum difference of height between the pawns, in mm (e.g. a pawn held by a hand)
+
+    Return:
+    -----------
+    height          : float. The median height of the pawns, None if they do not give a reliable height
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    positions = positions[~np.isnan(positions).any(axis=1)]
+    inStorage = board.positionsToStorageIndices(positions[:, 0], positions[:, 2]) >= 0
+    heights = positions[inStorage, 1]
+    if len(heights) < minPawns:
+        logger.warning(f"{len(heights)} pawns seen on the storage slots, at least {minPawns} are needed to calibrate the board plane.")
+        return None
+    if np.ptp(heights) > maxSpread:
+        logger.warning(f"The heights of the pawns differ by {np.ptp(heights):.1f} mm, the board plane is not calibrated.")
+        return None
+    return float(np.median(heights))
+
+
+class Homography:
+    """
+    Homography from the image pixels to the x, z coordinates of the board plane in the simulation frame.
+    All the cubes lie on the table: their positions do not need the depth image.
+    """
+
+    def __init__(self, matrix):
+        """
+        Parameters:
+        -----------
+        matrix          : numpy.ndarray. (3, 3) matrix from (u, v, 1) to (x, z, 1) up to a scale
+        """
+        self.matrix = np.asarray(matrix, dtype=np.float64).reshape(3, 3)
+
+
+    @classmethod
+    def fromProjection(cls, projection, planeHeight: float):
+        """
+        Homography of the plane y = planeHeight of the simulation frame, from the projection of the camera
+
+        Parameters:
+        -----------
+        projection      : CameraProjection. The projection of the camera
+        planeHeight     : float. The height (y) of the plane in the simulation frame, e.g. the top of the cubes
+        """
+        # With a = A[:, :3] @ (u, v, 1) and t = A[:, 3], the depth of the pixel on the plane is
+        # d = (h - t_y) / a_y, then x = a_x * d + t_x and z = a_z * d + t_z
+        A = projection.matrix
+        scale = planeHeight - A[1, 3]
+        return cls(np.array([scale * A[0, :3] + A[0, 3] * A[1, :3],
+                             scale * A[2, :3] + A[2, 3] * A[1, :3],
+                             A[1, :3]]))
+
+
+    def apply(self, pixels) -> np.ndarray:
+        """
+        Map the pixels (n, 2) to the board plane, return the (n, 2) x, z positions
+        """
+        pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+        points = pixels @ self.matrix[:, :2].T + self.matrix[:, 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return points[:, :2] / points[:, 2:3]
+
+
+    def toDict(self) -> dict:
+        return {"matrix": self.matrix.tolist()}
+
+
+    @classmethod
+    def fromDict(cls, data: dict):
+        return cls(data["matrix"])
+
+
+class SlotRaster:
+    """
+    Lookup raster of the region of interest: the play cell or storage slot under every pixel, on the board plane.
+    The cell and the slot of a detection are then read with one array index, without the depth image.
+    """
+
+    def __init__(self, homography: Homography, roi, size: int, slots):
+        """
+        Parameters:
+        -----------
+        homography      : Homography. From the pixels to the board plane
+        roi             : RegionOfInterest. The region of the image covered by the raster
+        size            : int. The size of the board
+        slots           : numpy.ndarray. (roi.height, roi.width) slot of each pixel: -1 outside of the zones,
+                          i * size + j for the cell (i, j), size * size + k for the storage slot k
+        """
+        self.homography = homography
+        self.roi = roi
+        self.size = size
+        self.nbCells = size * size
+        self.slots = np.asarray(slots, dtype=np.int32)
+
+
+    @classmethod
+    def build(cls, homography: Homography, board, roi):
+        """
+        Compute the raster of the zones of the board
+
+        Parameters:
+        -----------
+        homography      : Homography. From the pixels to the board plane
+        board           : Board. The board giving the play and storage zones
+        roi             : RegionOfInterest. The region of the image covered by the raster
+        """
+        u, v = np.meshgrid(np.arange(roi.x1, roi.x1 + roi.width), np.arange(roi.y1, roi.y1 + roi.height))
+        x, z = homography.apply(np.column_stack([u.ravel(), v.ravel()])).T
+
+        size = board.size
+        nbCells = size * size
+        slots = np.full(len(x), -1, dtype=np.int32)
+        i, j = board.positionsToCellIndices(x, z)
+        inCell = (i >= 0) & (i < size) & (j >= 0) & (j < size)
+        slots[inCell] = i[inCell] * size + j[inCell]
+        storageIndices = board.positionsToStorageIndices(x, z)
+        inSlot = (storageIndices >= 0) & (storageIndices < 4 * size)
+        slots[inSlot] = nbCells + storageIndices[inSlot]
+        return cls(homography, roi, size, slots.reshape(u.shape))
+
+
+    def lookup(self, pixels) -> tuple:
+        """
+        Cells and storage slots of the pixels (n, 2)
+
+        Return:
+        -----------
+        cells           : numpy.ndarray. (n, 2) cell indices, -1 outside of the play zone
+        storageIndices  : numpy.ndarray. (n,) storage slots, -1 outside of the slots
+        """
+        pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+        columns = np.trunc(pixels[:, 0]).astype(np.intp) - self.roi.x1
+        rows = np.trunc(pixels[:, 1]).astype(np.intp) - self.roi.y1
+        inside = (columns >= 0) & (columns < self.slots.shape[1]) & (rows >= 0) & (rows < self.slots.shape[0])
+
+        slots = np.full(len(pixels), -1, dtype=np.intp)
+        slots[inside] = self.slots[rows[inside], columns[inside]]
+
+        cells = np.full((len(pixels), 2), -1, dtype=np.intp)
+        inCell = (slots >= 0) & (slots < self.nbCells)
+        cells[inCell, 0], cells[inCell, 1] = np.divmod(slots[inCell], self.size)
+        storageIndices = np.where(slots >= self.nbCells, slots - self.nbCells, -1)
+        return cells, storageIndices
@@ -0,0 +1,76 @@
+import time
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap change detector placed in front of the prediction.
+
+    The image is downsampled by striding and its channels are summed, then compared pixel by pixel
+    with the image of the last prediction. The prediction can be skipped while less than
+    changedFraction of the pixels differ by more than threshold. A prediction is forced every
+    refreshPeriod seconds, in case of slow changes.
+    """
+
+    def __init__(self, factor=8, threshold=24, changedFraction=0.002, refreshPeriod=2.):
+        """
+        Parameters:
+        -----------
+        factor          : int. Downsampling factor of the image
+        threshold       : int. Minimum difference of the sum of the channels of a changed pixel
+        changedFraction : float. Minimum fraction of changed pixels of a changed image
+        refreshPeriod   : float. Maximum time in seconds between two predictions
+        """
+        self.factor = factor
+        self.threshold = threshold
+        self.changedFraction = changedFraction
+        self.refreshPeriod = refreshPeriod
+
+        self.reference = None # Downsampled image of the last prediction
+        self.current = None
+        self.referenceTime = -np.inf
+
+        self.nbSkipped = 0
+        self.nbPredictions = 0
+
+
+    def downsample(self, image):
+        small = image[::self.factor, ::self.factor]
+        if self.current is None or self.current.shape != small.shape[:2]:
+            self.current = np.empty(small.shape[:2], dtype=np.int16)
+        if small.ndim == 3:
+            np.sum(small, axis=2, dtype=np.int16, out=self.current)
+        else:
+            self.current[:] = small
+        return self.current
+
+
+    def isUnchanged(self, image, now=None) -> bool:
+        """
+        Return True if the prediction of the last accepted image can be reused for image.
+        Otherwise image becomes the new reference, and the prediction must run.
+        """
+        if now is None:
+            now = time.perf_counter()
+        current = self.downsample(image)
+
+        if (self.reference is not None and self.reference.shape == current.shape
+                and now - self.referenceTime < self.refreshPeriod):
+            nbChanged = np.count_nonzero(np.abs(current - self.reference) > self.threshold)
+            if nbChanged <= self.changedFraction * current.size:
+                self.nbSkipped += 1
+                return True
+
+        # Swap the buffers: the current image becomes the reference
+        self.reference, self.current = current, self.reference
+        self.referenceTime = now
+        self.nbPredictions += 1
+        return False
+
+
+    def reset(self):
+        """
+        Force the prediction of the next image
+        """
+        self.reference = None
+        self.referenceTime = -np.inf
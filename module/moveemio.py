@@ -13,6 +13,7 @@ import numpy as np
 import pygame
 
 from module.picontroller import PIController
+from module.trajectory import Trajectory, Waypoint
 from emioapi import EmioMotors
 from enum import Enum
 
@@ -22,7 +23,7 @@ class MoveEmio(Sofa.Core.Controller):
     This class controlles Emio's movement
     """
 
-    def __init__(self, target, emio, camera, *args, **kwargs):
+    def __init__(self, target, emio, capture, *args, **kwargs):
        
         Sofa.Core.Controller.__init__(self)
         self.name = "MoveEmio"
@@ -33,11 +34,12 @@ class MoveEmio(Sofa.Core.Controller):
         self.listDeltaPosition = []
         self.listDeltaGripper = []
 
-        self.camera = camera
+        self.capture = capture # CaptureThread of the camera, the markers are read from its latest frame
 
         self.done = True # Is the motion to target (command) done
         self.minMotionSteps = 80 # Wait at least this number of steps before receiving another command
         self.steps = 0 # Current number of steps done 
+        self.trajectory = None # Trajectory being followed, see setTrajectory
 
         # PI controller
         self.PI = PIController(self.emio.getRoot().dt.value)
@@ -102,6 +104,30 @@ class MoveEmio(Sofa.Core.Controller):
         self.emio.CenterPart.Effector.Distance.DistanceMapping.restLengths.value = [distance] 
 
 
+    def setTrajectory(self, waypoints):
+        """
+        Emio receives a sequence of waypoints to follow. It only waits to be steady at the settled waypoints,
+        the transit waypoints are blended: the next target is sent as soon as the gripper is close enough.
+
+        Parameters:
+        -----------
+        waypoints       : list[Waypoint] or Trajectory. The waypoints to follow
+        """
+        self.trajectory = waypoints if isinstance(waypoints, Trajectory) else Trajectory(waypoints)
+        self.setWaypoint(self.trajectory.current)
+
+
+    def setWaypoint(self, waypoint: Waypoint):
+        """
+        Send the targets of a waypoint of the trajectory
+        """
+        if waypoint.position is not None:
+            self.setGripperTarget(list(waypoint.position), speed=waypoint.speed, minSteps=waypoint.minSteps, withPI=waypoint.withPI)
+        if waypoint.opening is not None:
+            self.setGripperDistance(waypoint.opening, speed=waypoint.speed, minSteps=waypoint.minSteps)
+        self.done = False
+
+
     def updateListDelta(self, deltaPosition, deltaGripper):
         """
         Update the list of delta values.
@@ -117,8 +143,8 @@ class MoveEmio(Sofa.Core.Controller):
 
 
     def getGripperFingersTipBarycenter(self):
-        self.camera.update()
-        positionMarkers = self.camera.trackers_pos
+        frame = self.capture.getLatestFrame()
+        positionMarkers = frame.markers if frame is not None else []
 
         tipSimulation = np.array(self.emio.CenterPart.TipEffector.EffectorCoord.barycenter.value[0:3])
         tipTarget = np.array(self.tipTarget)
@@ -156,14 +182,29 @@ class MoveEmio(Sofa.Core.Controller):
 
             if self.steps > 0:
                 self.steps -= 1
-            if (abs(np.mean(np.array(self.listDeltaPosition))) < 1 and 
-                abs(np.mean(np.array(self.listDeltaGripper))) < 1 and 
-                self.steps <= 0):
-                # Stops / done if:
-                # 1. Emio is steady
-                # 2. The gripper motion is steady
-                # 3. The minimum number of steps has been reached
-                self.done = True
+            # Steady if:
+            # 1. Emio is steady
+            # 2. The gripper motion is steady
+            # 3. The minimum number of steps has been reached
+            steady = (abs(np.mean(np.array(self.listDeltaPosition))) < 1 and 
+                      abs(np.mean(np.array(self.listDeltaGripper))) < 1 and 
+                      self.steps <= 0)
+
+            if self.trajectory is None:
+                self.done = steady
+                return
+
+            # Transit waypoints are left as soon as they are within reach, settled ones once Emio is steady
+            if self.trajectory.current.settle:
+                reached = steady
+            else:
+                reached = self.trajectory.isBlendReached(position_simulation, np.mean(np.array(deltaGripper)))
+            if reached:
+                if self.trajectory.isLast():
+                    self.trajectory = None
+                    self.done = True
+                else:
+                    self.setWaypoint(self.trajectory.advance())
 
 
     def onAnimateEndEvent(self, _):
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class PredictionBuffers:
+    """
+    Preallocated columnar arrays holding the predictions of one frame.
+    The arrays are reused from one frame to the next and only grow when a frame has more detections than their capacity.
+    """
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.allocate(capacity)
+
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.cls = np.empty(capacity, dtype=np.int64)          # best class
+        self.conf = np.empty(capacity, dtype=np.float64)       # best probability
+        self.rect = np.empty((capacity, 4), dtype=np.float64)  # x, y of the top left corner, width, height
+        self.xydwh = np.empty((capacity, 5), dtype=np.float64) # x, y of the center, depth, width, height
+        self.bounds = np.empty((capacity, 4), dtype=np.intp)   # x1, y1, x2, y2 of the box clipped to the image
+
+
+    def fill(self, cls, conf, rect, imageShape, offset=(0, 0)):
+        """
+        Fill the arrays from the detections of a Detector
+
+        Parameters:
+        -----------
+        cls             : numpy.ndarray. (n,) best class of each detection
+        conf            : numpy.ndarray. (n,) probability of the best class
+        rect            : numpy.ndarray. (n, 4) x, y of the top left corner, width and height of the boxes
+        imageShape      : tuple. The (height, width) of the image, to clip the boxes
+        offset          : tuple. The (x, y) position in the image of the input of the prediction
+        """
+        n = len(cls)
+        if n > self.capacity:
+            self.allocate(max(n, 2 * self.capacity))
+        self.count = n
+
+        self.cls[:n] = cls
+        self.conf[:n] = conf
+        self.rect[:n] = rect
+        self.rect[:n, 0:2] += offset
+
+        rect = self.rect[:n]
+        xydwh = self.xydwh[:n]
+        xydwh[:, 0:2] = rect[:, 0:2] + rect[:, 2:4] / 2
+        xydwh[:, 3:5] = rect[:, 2:4]
+
+        # Same rounding as int(x - w / 2) and int(x + w / 2) on the center
+        bounds = self.bounds[:n]
+        bounds[:, 0:2] = np.maximum(0, np.trunc(xydwh[:, 0:2] - rect[:, 2:4] / 2))
+        bounds[:, 2] = np.minimum(imageShape[1], np.trunc(xydwh[:, 0] + rect[:, 2] / 2))
+        bounds[:, 3] = np.minimum(imageShape[0], np.trunc(xydwh[:, 1] + rect[:, 3] / 2))
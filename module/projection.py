@@ -0,0 +1,118 @@
+import numpy as np
+
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+class CameraProjection:
+    """
+    Projection of image pixels with their depth to the simulation frame, for all the detections at once.
+
+    With a pinhole camera of intrinsics (fx, fy, cx, cy), the point of the pixel (u, v) at depth d is
+    d * ((u - cx) / fx, (v - cy) / fy, 1) in the camera frame, then the calibration transform maps it to the
+    simulation frame. Both steps are linear in (u * d, v * d, d, 1): the projection is stored as a single
+    3x4 matrix, applied to the whole xydwh array with one matrix product.
+    """
+
+    def __init__(self, matrix):
+        """
+        Parameters:
+        -----------
+        matrix          : numpy.ndarray. (3, 4) matrix from (u * d, v * d, d, 1) to the simulation x, y, z
+        """
+        self.matrix = np.asarray(matrix, dtype=np.float64).reshape(3, 4)
+
+
+    @classmethod
+    def fromIntrinsics(cls, fx: float, fy: float, cx: float, cy: float, transform=None, depthScale=1.):
+        """
+        Build the projection from the camera intrinsics and the calibration transform
+
+        Parameters:
+        -----------
+        fx, fy, cx, cy  : float. The intrinsics of the camera in pixels
+        transform       : numpy.ndarray. (4, 4) transform from the camera frame to the simulation frame, identity by default
+        depthScale      : float. Scale from the depth values to the units of the camera frame
+        """
+        deprojection = np.array([[1. / fx, 0.,      -cx / fx, 0.],
+                                 [0.,      1. / fy, -cy / fy, 0.],
+                                 [0.,      0.,      1.,       0.],
+                                 [0.,      0.,      0.,       1.]])
+        deprojection[:3, :3] *= depthScale
+        transform = np.eye(4) if transform is None else np.asarray(transform, dtype=np.float64)
+        return cls((transform @ deprojection)[:3])
+
+
+    @classmethod
+    def fit(cls, imageToSimulation, width=640, height=480, depths=(300., 450., 600.), step=40):
+        """
+        Fit the projection on a grid of pixels and depths projected by imageToSimulation,
+        e.g. the image_to_simulation method of the calibrated EmioCamera
+
+        Parameters:
+        -----------
+        imageToSimulation : callable. (x, y, depth) -> (x, y, z) in the simulation frame
+        width, height   : int. The size of the image
+        depths          : tuple. The depths of the grid
+        step            : int. The step of the grid in pixels
+        """
+        pixels, positions = [], []
+        for d in depths:
+            for v in range(0, height, step):
+                for u in range(0, width, step):
+                    position = imageToSimulation(u, v, d)
+                    if position is not None:
+                        pixels.append([u * d, v * d, d, 1.])
+                        positions.append(position[0:3])
+        if len(pixels) < 4:
+            raise ValueError("Not enough valid points to fit the projection.")
+
+        pixels, positions = np.array(pixels), np.array(positions, dtype=np.float64)
+        matrix = np.linalg.lstsq(pixels, positions, rcond=None)[0].T
+        projection = cls(matrix)
+
+        error = np.abs(pixels @ matrix.T - positions).max()
+        if error > 1.:
+            logger.warning(f"The camera projection is not linear, the fitted projection is off by up to {error:.1f} mm.")
+        return projection
+
+
+    def project(self, xydwh) -> np.ndarray:
+        """
+        Project the detections to the simulation frame
+
+        Parameters:
+        -----------
+        xydwh           : numpy.ndarray. (n, 5) detections, x and y in pixels, d the depth
+
+        Return:
+        -----------
+        positions       : numpy.ndarray. (n, 3) x, y, z in the simulation frame, NaN if the depth is not valid
+        """
+        xydwh = np.asarray(xydwh, dtype=np.float64).reshape(-1, 5)
+        d = xydwh[:, 2]
+        # Same pixels as image_to_simulation(int(x), int(y), d)
+        pixels = np.empty((len(xydwh), 4))
+        pixels[:, 0] = np.trunc(xydwh[:, 0]) * d
+        pixels[:, 1] = np.trunc(xydwh[:, 1]) * d
+        pixels[:, 2] = d
+        pixels[:, 3] = 1.
+        positions = pixels @ self.matrix.T
+        positions[~(d > 0)] = np.nan
+        return positions
+
+
+    def projectToPlane(self, xydwh) -> np.ndarray:
+        """
+        Project the detections to the x, z coordinates of the simulation frame (the plane of the board)
+        """
+        return self.project(xydwh)[:, 0::2]
+
+
+    def toDict(self) -> dict:
+        return {"matrix": self.matrix.tolist()}
+
+
+    @classmethod
+    def fromDict(cls, data: dict):
+        return cls(data["matrix"])
@@ -0,0 +1,125 @@
+import numpy as np
+
+from dataclasses import dataclass
+from module.board import CellState
+
+
+MIN_CONFIDENCE = 0.6 # Minimum confidence of a detection to pick its cube
+PLAY_ZONE_MARGIN = 10. # Distance around the play zone of nearPlayZone (mm), less than the gap to the storage slots
+
+
+def getReadOnly(array, dtype=None) -> np.ndarray:
+    array = np.array(array, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class SceneSnapshot:
+    """
+    Analysis of the detections of a frame against the zones of a board, computed once and shared by
+    all the perception queries of TicTacToe. The snapshot and its arrays are read-only,
+    see DHResults.getSnapshot.
+    """
+    index: int                  # Number of the update of DHResults
+    cls: np.ndarray             # (n,) classes of the detections
+    conf: np.ndarray            # (n,) confidences of the detections
+    positions: np.ndarray       # (n, 2) x, z in the simulation frame, NaN if unknown
+    isValid: np.ndarray         # (n,) True if the position is known
+    isPawn: np.ndarray          # (n,) True for the dogs and the cats
+    isConfident: np.ndarray     # (n,) True if the confidence is above MIN_CONFIDENCE
+    inPlayZone: np.ndarray      # (n,) True if the detection is in the play zone
+    nearPlayZone: np.ndarray    # (n,) True if the detection is within PLAY_ZONE_MARGIN of the play zone, or if its
+                                #      position is unknown, see build
+    cells: np.ndarray           # (n, 2) cell indices of the detections, -1 outside of the play zone
+    storageIndices: np.ndarray  # (n,) storage slot of the detections, -1 outside of the slots
+
+
+    @classmethod
+    def build(cls, index: int, classes, conf, positions, board, pixels=None, raster=None, approximatePositions=None):
+        """
+        Analyze the detections of a frame
+
+        Parameters:
+        -----------
+        index           : int. Number of the update of DHResults
+        classes         : numpy.ndarray. (n,) classes of the detections
+        conf            : numpy.ndarray. (n,) confidences of the detections
+        positions       : numpy.ndarray. (n, 2) x, z of the detections in the simulation frame
+        board           : Board. The board giving the play and storage zones
+        pixels          : numpy.ndarray. (n, 2) x, y of the detections in the image, to look up in raster
+        raster          : SlotRaster. If given, the cells and storage slots are read in the raster instead of
+                          being computed from the positions
+        approximatePositions: numpy.ndarray. (n, 2) rough x, z of the detections, only read where the positions are
+                          not valid, to tell if these detections may be near the play zone
+        """
+        classes = np.asarray(classes, dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        n = len(classes)
+
+        isValid = ~np.isnan(positions).any(axis=1)
+        if raster is not None:
+            cells, storageIndices = raster.lookup(pixels)
+            inPlayZone = cells[:, 0] >= 0
+        else:
+            x, z = positions[:, 0], positions[:, 1]
+            inPlayZone = board.areInPlayZone(x, z)
+            cells = np.stack(board.positionsToCellIndices(x, z), axis=1).reshape(n, 2)
+            storageIndices = board.positionsToStorageIndices(x, z)
+
+        # A detection without a valid position may be anywhere, unless it has an approximate position
+        nearPositions = positions
+        if approximatePositions is not None:
+            approximatePositions = np.asarray(approximatePositions, dtype=np.float64).reshape(-1, 2)
+            nearPositions = np.where(isValid[:, None], positions, approximatePositions)
+        nearPlayZone = (board.areInPlayZone(nearPositions[:, 0], nearPositions[:, 1], margin=PLAY_ZONE_MARGIN) |
+                        np.isnan(nearPositions).any(axis=1))
+
+        return cls(index=index,
+                   cls=getReadOnly(classes),
+                   conf=getReadOnly(conf, dtype=np.float64),
+                   positions=getReadOnly(positions),
+                   isValid=getReadOnly(isValid),
+                   isPawn=getReadOnly((classes == CellState.DOG.value) | (classes == CellState.CAT.value)),
+                   isConfident=getReadOnly(np.asarray(conf) > MIN_CONFIDENCE),
+                   inPlayZone=getReadOnly(inPlayZone),
+                   nearPlayZone=getReadOnly(nearPlayZone),
+                   cells=getReadOnly(cells),
+                   storageIndices=getReadOnly(storageIndices))
+
+
+    def __len__(self):
+        return len(self.cls)
+
+
+    def getPlayZoneState(self, size: int, out=None) -> np.ndarray:
+        """
+        State of the board seen in the frame: the pawns detected in the play zone, empty cells elsewhere
+
+        Parameters:
+        -----------
+        size            : int. Number of cells per side of the board
+        out             : numpy.ndarray. (size, size) array to write the state into, a new array if None
+        """
+        if out is None:
+            state = np.full((size, size), CellState.EMPTY.value, dtype=int)
+        else:
+            state = out
+            state[:, :] = CellState.EMPTY.value
+        pawns = self.isPawn & self.inPlayZone
+        state[self.cells[pawns, 0], self.cells[pawns, 1]] = self.cls[pawns]
+        return state
+
+
+    def getPlayZonePawns(self) -> np.ndarray:
+        """
+        Indices of the pawns in the play zone
+        """
+        return np.flatnonzero(self.isPawn & self.inPlayZone)
+
+
+    def getStoragePawns(self) -> np.ndarray:
+        """
+        Indices of the pawns in a storage slot
+        """
+        return np.flatnonzero(self.isPawn & (self.storageIndices >= 0))
@@ -0,0 +1,222 @@
+import random
+import time
+import numpy as np
+
+from module.board import CellState, getWinningLines, getDefaultWinLength
+
+
+WIN_SCORE = 1000000 # Score of a win at the root, minus the number of plies to reach it
+LINE_WEIGHTS = [0, 1, 10, 100, 1000, 10000] # Heuristic weight of a line by number of pawns of a single color
+
+# Transposition table flags
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class AlphaBetaSearch:
+    """
+    Negamax alpha-beta search for size x size boards with winLength pawns in a row to win.
+    Iterative deepening, bounded by a wall-clock budget per move, with move ordering
+    (transposition table move, history heuristic then cell centrality) and a transposition table
+    kept between moves.
+    """
+
+    def __init__(self, size: int, winLength=None, maxTableSize=1000000):
+        self.size = size
+        self.winLength = getDefaultWinLength(size) if winLength is None else winLength
+        self.nbCells = size * size
+
+        self.lines = [tuple(int(cell) for cell in line) for line in getWinningLines(size, self.winLength)]
+        self.cellLines = [[l for l, line in enumerate(self.lines) if cell in line] for cell in range(self.nbCells)]
+        self.centrality = sorted(range(self.nbCells), key=lambda cell: -len(self.cellLines[cell]))
+
+        generator = random.Random(0)
+        self.zobrist = [[generator.getrandbits(64) for _ in range(2)] for _ in range(self.nbCells)]
+        self.sideKeys = [generator.getrandbits(64) for _ in range(2)]
+
+        self.table = {} # hash -> (depth, score, flag, best move)
+        self.maxTableSize = maxTableSize
+        self.history = [0] * self.nbCells
+
+        # Search state
+        self.cells = []
+        self.counts = []  # Per line number of pawns of each color
+        self.hash = 0
+        self.nbEmpty = 0
+        self.deadline = 0.
+        self.nodes = 0
+
+
+    def setState(self, state):
+        self.cells = [int(value) for value in np.asarray(state).flatten()]
+        self.counts = [[0, 0] for _ in self.lines]
+        self.hash = 0
+        self.nbEmpty = 0
+        for cell, value in enumerate(self.cells):
+            if value == CellState.EMPTY.value:
+                self.nbEmpty += 1
+            else:
+                self.hash ^= self.zobrist[cell][value]
+                for l in self.cellLines[cell]:
+                    self.counts[l][value] += 1
+
+
+    def play(self, cell: int, color: int) -> bool:
+        """
+        Play color in cell, return True if the move wins
+        """
+        self.cells[cell] = color
+        self.hash ^= self.zobrist[cell][color]
+        self.nbEmpty -= 1
+        won = False
+        for l in self.cellLines[cell]:
+            self.counts[l][color] += 1
+            if self.counts[l][color] == self.winLength:
+                won = True
+        return won
+
+
+    def undo(self, cell: int, color: int):
+        self.cells[cell] = CellState.EMPTY.value
+        self.hash ^= self.zobrist[cell][color]
+        self.nbEmpty += 1
+        for l in self.cellLines[cell]:
+            self.counts[l][color] -= 1
+
+
+    def evaluate(self, color: int) -> int:
+        """
+        Heuristic score of the position for color: open lines weighted by their number of pawns
+        """
+        score = 0
+        for mine, theirs in (counts if color == CellState.DOG.value else counts[::-1] for counts in self.counts):
+            if theirs == 0:
+                score += LINE_WEIGHTS[mine]
+            elif mine == 0:
+                score -= LINE_WEIGHTS[theirs]
+        return score
+
+
+    def orderMoves(self, bestMove):
+        moves = [cell for cell in self.centrality if self.cells[cell] == CellState.EMPTY.value]
+        moves.sort(key=lambda cell: -self.history[cell])
+        if bestMove is not None and bestMove in moves:
+            moves.remove(bestMove)
+            moves.insert(0, bestMove)
+        return moves
+
+
+    def negamax(self, depth: int, alpha: int, beta: int, color: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        if self.nbEmpty == 0:
+            return 0
+        if depth == 0:
+            return self.evaluate(color)
+
+        key = self.hash ^ self.sideKeys[color]
+        entry = self.table.get(key)
+        bestMove = None
+        if entry is not None:
+            entryDepth, score, flag, bestMove = entry
+            if entryDepth >= depth:
+                score = self.fromTableScore(score, ply)
+                if flag == EXACT:
+                    return score
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                elif flag == UPPER_BOUND:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        alphaOrigin = alpha
+        bestScore = -WIN_SCORE - 1
+        for cell in self.orderMoves(bestMove):
+            if self.play(cell, color):
+                score = WIN_SCORE - ply
+            else:
+                score = -self.negamax(depth - 1, -beta, -alpha, 1 - color, ply + 1)
+            self.undo(cell, color)
+
+            if score > bestScore:
+                bestScore = score
+                bestMove = cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self.history[cell] += depth * depth
+                break
+
+        if bestScore <= alphaOrigin:
+            flag = UPPER_BOUND
+        elif bestScore >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        if len(self.table) >= self.maxTableSize:
+            self.table.clear()
+        self.table[key] = (depth, self.toTableScore(bestScore, ply), flag, bestMove)
+        return bestScore
+
+
+    # Win scores depend on the distance to the root, they are stored relative to the node
+    def toTableScore(self, score: int, ply: int) -> int:
+        if abs(score) > WIN_SCORE - self.nbCells - 1:
+            return score + ply if score > 0 else score - ply
+        return score
+
+
+    def fromTableScore(self, score: int, ply: int) -> int:
+        if abs(score) > WIN_SCORE - self.nbCells - 1:
+            return score - ply if score > 0 else score + ply
+        return score
+
+
+    def getBestMove(self, state, color: int, timeBudget: float) -> tuple:
+        """
+        Search the best move of color within timeBudget seconds.
+        The move of the deepest completed iteration is returned.
+
+        Return:
+        -----------
+        (i, j)          : tuple. The cell to play, None if the board is full
+        """
+        self.deadline = time.perf_counter() + timeBudget
+        self.setState(state)
+        self.nodes = 0
+        self.history = [0] * self.nbCells
+
+        moves = self.orderMoves(None)
+        if not moves:
+            return None
+
+        bestMove = moves[0]
+        for depth in range(1, self.nbEmpty + 1):
+            try:
+                scores = {}
+                alpha = -WIN_SCORE - 1
+                for cell in moves:
+                    if self.play(cell, color):
+                        score = WIN_SCORE
+                    else:
+                        score = -self.negamax(depth - 1, -WIN_SCORE - 1, -alpha, 1 - color, 1)
+                    self.undo(cell, color)
+                    scores[cell] = score
+                    alpha = max(alpha, score)
+            except SearchTimeout:
+                self.setState(state)
+                break
+
+            moves.sort(key=lambda cell: -scores[cell])
+            bestMove = moves[0]
+            if abs(scores[bestMove]) > WIN_SCORE - self.nbCells - 1:
+                break # The game is solved from this position
+
+        return divmod(bestMove, self.size)
@@ -0,0 +1,250 @@
+import json
+import os
+import time
+import numpy as np
+
+from module.projection import CameraProjection
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+# A session is a directory with:
+#   metadata.json           the shapes of the frames, the chunk size, the number of frames and extra information
+#   color_0000.npy ...      (chunkSize, height, width, 3) uint8 color frames, memory-mappable
+#   depth_0000.npy ...      (chunkSize, height, width) depth frames, memory-mappable
+#   frames_0000.npy ...     (chunkSize, 2 + 3 * MAX_MARKERS) timestamp, number of markers and their positions
+#   detections_0000.npy ... (n, 8) frame index, class, confidence, x, y, d, w, h of each detection of the chunk
+
+METADATA_FILE = "metadata.json"
+MAX_MARKERS = 4
+
+
+def getChunkPath(directory: str, name: str, chunk: int) -> str:
+    return os.path.join(directory, f"{name}_{chunk:04d}.npy")
+
+
+class SessionRecorder:
+    """
+    Stream the frames of the camera and the detections to a session directory, chunk by chunk.
+    The frames are written in preallocated memory-mapped files, the detections of a chunk are saved when it is full.
+    """
+
+    def __init__(self, directory: str, chunkSize=256, metadata=None):
+        """
+        Parameters:
+        -----------
+        directory       : str. The session directory, created if needed
+        chunkSize       : int. Number of frames per chunk file
+        metadata        : dict. Extra information saved with the session (e.g. the camera projection)
+        """
+        self.directory = directory
+        self.chunkSize = chunkSize
+        self.metadata = dict(metadata) if metadata is not None else {}
+        os.makedirs(directory, exist_ok=True)
+
+        self.nbFrames = 0
+        self.chunk = -1
+        self.colors = None
+        self.depths = None
+        self.frames = None
+        self.detections = []
+        self.colorShape = None
+        self.depthShape = None
+        self.depthType = None
+
+
+    def openChunk(self, chunk: int):
+        self.closeChunk()
+        self.chunk = chunk
+        self.colors = np.lib.format.open_memmap(getChunkPath(self.directory, "color", chunk), mode="w+",
+                                                dtype=np.uint8, shape=(self.chunkSize, *self.colorShape))
+        self.depths = np.lib.format.open_memmap(getChunkPath(self.directory, "depth", chunk), mode="w+",
+                                                dtype=self.depthType, shape=(self.chunkSize, *self.depthShape))
+        self.frames = np.lib.format.open_memmap(getChunkPath(self.directory, "frames", chunk), mode="w+",
+                                                dtype=np.float64, shape=(self.chunkSize, 2 + 3 * MAX_MARKERS))
+
+
+    def closeChunk(self):
+        if self.chunk < 0:
+            return
+        for array in [self.colors, self.depths, self.frames]:
+            array.flush()
+        detections = np.concatenate(self.detections) if self.detections else np.empty((0, 8))
+        np.save(getChunkPath(self.directory, "detections", self.chunk), detections)
+        self.colors = self.depths = self.frames = None
+        self.detections = []
+        self.chunk = -1
+
+
+    def recordFrame(self, timestamp: float, color, depth, markers=()) -> int:
+        """
+        Append a frame to the session
+
+        Return:
+        -----------
+        index           : int. The index of the frame in the session
+        """
+        if self.colorShape is None:
+            self.colorShape = color.shape
+            self.depthShape = depth.shape
+            self.depthType = depth.dtype
+
+        index = self.nbFrames
+        chunk, k = divmod(index, self.chunkSize)
+        if chunk != self.chunk:
+            self.openChunk(chunk)
+
+        self.colors[k] = color
+        self.depths[k] = depth
+        markers = np.asarray(markers, dtype=np.float64).reshape(-1, 3)[:MAX_MARKERS]
+        self.frames[k] = 0.
+        self.frames[k, 0] = timestamp
+        self.frames[k, 1] = len(markers)
+        self.frames[k, 2:2 + markers.size] = markers.flatten()
+
+        self.nbFrames += 1
+        return index
+
+
+    def recordDetections(self, index: int, cls, conf, xydwh):
+        """
+        Record the detections of the frame index, it must belong to the current chunk
+        """
+        n = len(cls)
+        rows = np.empty((n, 8))
+        rows[:, 0] = index
+        rows[:, 1] = cls
+        rows[:, 2] = conf
+        rows[:, 3:8] = np.asarray(xydwh).reshape(n, 5)
+        self.detections.append(rows)
+
+
+    def close(self):
+        self.closeChunk()
+        metadata = {"nbFrames": self.nbFrames,
+                    "chunkSize": self.chunkSize,
+                    "colorShape": list(self.colorShape) if self.colorShape is not None else None,
+                    "depthShape": list(self.depthShape) if self.depthShape is not None else None,
+                    "depthType": np.dtype(self.depthType).str if self.depthType is not None else None,
+                    **self.metadata}
+        with open(os.path.join(self.directory, METADATA_FILE), "w") as file:
+            json.dump(metadata, file, indent=1)
+        logger.info(f"Session of {self.nbFrames} frames saved in {self.directory}")
+
+
+class SessionReader:
+    """
+    Read a session recorded by SessionRecorder, the chunks are memory-mapped
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, METADATA_FILE)) as file:
+            self.metadata = json.load(file)
+        self.nbFrames = self.metadata["nbFrames"]
+        self.chunkSize = self.metadata["chunkSize"]
+        self.chunks = {}
+
+
+    def __len__(self):
+        return self.nbFrames
+
+
+    def getChunk(self, chunk: int) -> tuple:
+        if chunk not in self.chunks:
+            self.chunks[chunk] = tuple(np.load(getChunkPath(self.directory, name, chunk), mmap_mode="r")
+                                       for name in ["color", "depth", "frames", "detections"])
+        return self.chunks[chunk]
+
+
+    def getFrame(self, index: int) -> tuple:
+        """
+        Return:
+        -----------
+        timestamp       : float. time.perf_counter() when the frame was recorded
+        color           : numpy.ndarray. The color image (memory-mapped, read-only)
+        depth           : numpy.ndarray. The depth image (memory-mapped, read-only)
+        markers         : numpy.ndarray. (n, 3) positions of the markers
+        """
+        if not 0 <= index < self.nbFrames:
+            raise IndexError(f"Frame {index} out of the {self.nbFrames} frames of the session")
+        chunk, k = divmod(index, self.chunkSize)
+        colors, depths, frames, _ = self.getChunk(chunk)
+        nbMarkers = int(frames[k, 1])
+        return frames[k, 0], colors[k], depths[k], np.array(frames[k, 2:2 + 3 * nbMarkers]).reshape(nbMarkers, 3)
+
+
+    def getDetections(self, index: int) -> tuple:
+        """
+        Return the recorded cls, conf and xydwh of the frame index
+        """
+        detections = self.getChunk(index // self.chunkSize)[3]
+        rows = detections[detections[:, 0] == index]
+        return rows[:, 1].astype(np.int64), rows[:, 2], rows[:, 3:8]
+
+
+class ReplayCamera:
+    """
+    Stand-in for EmioCamera which plays a recorded session: each update gives the next frame.
+
+    With realtime, update waits to reproduce the timing of the recording. The last frame is kept
+    at the end of the session, unless loop is set: isFinished then tells that the session is over.
+    With lockstep, the capture thread gives exactly the next recorded frame to each DHResults.getFrame,
+    so that two replays of a session see the same frames (see CaptureThread).
+    """
+
+    def __init__(self, directory: str, realtime=False, loop=False, lockstep=True):
+        self.session = SessionReader(directory)
+        self.realtime = realtime
+        self.loop = loop
+        self.lockstep = lockstep
+
+        self.index = -1
+        self.frame = None
+        self.depth_frame = None
+        self.trackers_pos = []
+        self.startTime = None
+        self.startTimestamp = None
+
+        projection = self.session.metadata.get("projection")
+        self.projection = CameraProjection.fromDict(projection) if projection is not None else None
+
+
+    def open(self):
+        self.index = -1
+        self.startTime = None
+
+
+    def close(self):
+        pass
+
+
+    def image_to_simulation(self, x, y, depth):
+        """
+        Position in the simulation frame of a pixel, with the projection recorded with the session
+        """
+        if self.projection is None:
+            raise ValueError("The session was recorded without the projection of the camera.")
+        return self.projection.project([[x, y, depth, 0, 0]])[0].tolist()
+
+
+    def isFinished(self) -> bool:
+        return not self.loop and self.index >= len(self.session) - 1
+
+
+    def update(self):
+        if len(self.session) == 0 or self.isFinished():
+            return
+        self.index = (self.index + 1) % len(self.session)
+        timestamp, color, depth, markers = self.session.getFrame(self.index)
+
+        if self.realtime:
+            if self.startTime is None or self.index == 0:
+                self.startTime, self.startTimestamp = time.perf_counter(), timestamp
+            delay = (timestamp - self.startTimestamp) - (time.perf_counter() - self.startTime)
+            if delay > 0:
+                time.sleep(delay)
+
+        self.frame = color
+        self.depth_frame = depth
+        self.trackers_pos = markers.tolist()
@@ -0,0 +1,155 @@
+import os
+import numpy as np
+
+from module.board import BitBoard, CellState, Results, getCellBit
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+SOLVED_GAME_PATH = os.path.join(os.path.dirname(__file__), 'solvedgame.npz')
+OCCUPIED = np.iinfo(np.int8).min # Score of a move on a non empty cell
+
+
+# Move scores are given from the point of view of the player to move:
+#   > 0 : the move wins,  the higher the score the faster the win  (10 - number of pawns at the end)
+#   = 0 : the move leads to a draw
+#   < 0 : the move loses, the lower the score the faster the loss
+def getStateCode(state) -> int:
+    """
+    Encode a 3x3 state (CellState values) into a base 3 integer
+    """
+    code = 0
+    for value in reversed(np.asarray(state).flatten()):
+        code = code * 3 + int(value)
+    return code
+
+
+def getKey(state, mover: int) -> int:
+    return getStateCode(state) * 2 + mover
+
+
+def getMovesOutcomes(scores):
+    """
+    Convert move scores to Results like outcomes: 1 win, 0 draw, -1 loss and OCCUPIED for non empty cells
+    """
+    scores = np.asarray(scores)
+    return np.where(scores == OCCUPIED, OCCUPIED, np.sign(scores)).astype(np.int8)
+
+
+class GameSolver:
+    """
+    Negamax solver of the 3x3 game working on BitBoard masks
+    """
+
+    def __init__(self):
+        self.solved = {} # (dogs, cats, mover) -> scores of the 9 moves
+
+
+    def getMovesScores(self, dogs: int, cats: int, mover: int) -> np.ndarray:
+        """
+        Return the scores of the 9 moves for the player mover
+        """
+        key = (dogs, cats, mover)
+        if key in self.solved:
+            return self.solved[key]
+
+        scores = np.full(9, OCCUPIED, dtype=np.int8)
+        occupied = dogs | cats
+        nbPawns = bin(occupied).count("1") + 1
+        board = BitBoard.fromMasks(dogs, cats)
+        for bit in range(9):
+            if occupied >> bit & 1:
+                continue
+            board.play(bit // 3, bit % 3, mover)
+            winner = board.getWinner()
+            if winner == mover:
+                scores[bit] = 10 - nbPawns
+            elif winner == Results.DRAW.value:
+                scores[bit] = 0
+            else:
+                scores[bit] = -self.getMovesScores(*board.masks, 1 - mover).max()
+            board.undo()
+
+        self.solved[key] = scores
+        return scores
+
+
+    def solveAll(self) -> dict:
+        """
+        Solve every position reachable from the empty board, whichever color starts
+
+        Return:
+        -----------
+        table           : dict. key (see getKey) -> scores of the 9 moves
+        """
+        table = {}
+        toVisit = [(0, 0, CellState.DOG.value), (0, 0, CellState.CAT.value)]
+        while toVisit:
+            dogs, cats, mover = toVisit.pop()
+            board = BitBoard.fromMasks(dogs, cats)
+            key = getKey(board.state, mover)
+            if key in table or board.hasWinner():
+                continue
+
+            table[key] = self.getMovesScores(dogs, cats, mover)
+            for bit in range(9):
+                if not (dogs | cats) >> bit & 1:
+                    masks = [dogs, cats]
+                    masks[mover] |= 1 << bit
+                    toVisit.append((masks[0], masks[1], 1 - mover))
+
+        return table
+
+
+def generateSolvedGameTable(path=SOLVED_GAME_PATH):
+    """
+    Solve all the reachable positions and save the move scores in a compressed numpy file
+    """
+    table = GameSolver().solveAll()
+    keys = np.array(sorted(table), dtype=np.uint32)
+    scores = np.array([table[key] for key in keys], dtype=np.int8)
+    np.savez_compressed(path, keys=keys, scores=scores)
+    logger.info(f"Solved {len(keys)} positions, saved in {path}")
+
+
+class SolvedGameTable:
+    """
+    Lookup table of the solved game, loaded from the file written by generateSolvedGameTable
+    The file is generated on the first load if it does not exist
+    """
+
+    def __init__(self, path=SOLVED_GAME_PATH):
+        if not os.path.exists(path):
+            generateSolvedGameTable(path)
+
+        with np.load(path) as data:
+            self.scores = data['scores']
+            self.rows = {int(key): row for row, key in enumerate(data['keys'])}
+
+        self.solver = None
+
+
+    def getMovesScores(self, state, mover: int) -> np.ndarray:
+        """
+        Return the 3x3 scores of the moves of the player mover.
+        Positions that cannot be reached in a regular game (e.g. after a board correction) are solved on the fly.
+        """
+        row = self.rows.get(getKey(state, mover))
+        if row is not None:
+            return self.scores[row].reshape(3, 3)
+
+        if self.solver is None:
+            self.solver = GameSolver()
+        state = np.asarray(state)
+        masks = [0, 0]
+        for i, j in zip(*np.nonzero(state != CellState.EMPTY.value)):
+            masks[int(state[i][j])] |= getCellBit(i, j)
+        return self.solver.getMovesScores(masks[0], masks[1], mover).reshape(3, 3)
+
+
+    def getMovesOutcomes(self, state, mover: int) -> np.ndarray:
+        return getMovesOutcomes(self.getMovesScores(state, mover))
+
+
+if __name__ == "__main__":
+    generateSolvedGameTable()
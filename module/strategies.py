@@ -0,0 +1,189 @@
+import random
+import numpy as np
+
+from enum import Enum
+from module.board import BoardPool, CellState
+from module.search import AlphaBetaSearch
+from module.solvedgame import SolvedGameTable, OCCUPIED
+from module.strategycache import StrategyCache
+
+
+class Strategies(Enum):
+    """
+    Enum to define the strategies of the computer player
+    """
+    RANDOM = 'r'
+    EASY = 'e'
+    HARD = 'h'
+    IMPOSSIBLE = 'i'
+    SEARCH = 's'
+
+
+# The strategies only depend on numpy, they can be used without Sofa, the camera or DarkHelp.
+# Every strategy has the signature (state, myColor, theirColor) -> (i, j), or None if the board is full.
+# The size of the board is given by the state, with the default win length (see getDefaultWinLength).
+# The solved game table only covers the 3x3 board, the hard and impossible strategies use the
+# alpha-beta search on the larger boards.
+
+SEARCH_TIME_BUDGET = 1. # seconds per move
+FALLBACK_TIME_BUDGET = 0.1 # seconds per move of optimalFallbackStrategy, enough to solve the 3x3 board
+
+boardPool = BoardPool() # Scratch boards used by the move evaluations
+solvedGameTable = None  # Loaded on the first use, see getSolvedGameTable
+searches = {}           # size -> AlphaBetaSearch, the transposition tables are kept between moves
+fallbackSearches = {}   # size -> AlphaBetaSearch of optimalFallbackStrategy, apart from a search which timed out
+
+
+def getSolvedGameTable() -> SolvedGameTable:
+    global solvedGameTable
+    if solvedGameTable is None:
+        solvedGameTable = SolvedGameTable()
+    return solvedGameTable
+
+
+def getSearch(size: int) -> AlphaBetaSearch:
+    if size not in searches:
+        searches[size] = AlphaBetaSearch(size)
+    return searches[size]
+
+
+def getEasyMovesScores(state, myColor, theirColor):
+    """
+    Scores of the moves of the easy strategy, look only for the next move:
+    2 if the move wins, 1 if it blocks the opponent, 0 otherwise
+
+    Return:
+    -----------
+    scores          : numpy.ndarray. The scores of the moves, OCCUPIED for non empty cells
+    """
+    size = len(state)
+    scores = np.full((size, size), OCCUPIED, dtype=np.int8)
+    with boardPool.scratch(state) as board:
+        for i in range(size):
+            for j in range(size):
+                if state[i][j] == CellState.EMPTY.value:
+                    scores[i][j] = 0
+                    board.push(i, j, theirColor)
+                    if board.getWinner() == theirColor:
+                        scores[i][j] = 1
+                    board.pop()
+                    board.push(i, j, myColor)
+                    if board.getWinner() == myColor:
+                        scores[i][j] = 2
+                    board.pop()
+    return scores
+
+
+def getOptimalMovesScores(state, myColor, theirColor):
+    """
+    Scores of the moves looked up in the solved game table
+    """
+    return getSolvedGameTable().getMovesScores(state, myColor)
+
+
+# Transposition caches of the move evaluations, keyed on the canonical board
+strategyCaches = {
+                    Strategies.EASY.value       : StrategyCache(getEasyMovesScores),
+                    Strategies.IMPOSSIBLE.value : StrategyCache(getOptimalMovesScores),
+                 }
+
+
+def chooseBestMove(scores, rand=False):
+    """
+    Choose one of the moves with the best score
+
+    Parameters:
+    -----------
+    scores          : numpy.ndarray. The scores of the moves, OCCUPIED for non empty cells
+    rand            : bool. If True, one time out of five choose a random move instead of the best one
+
+    Return:
+    -----------
+    (i, j)          : tuple. The cell to play, None if the board is full
+    """
+    emptyCells = list(zip(*np.nonzero(scores != OCCUPIED)))
+    if not emptyCells:
+        return None
+
+    if rand and random.randint(1, 5) == 1:
+        i, j = random.choice(emptyCells)
+    else:
+        bestScore = max(scores[i][j] for i, j in emptyCells)
+        i, j = random.choice([(i, j) for i, j in emptyCells if scores[i][j] == bestScore])
+
+    return (int(i), int(j))
+
+
+def randomStrategy(state, myColor, theirColor):
+    """
+    Random strategy
+    """
+    emptyCells = [(i, j) for i in range(len(state)) for j in range(len(state)) if state[i][j] == CellState.EMPTY.value]
+    if not emptyCells:
+        return None
+    return random.choice(emptyCells)
+
+
+def easyStrategy(state, myColor, theirColor):
+    """
+    Strategy that lead to a draw, look only for the next move and could be counter
+    """
+    scores = strategyCaches[Strategies.EASY.value].getMovesScores(state, myColor, theirColor)
+    return chooseBestMove(scores)
+
+
+def hardStrategy(state, myColor, theirColor):
+    """
+    Optimal strategy, but one time out of five play a random move
+    """
+    if len(state) != 3:
+        if random.randint(1, 5) == 1:
+            return randomStrategy(state, myColor, theirColor)
+        return searchStrategy(state, myColor, theirColor)
+
+    scores = strategyCaches[Strategies.IMPOSSIBLE.value].getMovesScores(state, myColor, theirColor)
+    return chooseBestMove(scores, rand=True)
+
+
+def impossibleStrategy(state, myColor, theirColor):
+    """
+    Optimal strategy, either win or make a draw
+    """
+    if len(state) != 3:
+        return searchStrategy(state, myColor, theirColor)
+
+    scores = strategyCaches[Strategies.IMPOSSIBLE.value].getMovesScores(state, myColor, theirColor)
+    return chooseBestMove(scores)
+
+
+def searchStrategy(state, myColor, theirColor, timeBudget=None):
+    """
+    Alpha-beta search with iterative deepening, within timeBudget seconds (SEARCH_TIME_BUDGET by default)
+    """
+    if timeBudget is None:
+        timeBudget = SEARCH_TIME_BUDGET
+    return getSearch(len(state)).getBestMove(state, myColor, timeBudget)
+
+
+def optimalFallbackStrategy(state, myColor, theirColor):
+    """
+    Fast optimal strategy, used by the registry when the hard or impossible strategies exceed their budget.
+    Look up the solved game table on the 3x3 board once it is loaded, search within FALLBACK_TIME_BUDGET otherwise.
+    The strategy which timed out may still be running: its search is not shared.
+    """
+    size = len(state)
+    if size == 3 and solvedGameTable is not None:
+        return chooseBestMove(solvedGameTable.getMovesScores(state, myColor))
+
+    if size not in fallbackSearches:
+        fallbackSearches[size] = AlphaBetaSearch(size)
+    return fallbackSearches[size].getBestMove(state, myColor, FALLBACK_TIME_BUDGET)
+
+
+STRATEGIES = {
+                Strategies.RANDOM.value     : randomStrategy,
+                Strategies.EASY.value       : easyStrategy,
+                Strategies.HARD.value       : hardStrategy,
+                Strategies.IMPOSSIBLE.value : impossibleStrategy,
+                Strategies.SEARCH.value     : searchStrategy,
+             }
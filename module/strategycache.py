@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+
+from module.board import CellState
+
+
+@lru_cache(maxsize=None)
+def getSymmetries(size=3) -> np.ndarray:
+    """
+    Return the 8 symmetries of the square (4 rotations, with and without a flip) as
+    permutations of the flattened board: transformed.flat[k] = state.flat[symmetries[s][k]]
+    """
+    indices = np.arange(size * size).reshape(size, size)
+    symmetries = []
+    for k in range(4):
+        symmetries.append(np.rot90(indices, k).flatten())
+        symmetries.append(np.fliplr(np.rot90(indices, k)).flatten())
+    return np.array(symmetries)
+
+
+@lru_cache(maxsize=None)
+def getPowers(size=3) -> np.ndarray:
+    """
+    Powers of 3 to encode the transformed boards and sort them in lexicographic order.
+    The codes fit in 64 bits up to the 6x6 board.
+    """
+    return 3 ** np.arange(size * size - 1, -1, -1, dtype=np.int64)
+
+SYMMETRIES = getSymmetries(3)
+
+
+def getCanonicalForm(state, myColor: int, theirColor: int):
+    """
+    Compute the canonical form of a board under the 8 symmetries.
+    The colors are relabeled so that the player to move is always the dog.
+
+    Return:
+    -----------
+    canonical       : numpy.ndarray. The flattened canonical state
+    code            : int. Base 3 code of the canonical state, used as a key
+    symmetry        : numpy.ndarray. The permutation from the real board to the canonical board
+    """
+    size = len(state)
+    state = np.asarray(state).flatten()
+    relabeled = np.full(size * size, CellState.EMPTY.value)
+    relabeled[state == myColor] = CellState.DOG.value
+    relabeled[state == theirColor] = CellState.CAT.value
+
+    symmetries = getSymmetries(size)
+    transformed = relabeled[symmetries]
+    codes = transformed @ getPowers(size)
+    s = int(np.argmin(codes))
+    return transformed[s], int(codes[s]), symmetries[s]
+
+
+class StrategyCache:
+    """
+    Transposition cache of a move evaluation function, keyed on the canonical form of the board.
+
+    The evaluation function has the signature (state, myColor, theirColor) -> scores of the moves,
+    it is only called on canonical boards (the player to move is the dog) and its results are
+    mapped back to the real orientation. The least recently used entries are evicted once maxSize is reached.
+    Random choices must be made on the returned scores, not in the evaluation function.
+    """
+
+    def __init__(self, evaluate, maxSize=4096):
+        self.evaluate = evaluate
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+
+    def getMovesScores(self, state, myColor: int, theirColor: int) -> np.ndarray:
+        """
+        Return the scores of the moves of myColor, in the orientation of state
+        """
+        size = len(state)
+        canonical, code, symmetry = getCanonicalForm(state, myColor, theirColor)
+
+        key = (size, code)
+        scores = self.entries.get(key)
+        if scores is None:
+            self.misses += 1
+            scores = np.asarray(self.evaluate(canonical.reshape(size, size), CellState.DOG.value, CellState.CAT.value)).flatten()
+            self.entries[key] = scores
+            if len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        realScores = np.empty_like(scores)
+        realScores[symmetry] = scores
+        return realScores.reshape(size, size)
+
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass, field
+from functools import partial
+
+from module.strategies import Strategies, STRATEGIES, SEARCH_TIME_BUDGET, randomStrategy, searchStrategy, optimalFallbackStrategy
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+# Latencies are accumulated in log-spaced histograms (in seconds), from 100 ns to 10 s
+LATENCY_BINS = np.logspace(-7, 1, 161)
+
+
+def getPercentile(histogram, percentile: float) -> float:
+    """
+    Upper bound of the histogram bin containing the given percentile
+    """
+    cumulative = np.cumsum(histogram)
+    if cumulative[-1] == 0:
+        return float('nan')
+    index = np.searchsorted(cumulative, percentile / 100. * cumulative[-1])
+    return LATENCY_BINS[index + 1]
+
+
+def getHistogramIndex(latency: float) -> int:
+    """
+    Bin of the latency (in seconds) in the histograms
+    """
+    return int(np.clip(np.searchsorted(LATENCY_BINS, latency, side='right') - 1, 0, len(LATENCY_BINS) - 2))
+
+
+@dataclass
+class StrategyEntry:
+    """
+    A strategy of the registry, see StrategyRegistry.register
+    """
+    key: str
+    name: str
+    function: callable
+    budget: float       # seconds
+    fallback: callable
+    # Durations of the decisions of the strategy, including the ones which exceeded the budget
+    histogram: np.ndarray = field(default_factory=lambda: np.zeros(len(LATENCY_BINS) - 1, dtype=np.int64))
+    count: int = 0
+    totalTime: float = 0.
+    maxTime: float = 0.
+    # Latencies of the moves where the fallback was played (budget wait and fallback decision)
+    fallbackHistogram: np.ndarray = field(default_factory=lambda: np.zeros(len(LATENCY_BINS) - 1, dtype=np.int64))
+    overruns: int = 0   # number of moves where the fallback was played
+    fallbackMaxTime: float = 0.
+
+
+class StrategyRegistry:
+    """
+    Registry of the strategies of the computer player.
+    Each strategy declares a latency budget: every decision is timed into a histogram, and the
+    fallback move is played if the strategy did not answer within its budget. The decisions which exceed
+    the budget keep running and their full duration is recorded when they finish.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="strategy")
+        self.pending = None # Decision still running after its budget was exceeded
+        self.lock = threading.Lock() # The durations of the decisions are recorded by the strategy thread
+
+
+    def register(self, key: str, name: str, function, budget: float, fallback=randomStrategy):
+        """
+        Register a strategy
+
+        Parameters:
+        -----------
+        key             : str. The key the user types to choose the strategy
+        name            : str. The name displayed to the user
+        function        : callable. The strategy (state, myColor, theirColor) -> (i, j)
+        budget          : float. The latency budget of a decision in seconds
+        fallback        : callable. The strategy used when the budget is exceeded, it must be fast
+        """
+        self.entries[key] = StrategyEntry(key, name, function, budget, fallback)
+
+
+    def keys(self) -> list:
+        return list(self.entries)
+
+
+    def get(self, key: str):
+        """
+        Return the instrumented strategy (state, myColor, theirColor) -> (i, j) of key, None if it is not registered
+        """
+        if key not in self.entries:
+            return None
+        return partial(self.play, key)
+
+
+    def play(self, key: str, state, myColor: int, theirColor: int):
+        """
+        Run the strategy key within its budget, and record its latency
+        """
+        entry = self.entries[key]
+        t0 = time.perf_counter()
+
+        move = None
+        if self.pending is None or self.pending.done():
+            self.pending = self.executor.submit(self.runDecision, entry, t0, np.copy(state), myColor, theirColor)
+            try:
+                move = self.pending.result(timeout=entry.budget)
+                self.pending = None
+            except TimeoutError:
+                pass
+
+        if self.pending is not None:
+            # The budget is exceeded, or the previous overrun decision is still running
+            logger.debug(f"Strategy {entry.name} exceeded its budget of {entry.budget * 1000:.0f} ms, playing the fallback move.")
+            move = entry.fallback(state, myColor, theirColor)
+            latency = time.perf_counter() - t0
+            with self.lock:
+                entry.overruns += 1
+                entry.fallbackMaxTime = max(entry.fallbackMaxTime, latency)
+                entry.fallbackHistogram[getHistogramIndex(latency)] += 1
+
+        return move
+
+
+    def runDecision(self, entry: StrategyEntry, t0: float, state, myColor: int, theirColor: int):
+        """
+        Run the strategy in the strategy thread, and record the duration of the decision when it finishes,
+        even after its budget. It is recorded before the move is published, so the stats are up to date
+        when play returns.
+        """
+        try:
+            return entry.function(state, myColor, theirColor)
+        finally:
+            latency = time.perf_counter() - t0
+            with self.lock:
+                entry.count += 1
+                entry.totalTime += latency
+                entry.maxTime = max(entry.maxTime, latency)
+                entry.histogram[getHistogramIndex(latency)] += 1
+
+
+    def getStats(self) -> dict:
+        """
+        Decision latency statistics of each strategy (in milliseconds)
+        """
+        stats = {}
+        with self.lock:
+            for key, entry in self.entries.items():
+                stats[key] = {"name": entry.name,
+                              "budget_ms": entry.budget * 1e3,
+                              "count": entry.count,
+                              "mean_ms": entry.totalTime / entry.count * 1e3 if entry.count else float('nan'),
+                              "max_ms": entry.maxTime * 1e3,
+                              "p50_ms": getPercentile(entry.histogram, 50) * 1e3,
+                              "p90_ms": getPercentile(entry.histogram, 90) * 1e3,
+                              "p99_ms": getPercentile(entry.histogram, 99) * 1e3,
+                              "histogram": entry.histogram.tolist(),
+                              "overruns": entry.overruns,
+                              "fallback_max_ms": entry.fallbackMaxTime * 1e3,
+                              "fallback_p99_ms": getPercentile(entry.fallbackHistogram, 99) * 1e3,
+                              "fallback_histogram": entry.fallbackHistogram.tolist()}
+        return stats
+
+
+    def exportStats(self, path: str):
+        """
+        Save the statistics of getStats and the bins of the histograms (in seconds) in a JSON file
+        """
+        with open(path, "w") as file:
+            json.dump({"bins_s": LATENCY_BINS.tolist(), "strategies": self.getStats()}, file, indent=1)
+
+
+def createDefaultRegistry() -> StrategyRegistry:
+    """
+    Registry of the built-in strategies
+    """
+    registry = StrategyRegistry()
+    registry.register(Strategies.RANDOM.value,     "random",     STRATEGIES[Strategies.RANDOM.value],     budget=0.05)
+    registry.register(Strategies.EASY.value,       "easy",       STRATEGIES[Strategies.EASY.value],       budget=0.1)
+    registry.register(Strategies.HARD.value,       "hard",       STRATEGIES[Strategies.HARD.value],       budget=0.5 + SEARCH_TIME_BUDGET,
+                      fallback=optimalFallbackStrategy)
+    registry.register(Strategies.IMPOSSIBLE.value, "impossible", STRATEGIES[Strategies.IMPOSSIBLE.value], budget=0.5 + SEARCH_TIME_BUDGET,
+                      fallback=optimalFallbackStrategy)
+    registry.register(Strategies.SEARCH.value,     "search",     partial(searchStrategy, timeBudget=SEARCH_TIME_BUDGET),
+                      budget=0.5 + SEARCH_TIME_BUDGET, fallback=optimalFallbackStrategy)
+    return registry
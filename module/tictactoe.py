@@ -1,30 +1,18 @@
-import random
-import copy
 import numpy as np
 import os
 import cv2 as cv
 
 import Sofa
 
-from enum import Enum
-from module.board import Board, CellState, Results
+from module.board import Board, BoardPool, CellState, Results
 from module.emio import createScene as createEmioScene
+from module.trajectory import Waypoint
 
 from module.dhresults import DHResults, Classes
 from module.loggerconfig import getLogger
 logger = getLogger()
 
 
-class Strategies(Enum):
-    """
-    Enum to define the strategies of the computer player
-    """
-    RANDOM = 'r'
-    EASY = 'e'
-    HARD = 'h'
-    IMPOSSIBLE = 'i'
-
-
 class TicTacToe () : 
     """
     This class has every methods to play tic tac toe
@@ -36,6 +24,7 @@ class TicTacToe () :
 
         """
         self.board = Board(boardState)
+        self.boardPool = BoardPool() # Scratch boards used by the detection
         self.dhresults = dhresults
         self.camera = self.dhresults.camera
 
@@ -49,20 +38,14 @@ class TicTacToe () :
         self.photo = False
         self.photoID = 1
 
-        self.strategies = {
-                            Strategies.RANDOM.value     : self.randomStrategy,
-                            Strategies.EASY.value       : self.easyStrategy,
-                            Strategies.HARD.value       : lambda : self.optimalStrategy(rand=True),
-                            Strategies.IMPOSSIBLE.value : lambda : self.optimalStrategy(rand=False),
-                          }
-        self.chosenStrategy = None
+        self.chosenStrategy = None # Strategy function (state, myColor, theirColor) -> (i, j), see module.strategies
        
         self.restPosition = np.array([0, -160, 0])
         self.restOpeningDistance = 35
 
         # Initialize Emio simulation
         self.simulation = Sofa.Core.Node("rootnode")
-        createEmioScene(self.simulation, self.camera)
+        createEmioScene(self.simulation, self.dhresults.capture)
         Sofa.Simulation.init(self.simulation)
         # Emio set up animation
         for i in range(200):
@@ -106,176 +89,6 @@ class TicTacToe () :
         return position
     
 
-    def randomStrategy(self):
-        """
-        Random strategy
-
-        Return:
-        -----------
-        position        : numpy.ndarray. The real world position of Emio's next move
-        """
-
-        emptyCells = [(i, j) for i in range(3) for j in range(3) if self.board.state[i][j] == CellState.EMPTY.value]
-        if not emptyCells:
-            return None
-        while True:
-            i, j = random.choice(emptyCells)
-            if  self.board.state[i][j] == CellState.EMPTY.value:
-                self.board.state[i][j] = self.computerColor
-                return self.__emioPlays(i, j)
-
-
-    def easyStrategy(self):
-        """
-        Strategy that lead to a draw, look only for the next move and could be counter
-
-        Return:
-        -----------
-        position        : numpy.ndarray. The real world position of Emio's next move
-
-        """
-
-        board = Board(copy.deepcopy(self.board.state))
-        # Check if Emio can win
-        for i in range(3):
-            for j in range(3):
-                if self.board.state[i][j] == CellState.EMPTY.value:
-                    board.state[i][j] = self.computerColor
-                    if board.getWinner() == self.computerColor:
-                        self.board.state[i][j] = self.computerColor
-                        return self.__emioPlays(i, j)
-                    board.state[i][j] = CellState.EMPTY.value   
-
-        # Check if the human can win
-        for i in range(3):
-            for j in range(3):
-                if self.board.state[i][j] == CellState.EMPTY.value:
-                    board.state[i][j] = self.humanColor
-                    if board.getWinner() == self.humanColor:
-                        self.board.state[i][j] = self.computerColor
-                        return self.__emioPlays(i, j)
-                    board.state[i][j] = CellState.EMPTY.value
-                    
-
-        # If no one can win on the next move, play a random move
-        emptyCells = [(i, j) for i in range(3) for j in range(3) if self.board.state[i][j] == CellState.EMPTY.value]
-        if emptyCells:
-            i, j = random.choice(emptyCells)
-            self.board.state[i][j] = self.computerColor
-            return self.__emioPlays(i, j)
-
-
-    def optimalStrategy(self, rand=False):
-        """
-        Optimal strategy, either win or make a draw
-
-        Return:
-        -----------
-        position        : numpy.ndarray. The real world position of Emio's next move
-        """
-
-        board = Board(copy.deepcopy(self.board.state))
-        if rand:
-            n = random.randint(1, 5)
-            if n==1:
-                emptyCell = [(i, j) for i in range(3) for j in range(3) if self.board.state[i][j] == CellState.EMPTY.value]
-                if not emptyCell:
-                    return None
-                while True:
-                    i, j = random.choice(emptyCell)
-                    if  self.board.state[i][j] == Classes.EMPTY.value:
-                        self.board.state[i][j] = self.computerColor
-                        return self.__emioPlays(i, j)
-
-        if (board.isEqual([[self.humanColor, 0, 0],  [0, self.computerColor, 0], [0, 0, self.humanColor]]) 
-            or board.isEqual([[0, 0, self.humanColor], [0, self.computerColor, 0], [self.humanColor, 0, 0]])) :
-            self.board.state[0][1]=self.computerColor
-            return self.__emioPlays(0, 1)
-        
-        if board.isEqual([[0, self.humanColor, 0], [self.humanColor, self.computerColor, 0], [0, 0, 0]])  :
-            self.board.state[0][0]=self.computerColor
-            return self.__emioPlays(0, 0)
-        
-        if board.isEqual([[0, self.humanColor, 0], [0, self.computerColor, self.humanColor], [0, 0, 0]])  :
-            self.board.state[0][2]=self.computerColor
-            return self.__emioPlays(0, 2)
-        
-        if board.isEqual([[0, 0, 0], [0, self.computerColor, self.humanColor], [0, self.humanColor, 0]]) :
-            self.board.state[2][2]=self.computerColor
-            return self.__emioPlays(2, 2)
-        
-        if board.isEqual([[0, 0, 0], [self.humanColor, self.computerColor, 0], [0, self.humanColor, 0]]) :
-            self.board.state[2][0]=self.computerColor
-            return self.__emioPlays(2, 0)
-      
-        if (board.isEqual([[0, self.humanColor, 0], [0, self.computerColor, 0], [0, 0, self.humanColor]])
-            or board.isEqual([[self.humanColor, 0, 0], [0, self.computerColor, self.humanColor], [0, 0, 0]])) :
-            self.board.state[0][2]=self.computerColor
-            return self.__emioPlays(0, 2)
-        
-        if (board.isEqual([[0, self.humanColor, 0], [0, self.computerColor, 0], [self.humanColor, 0, 0]])
-            or board.isEqual([[0, 0, self.humanColor], [self.humanColor, self.computerColor, 0], [0, 0, 0]]))  :
-            self.board.state[0][0]=self.computerColor
-            return self.__emioPlays(0, 0)
-        if (board.isEqual([[self.humanColor, 0, 0], [0, self.computerColor, 0], [0, self.humanColor, 0]])
-             or board.isEqual([[0, 0, 0], [self.humanColor, self.computerColor, 0], [0, 0, self.humanColor]]))  :
-            self.board.state[2][0]=self.computerColor
-            return self.__emioPlays(0, 2)
-        
-        if (board.isEqual([[0, 0, self.humanColor], [0, self.computerColor, 0], [0, self.humanColor, 0]])
-             or board.isEqual([[0, 0, 0], [0, self.computerColor, self.humanColor], [self.humanColor, 0, 0]]))  :
-            self.board.state[2][2]=self.computerColor
-            return self.__emioPlays(2, 2)
-        
-        # First priority : win
-        for i in range(3):
-            for j in range(3):
-                if board.state[i][j] == CellState.EMPTY.value:
-                    board.state[i][j] = self.computerColor
-                    if board.getWinner() == self.computerColor:
-                        self.board.state[i][j] = self.computerColor
-                        return self.__emioPlays(i, j)
-                    board.state[i][j] =  CellState.EMPTY.value
-        
-        # Second priority : block the human
-        for i in range(3):
-            for j in range(3):
-                if board.state[i][j] == CellState.EMPTY.value:
-                    board.state[i][j] = self.humanColor
-                    if board.getWinner() ==  self.humanColor:
-                        self.board.state[i][j] = self.computerColor
-                        return self.__emioPlays(i, j)
-                    board.state[i][j] = CellState.EMPTY.value
-
-        # Third priority : play the center
-        if board.state[1][1] == CellState.EMPTY.value:
-            self.board.state[1][1] = self.computerColor
-            return self.__emioPlays(1, 1)
-        
-        # Forth priority : play a corner
-        for i, j in [(0,2), (0,0), (2,0), (2,2)]:
-            if board.state[i][j] == CellState.EMPTY.value:
-                self.board.state[i][j] = self.computerColor
-                return self.__emioPlays(i, j)
-        
-        # Fifth priority : play a side
-        for i, j in [(0,1), (1,0), (1,2), (2,1)]:
-            if board.state[i][j] == CellState.EMPTY.value:
-                self.board.state[i][j] = self.computerColor
-                return self.__emioPlays(i, j)
-        
-        return None
-
-
-    def imageToSimulationPosition(self, x, y, z):
-        """
-        We only use x and z position in this program  
-        """
-        position = [0, 0]
-        position[0], _, position[1] = self.camera.image_to_simulation(int(x), int(y), z)
-        return position
-
-
     def getNearestStorageCube(self, color, cellPosition) -> list[float]:
         """
         Parameters:
@@ -287,62 +100,46 @@ class TicTacToe () :
         -----------
         cubePosition
         """
-        xydwh = self.dhresults.xydwh
-        cls = self.dhresults.cls
-        prob = self.dhresults.conf
-
-        distance_min = np.finfo(np.float32).max
-        nearestStoragePosition = None
-        for i in range(len(cls)):
-            
-            # If the object is the color emio's playing
-            if int(cls[i]) == color and prob[i] > 0.6:
+        scene = self.dhresults.getSnapshot(self.board)
 
-                position = self.imageToSimulationPosition(xydwh[i][0], xydwh[i][1], xydwh[i][2])
+        cellIndices = self.board.positionToCellIndices(cellPosition[0], cellPosition[1])
+        distanceTable = self.board.getStorageDistanceTable()
 
-                # If the position is valid
-                if position is None:
-                    logger.debug("Problem with the estimated position.")
-                    continue 
-                
-                if not self.board.isInPlayZone(position[0], position[1]):
-                    # If the object is not on the play zone
-                    distance = np.linalg.norm(np.array(cellPosition)-np.array(position))
-                    storageIndex = self.board.positionToStorageIndex(position[0], position[1])
-                    storagePosition = self.board.storageIndexToPosition(storageIndex)
-                    logger.debug(f"Found a cube to play, not in play zone: {position, Classes._member_names_[int(cls[i])], distance, storageIndex, storagePosition}")
-                    # Take the closest object
-                    if distance < distance_min:
-                        distance_min = distance
-                        nearestStoragePosition = np.copy(storagePosition)
+        # The confident cubes of Emio's color in the storage zone
+        candidates = np.flatnonzero((scene.cls == color) & scene.isConfident & (scene.storageIndices >= 0))
+        nearestStorageIndex = None
+        if len(candidates):
+            # Take the closest object
+            storageIndices = scene.storageIndices[candidates]
+            distances = distanceTable.getDistance(*cellIndices, storageIndices)
+            nearestStorageIndex = int(storageIndices[np.argmin(distances)])
 
         # If it has found an object to play
-        if nearestStoragePosition is None:
+        if nearestStorageIndex is None:
             logger.info("I did not find a cube to play.")
             return None
         
+        nearestStoragePosition = np.array(distanceTable.slotPositions[nearestStorageIndex])
         logger.debug(f"Found a cube to play, nearest from cell position: {nearestStoragePosition}")
         return nearestStoragePosition
         
     
     def getNearestEmptyStoragePosition(self, cubePosition) -> list[float]:
         """
+        Parameters:
+        -----------
+        cubePosition    : list[float]. The position of a cell of the play zone
+
         Return:
         -----------
-        cellPosition
+        cellPosition    : tuple. The position of the nearest empty storage slot, None if the storage is full
         """
-        distance_min = np.finfo(np.float32).max
-        closestCellPosition = None
-
-        for i in range(len(self.board.storage)):
-            if self.board.storage[i] == Classes.EMPTY.value:
-                cellPosition = self.board.storageIndexToPosition(i) # Chose a position of an empty box in the storage zone of the good class            
-                distance = np.linalg.norm(np.array(cellPosition) - np.array(cubePosition))
-                if distance < distance_min:
-                    closestCellPosition = cellPosition
-                    distance_min = distance
-
-        return closestCellPosition
+        i, j = self.board.positionToCellIndices(cubePosition[0], cubePosition[1])
+        distanceTable = self.board.getStorageDistanceTable()
+        storageIndex = distanceTable.getNearestEmptySlot(i, j, self.board.storageMask)
+        if storageIndex is None:
+            return None
+        return distanceTable.slotPositions[storageIndex]
 
 
     def userPlayed(self) -> bool:
@@ -352,64 +149,52 @@ class TicTacToe () :
         Do not trigger if several changes are detected
         Do not detect change if the position or the depth are miscalculated
         """
-        cls = self.dhresults.cls
-        xydwh = self.dhresults.xydwh 
-
-        playZone_cls = [] # List of classes of the detected objects in the play zone
+        scene = self.dhresults.getSnapshot(self.board)
 
-        new_board = Board()
-        new_boardstate = new_board.state # New board state after the change detection
-        
         if self.dhresults.isHandDetected(): # If a hand is detected, return
             return False
-        
-        for i in range(len(cls)): # Loop on the detected classes
-            
-            position = self.imageToSimulationPosition(xydwh[i][0], xydwh[i][1], xydwh[i][2])
 
-            # If the position is not valid no change detected
-            if position is None:
-                logger.debug("Problem with the estimated position.")
-                return False
+        # If a position is not valid in or near the play zone no change detected, the detections elsewhere
+        # (e.g. in the storage zone) do not change the board state
+        if (~scene.isValid & scene.nearPlayZone).any():
+            logger.debug("Problem with the estimated position.")
+            return False
 
-            # We only look object in the play zone
-            if self.board.isInPlayZone(position[0], position[1]):
-                playZone_cls.append(cls[i]) 
-                a, b = self.board.positionToCellIndices(position[0], position[1])
-                if cls[i] != Classes.EMPTY.value: 
-                    new_boardstate[a][b] = int(cls[i])
-                    
-        changes = []
-        # Check that there is only one change in the board state
-        for i in range(3):
-            for j in range(3):
-                if self.board.state[i][j] != new_boardstate[i][j]:
-                    changes.append((i, j, CellState._member_names_[new_boardstate[i][j]]))
+        with self.boardPool.scratch(size=self.board.size) as new_board:
+            new_boardstate = new_board.state # New board state after the change detection
+            scene.getPlayZoneState(self.board.size, out=new_boardstate) # We only look object in the play zone
 
-        if len(changes)==0:
-            logger.debug("No changes detected.")
-            return False
+            changes = []
+            # Check that there is only one change in the board state
+            for i in range(self.board.size):
+                for j in range(self.board.size):
+                    if self.board.state[i][j] != new_boardstate[i][j]:
+                        changes.append((i, j, CellState._member_names_[new_boardstate[i][j]]))
 
-        if len(changes)!=1:
-            logger.debug(f"Changes: {changes}")
-            logger.error("Multiple changes detected. Are you cheating?")
-            return False
+            if len(changes)==0:
+                logger.debug("No changes detected.")
+                return False
+
+            if len(changes)!=1:
+                logger.debug(f"Changes: {changes}")
+                logger.error("Multiple changes detected. Are you cheating?")
+                return False
         
-        # For first round, set the human player color
-        change = changes[0]
-        new_state = new_boardstate[change[0]][change[1]]
-        if self.humanColor is None:
-            self.humanColor = new_state 
-            self.computerColor = (self.humanColor + 1) % 2 
+            # For first round, set the human player color
+            change = changes[0]
+            new_state = new_boardstate[change[0]][change[1]]
+            if self.humanColor is None:
+                self.humanColor = new_state 
+                self.computerColor = (self.humanColor + 1) % 2 
         
-        # Next rounds. If the human player color is set, check if the change is valid
-        if (new_state == self.humanColor and 
-            self.board.state[change[0]][change[1]] == Classes.EMPTY.value):
-            self.board.state[change[0]][change[1]] = new_state
-            logger.info(f"You played: {change}")
-            return True
+            # Next rounds. If the human player color is set, check if the change is valid
+            if (new_state == self.humanColor and 
+                self.board.state[change[0]][change[1]] == Classes.EMPTY.value):
+                self.board.state[change[0]][change[1]] = new_state
+                logger.info(f"You played: {change}")
+                return True
         
-        return False
+            return False
             
 
     def selectCubeInPlayZone(self):
@@ -421,18 +206,12 @@ class TicTacToe () :
         Return:
         position        : numpy.ndarray. The real world coordinates of the cube
         """
-        cls = self.dhresults.cls
-        xydwh = self.dhresults.xydwh 
-
-        for i in range(len(cls)):
-
-            if int(cls[i]) == Classes.DOG.value or int(cls[i]) == Classes.CAT.value:
+        scene = self.dhresults.getSnapshot(self.board)
 
-                position = self.imageToSimulationPosition(xydwh[i][0], xydwh[i][1], xydwh[i][2])
-
-                if self.board.isInPlayZone(position[0], position[1]):
-                    x, y = self.board.positionToCellIndices(position[0], position[1])
-                    return self.board.cellIndicesToPosition(x, y)
+        pawns = scene.getPlayZonePawns()
+        if len(pawns):
+            x, y = scene.cells[pawns[0]]
+            return self.board.cellIndicesToPosition(x, y)
                 
         return None
             
@@ -442,20 +221,14 @@ class TicTacToe () :
         Detect the storage zone state
         Does not detect if a hand is detected
         """
-        cls = self.dhresults.cls
-        xydwh = self.dhresults.xydwh 
+        scene = self.dhresults.getSnapshot(self.board)
 
         if self.dhresults.isHandDetected(): # If there is a hand return
             return 
         
-        self.board.storage = np.copy(Board().storage)
-        for i in range(len(cls)):
-            
-            if int(cls[i]) == Classes.DOG.value or int(cls[i]) == Classes.CAT.value:
-                position = self.imageToSimulationPosition(xydwh[i][0], xydwh[i][1], xydwh[i][2])
-                j = self.board.positionToStorageIndex(position[0], position[1])
-                if j is not None:
-                    self.board.storage[j] = int(cls[i])
+        self.board.clearStorage()
+        for i in scene.getStoragePawns():
+            self.board.setStorage(scene.storageIndices[i], int(scene.cls[i]))
 
 
     def isPlayZoneClear(self) -> bool:
@@ -466,21 +239,12 @@ class TicTacToe () :
         -----------
         True if the play zone is empty, False otherwise
         """
-        cls = self.dhresults.cls
-        xydwh = self.dhresults.xydwh 
+        scene = self.dhresults.getSnapshot(self.board)
         
         if self.dhresults.isHandDetected(): # If there is a hand return
             return False
 
-        for i in range(len(cls)): # Loop on the detected classes    
-            if int(cls[i]) == Classes.DOG.value or int(cls[i]) == Classes.CAT.value:
-                # Get the position of the object
-                position = self.imageToSimulationPosition(xydwh[i][0], xydwh[i][1], xydwh[i][1])
-
-                if self.board.isInPlayZone(position[0], position[1]):
-                    return False
-        
-        return True
+        return len(scene.getPlayZonePawns()) == 0
     
    
     def makeEmioChooseColor(self):
@@ -527,7 +291,13 @@ class TicTacToe () :
         -----------
         True if Emio has played, False otherwise
         """
-        cellPosition = self.chosenStrategy()
+        move = self.chosenStrategy(self.board.state, self.computerColor, self.humanColor)
+        if move is None:
+            return False
+
+        i, j = move
+        self.board.state[i][j] = self.computerColor
+        cellPosition = self.__emioPlays(i, j)
 
         # The tree next line are to be commented if you want to use the hardcoded position of the box instead of the calculated one
         cubePosition = None
@@ -539,6 +309,7 @@ class TicTacToe () :
         self.sequenceMove(cubePosition, cellPosition)
 
         self.takePhotoForDatabase()
+        return True
 
 
     def sendGripperPosition(self, x, y, z, speed=300, minSteps=40, withPI=False):
@@ -557,6 +328,17 @@ class TicTacToe () :
         return 
 
 
+    def sendTrajectory(self, waypoints: list):
+        """
+        Make Emio follow the waypoints, see MoveEmio.setTrajectory
+        """
+        moveEmio = self.simulation.MoveEmio
+        moveEmio.setTrajectory(waypoints)
+        while not moveEmio.done:
+            self.simulationStep()
+        return
+
+
     def moveEmioToRestPosition(self):
         """
         Move Emio to the rest position
@@ -590,99 +372,91 @@ class TicTacToe () :
         gripper_open = 40 
         gripper_close = 15
 
+        # Only the pick and place heights, where the gripper closes and opens, and the end of the sequence
+        # (before the camera looks at the board) wait for Emio to be steady. The transit waypoints are blended
+        waypoints = []
+
         # Pick the cube
         if endInRestPosition:
-            self.sendGripperPosition(self.restPosition[0], y_move, self.restPosition[2])
+            waypoints.append(Waypoint(position=(self.restPosition[0], y_move, self.restPosition[2])))
 
-        self.sendGripperPosition(cubePosition[0], y_move, cubePosition[1])
-        self.sendGripperOpening(gripper_open)
-        self.sendGripperPosition(cubePosition[0], y_pick, cubePosition[1], minSteps=70, withPI=True)
-        self.sendGripperOpening(gripper_close)
-        self.sendGripperPosition(cubePosition[0], y_move, cubePosition[1])
+        waypoints.append(Waypoint(position=(cubePosition[0], y_move, cubePosition[1]), opening=gripper_open))
+        waypoints.append(Waypoint(position=(cubePosition[0], y_pick, cubePosition[1]), settle=True, minSteps=70, withPI=True))
+        waypoints.append(Waypoint(opening=gripper_close, settle=True))
+        waypoints.append(Waypoint(position=(cubePosition[0], y_move, cubePosition[1])))
 
         # Place the cube in the right cell
-        self.sendGripperPosition(cellPosition[0], y_move, cellPosition[1])
-        self.sendGripperPosition(cellPosition[0], y_place, cellPosition[1], minSteps=70, withPI=True)
-        self.sendGripperOpening(gripper_open)
-        self.sendGripperPosition(cellPosition[0], y_move, cellPosition[1])
+        waypoints.append(Waypoint(position=(cellPosition[0], y_move, cellPosition[1])))
+        waypoints.append(Waypoint(position=(cellPosition[0], y_place, cellPosition[1]), settle=True, minSteps=70, withPI=True))
+        waypoints.append(Waypoint(opening=gripper_open, settle=True))
+        waypoints.append(Waypoint(position=(cellPosition[0], y_move, cellPosition[1]), settle=not endInRestPosition))
 
-        # Back to rest position
+        # Back to rest position, steady for the camera
         if endInRestPosition:
-            self.sendGripperPosition(self.restPosition[0], y_move, self.restPosition[2])
-            self.moveEmioToRestPosition()
+            waypoints.append(Waypoint(position=(self.restPosition[0], y_move, self.restPosition[2])))
+            waypoints.append(Waypoint(position=tuple(self.restPosition[0:3]), opening=self.restOpeningDistance,
+                                      settle=True, minSteps=0))
+
+        self.sendTrajectory(waypoints)
     
 
     def checkAndCorrectBoard(self):
         """
         Check that the real board matches
         """
-        def getRealBoard(cls, xydwh):
-            realBoard = Board()
-            for i in range(len(cls)):
-                # If the object is the color emio's playing
-                if int(cls[i]) == Classes.DOG.value or int(cls[i]) == Classes.CAT.value:
-                    position = self.imageToSimulationPosition(xydwh[i][0], xydwh[i][1], xydwh[i][2])
-                    if self.board.isInPlayZone(position[0], position[1]):
-                        x, y = self.board.positionToCellIndices(position[0], position[1])
-                        realBoard.state[x, y] = int(cls[i])
-            return realBoard
+        with self.boardPool.scratch(size=self.board.size) as realBoard:
+            self.dhresults.updateAndDisplayAnnotatedImage()
+            realBoard.load(self.dhresults.getSnapshot(self.board).getPlayZoneState(self.board.size))
+            matchingCells = (realBoard.state == self.board.state)
 
-        self.dhresults.updateAndDisplayAnnotatedImage()
-        cls = self.dhresults.cls
-        xydwh = self.dhresults.xydwh
-        realBoard = getRealBoard(cls, xydwh)
-        matchingCells = (realBoard.state == self.board.state)
-
-        nbMaximumAttempts = 2
-        while nbMaximumAttempts > 0 and not matchingCells.all():
-
-            logger.info("Boards mismatch. I will try to fix that!")
-            realBoard.display()
-            logger.info("!=")
-            self.board.display()
-
-            nbMaximumAttempts -= 1
-            for i in range(3):
-                for j in range(3):
-                    if not matchingCells[i][j]:
-
-                        # Should not be empty
-                        if realBoard.state[i][j] == Classes.EMPTY.value:
-                            cellPosition = self.board.cellIndicesToPosition(i, j)
-                            cubePosition = self.getNearestStorageCube(self.board.state[i][j], cellPosition)
-                            if cubePosition is not None:
-                                self.sequenceMove(cubePosition, cellPosition)
-
-                        # Should be empty
-                        elif self.board.state[i][j] == Classes.EMPTY.value:
-                            cubePosition = self.board.cellIndicesToPosition(i, j)
-                            cellPosition = self.getNearestEmptyStoragePosition(cubePosition)
-                            if cellPosition is not None:
-                                self.sequenceMove(cubePosition, cellPosition)
-
-                        # Should not be this color
-                        else:
-                            # First empty the cell
-                            cubePosition = self.board.cellIndicesToPosition(i, j)
-                            cellPosition = self.getNearestEmptyStoragePosition(cubePosition)
-                            if cellPosition is not None:
-                                self.sequenceMove(cubePosition, cellPosition)
+            nbMaximumAttempts = 2
+            while nbMaximumAttempts > 0 and not matchingCells.all():
+
+                logger.info("Boards mismatch. I will try to fix that!")
+                realBoard.display()
+                logger.info("!=")
+                self.board.display()
+
+                nbMaximumAttempts -= 1
+                for i in range(self.board.size):
+                    for j in range(self.board.size):
+                        if not matchingCells[i][j]:
+
+                            # Should not be empty
+                            if realBoard.state[i][j] == Classes.EMPTY.value:
+                                cellPosition = self.board.cellIndicesToPosition(i, j)
+                                cubePosition = self.getNearestStorageCube(self.board.state[i][j], cellPosition)
+                                if cubePosition is not None:
+                                    self.sequenceMove(cubePosition, cellPosition)
+
+                            # Should be empty
+                            elif self.board.state[i][j] == Classes.EMPTY.value:
+                                cubePosition = self.board.cellIndicesToPosition(i, j)
+                                cellPosition = self.getNearestEmptyStoragePosition(cubePosition)
+                                if cellPosition is not None:
+                                    self.sequenceMove(cubePosition, cellPosition)
+
+                            # Should not be this color
+                            else:
+                                # First empty the cell
+                                cubePosition = self.board.cellIndicesToPosition(i, j)
+                                cellPosition = self.getNearestEmptyStoragePosition(cubePosition)
+                                if cellPosition is not None:
+                                    self.sequenceMove(cubePosition, cellPosition)
                             
-                            # Get the right color
-                            cellPosition = self.board.cellIndicesToPosition(i, j)
-                            cubePosition = self.getNearestStorageCube(self.board.state[i][j], cellPosition)
-                            if cubePosition is not None:
-                                self.sequenceMove(cubePosition, cellPosition)
+                                # Get the right color
+                                cellPosition = self.board.cellIndicesToPosition(i, j)
+                                cubePosition = self.getNearestStorageCube(self.board.state[i][j], cellPosition)
+                                if cubePosition is not None:
+                                    self.sequenceMove(cubePosition, cellPosition)
 
-            self.dhresults.updateAndDisplayAnnotatedImage()
-            cls = self.dhresults.cls
-            xydwh = self.dhresults.xydwh
-            realBoard = getRealBoard(cls, xydwh)
-            matchingCells = (realBoard.state == self.board.state)
+                self.dhresults.updateAndDisplayAnnotatedImage()
+                realBoard.load(self.dhresults.getSnapshot(self.board).getPlayZoneState(self.board.size))
+                matchingCells = (realBoard.state == self.board.state)
 
-        if not matchingCells.all():
-            logger.error("Sorry I tried to correct the board but did not succeed. Can you fix the board? Thank you.")
-            self.displayBoard()
+            if not matchingCells.all():
+                logger.error("Sorry I tried to correct the board but did not succeed. Can you fix the board? Thank you.")
+                self.displayBoard()
 
         return
 
@@ -736,8 +510,8 @@ class TicTacToe () :
         """
         Reset the parameter to begin a new game
         """
-        self.board = Board()
-        self.nbEmptyCell = 9
+        self.board = Board(size=self.board.size, winLength=self.board.winLength)
+        self.nbEmptyCell = self.board.size**2
         self.results = None
         self.humanColor = None
     
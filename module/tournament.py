@@ -0,0 +1,119 @@
+import argparse
+import itertools
+import random
+import time
+import numpy as np
+
+from multiprocessing import Pool
+
+from module.board import Board, CellState, Results
+from module.strategies import Strategies, STRATEGIES
+from module.strategyregistry import LATENCY_BINS, getPercentile
+from module.loggerconfig import getLogger
+logger = getLogger()
+
+
+# Headless tournament between the strategies, runs without Sofa, the camera or DarkHelp:
+#   python -m module.tournament --games 1000000 --processes 8
+# The strategies are called directly, without the budgets of the registry, to measure their own latency.
+
+
+def playGames(first: str, second: str, nbGames: int, seed: int) -> dict:
+    """
+    Play nbGames games between the strategies first and second (Strategies values).
+    The strategy first plays the dogs, the second the cats, and the starting player alternates.
+
+    Return:
+    -----------
+    results         : dict. Number of wins of each strategy, draws, moves and the latency histograms
+    """
+    random.seed(seed)
+    strategies = {CellState.DOG.value: STRATEGIES[first], CellState.CAT.value: STRATEGIES[second]}
+    latencies = {CellState.DOG.value: [], CellState.CAT.value: []}
+    wins = {Results.DOG.value: 0, Results.CAT.value: 0, Results.DRAW.value: 0}
+
+    board = Board()
+    for game in range(nbGames):
+        board.load()
+        color = game % 2
+        winner = Results.NONE.value
+        while winner == Results.NONE.value:
+            t0 = time.perf_counter()
+            i, j = strategies[color](board.state, color, 1 - color)
+            latencies[color].append(time.perf_counter() - t0)
+            board.push(i, j, color)
+            winner = board.getWinner()
+            color = 1 - color
+        wins[int(winner)] += 1
+
+    return {"pair": (first, second),
+            "wins": wins[Results.DOG.value],
+            "losses": wins[Results.CAT.value],
+            "draws": wins[Results.DRAW.value],
+            "moves": len(latencies[0]) + len(latencies[1]),
+            "latencies": {first: np.histogram(latencies[CellState.DOG.value], LATENCY_BINS)[0],
+                          second: np.histogram(latencies[CellState.CAT.value], LATENCY_BINS)[0]}}
+
+
+def runTournament(nbGames: int, nbProcesses=None, chunkSize=10000, seed=0) -> tuple:
+    """
+    Play nbGames games for each pair of strategies on a pool of processes
+
+    Return:
+    -----------
+    results         : dict. (first, second) -> wins, losses, draws and moves of the strategy first against second
+    latencies       : dict. strategy -> histogram of its move latencies
+    duration        : float. The wall-clock duration of the tournament in seconds
+    """
+    tasks = []
+    pairs = list(itertools.combinations_with_replacement([s.value for s in Strategies], 2))
+    for first, second in pairs:
+        for start in range(0, nbGames, chunkSize):
+            tasks.append((first, second, min(chunkSize, nbGames - start), seed + len(tasks)))
+
+    results = {pair: {"wins": 0, "losses": 0, "draws": 0, "moves": 0} for pair in pairs}
+    latencies = {s.value: np.zeros(len(LATENCY_BINS) - 1, dtype=np.int64) for s in Strategies}
+
+    t0 = time.perf_counter()
+    if nbProcesses == 1:
+        chunks = itertools.starmap(playGames, tasks)
+    else:
+        with Pool(nbProcesses) as pool:
+            chunks = pool.starmap(playGames, tasks)
+
+    for chunk in chunks:
+        for key in ["wins", "losses", "draws", "moves"]:
+            results[chunk["pair"]][key] += chunk[key]
+        for strategy, histogram in chunk["latencies"].items():
+            latencies[strategy] += histogram
+
+    return results, latencies, time.perf_counter() - t0
+
+
+def logTournament(results, latencies, duration):
+    names = {s.value: s.name for s in Strategies}
+
+    logger.info(f"{'Match':<24} {'win':>7} {'draw':>7} {'loss':>7}")
+    for (first, second), result in results.items():
+        nbGames = result["wins"] + result["losses"] + result["draws"]
+        logger.info(f"{names[first] + ' vs ' + names[second]:<24} "
+                    f"{result['wins'] / nbGames:7.2%} {result['draws'] / nbGames:7.2%} {result['losses'] / nbGames:7.2%}")
+
+    nbMoves = sum(result["moves"] for result in results.values())
+    logger.info(f"{nbMoves} moves in {duration:.1f} s: {nbMoves / duration:.0f} moves per second")
+
+    logger.info(f"{'Latency (us)':<24} {'p50':>7} {'p90':>7} {'p99':>7} {'p99.9':>7}")
+    for strategy, histogram in latencies.items():
+        percentiles = [getPercentile(histogram, p) * 1e6 for p in [50, 90, 99, 99.9]]
+        logger.info(f"{names[strategy]:<24} " + " ".join(f"{p:7.1f}" for p in percentiles))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play every pair of strategies against each other")
+    parser.add_argument("--games", type=int, default=10000, help="number of games per pair of strategies")
+    parser.add_argument("--processes", type=int, default=None, help="number of processes, all the cores by default")
+    parser.add_argument("--chunk", type=int, default=10000, help="number of games per task")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logTournament(*runTournament(args.games, args.processes, args.chunk, args.seed))
@@ -0,0 +1,87 @@
+import numpy as np
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Waypoint:
+    """
+    Target of the gripper in a trajectory, see MoveEmio.setTrajectory.
+
+    Only the settled waypoints wait for Emio to be steady (the pick and place heights, where the cube is
+    grasped or released). The others are transit waypoints: the trajectory goes on to the next waypoint as soon as
+    the gripper is within the blend radius, so the motion is blended without full stops.
+    """
+    position: tuple = None      # x, y, z target of the gripper, None to keep the current target
+    opening: float = None       # Opening distance of the gripper, None to keep the current opening
+    settle: bool = False        # Wait for Emio to be steady before going to the next waypoint
+    speed: float = 300          # Maximum speed of the effectors
+    minSteps: int = 40          # Minimum number of steps before the next waypoint, for the settled waypoints
+    withPI: bool = False        # Correct the position with the markers, see PIController
+
+
+class Trajectory:
+    """
+    Sequence of waypoints followed by MoveEmio
+    """
+
+    def __init__(self, waypoints: list, blendRadius=10., openingTolerance=3.):
+        """
+        Parameters:
+        -----------
+        waypoints       : list[Waypoint]. The waypoints, in order
+        blendRadius     : float. Distance to a transit waypoint at which the trajectory goes to the next one (mm)
+        openingTolerance: float. Maximum gap to the opening of a transit waypoint to go to the next one
+        """
+        if not waypoints:
+            raise ValueError("A trajectory needs at least one waypoint.")
+        self.waypoints = list(waypoints)
+        self.blendRadius = blendRadius
+        self.openingTolerance = openingTolerance
+        self.index = 0
+
+
+    def __len__(self):
+        return len(self.waypoints)
+
+
+    @property
+    def current(self) -> Waypoint:
+        return self.waypoints[self.index]
+
+
+    def isLast(self) -> bool:
+        return self.index == len(self.waypoints) - 1
+
+
+    def advance(self) -> Waypoint:
+        """
+        Go to the next waypoint
+
+        Return:
+        -----------
+        waypoint        : Waypoint. The next waypoint, None at the end of the trajectory
+        """
+        if self.isLast():
+            return None
+        self.index += 1
+        return self.current
+
+
+    def isBlendReached(self, position, openingGap=0.) -> bool:
+        """
+        Check if the gripper is close enough to the current transit waypoint to go to the next one
+
+        Parameters:
+        -----------
+        position        : numpy.ndarray. x, y, z of the gripper
+        openingGap      : float. Gap between the opening of the gripper and its target
+        """
+        waypoint = self.current
+        if waypoint.position is not None:
+            distance = np.linalg.norm(np.asarray(position, dtype=np.float64) - np.asarray(waypoint.position, dtype=np.float64))
+            if distance > self.blendRadius:
+                return False
+        if waypoint.opening is not None and abs(openingGap) > self.openingTolerance:
+            return False
+        return True
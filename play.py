@@ -1,9 +1,9 @@
 
+import os
 import time 
 
-import DarkHelp
-
-from module.tictactoe import TicTacToe, Strategies
+from module.tictactoe import TicTacToe
+from module.strategyregistry import createDefaultRegistry, StrategyRegistry
 from module.dhresults import DHResults, Classes
 from module.loggerconfig import getLogger, logging
 logger = getLogger()
@@ -59,19 +59,58 @@ def createPhotoDirectory():
     return new_folder_path
 
 
-def calibrationStep(tictactoe: TicTacToe):
+def calibrationStep(tictactoe: TicTacToe) -> bool:
     """
-    Ask the user if they want to calibrate the camera
+    Ask the user if they want to calibrate the camera, unless the calibration cache matched the camera at startup
+
+    Return:
+    -----------
+    True if the calibration is confirmed: loaded from the cache or done now
     """
+    if tictactoe.dhresults.isCalibrationCached:
+        logger.info("The camera has not moved since the last calibration, the calibration cache is used.")
+        return True
+
     answer = ""
     while answer != "y" and answer != "n":
         answer = input("Do you want to calibrate the camera (y/n)?")
 
     if answer == "y":
-        tictactoe.camera.calibrate()
+        with tictactoe.dhresults.capture.paused() as camera: # Stop the capture thread while calibrating
+            camera.calibrate()
+        tictactoe.dhresults.updateProjection()
+        tictactoe.dhresults.saveCalibration()
         logger.info("Calibration done.")
+        return True
 
-    return
+    return False
+
+
+def planeCalibrationStep(tictactoe: TicTacToe, saveCalibration: bool, nbAttempts=3):
+    """
+    Ask the user if they want to measure the height of the board plane on the pawns of the storage slots,
+    unless it was loaded from the calibration cache. Without it, the positions are computed with the depth image.
+    The calibration cache is only saved if the calibration of the camera is confirmed (see calibrationStep)
+    """
+    dhresults = tictactoe.dhresults
+    if dhresults.homography is not None:
+        logger.info("The board plane was loaded from the calibration cache.")
+        return
+
+    answer = ""
+    while answer != "y" and answer != "n":
+        answer = input("Do you want to measure the board plane (y/n)?")
+    if answer == "n":
+        return
+
+    input("Put the pawns on the storage slots, then press Enter to measure the board plane.")
+    for _ in range(nbAttempts):
+        dhresults.updateAndDisplayAnnotatedImage()
+        if dhresults.calibratePlane(tictactoe.board):
+            if saveCalibration:
+                dhresults.saveCalibration()
+            return
+    logger.warning("Could not measure the board plane, the positions are computed with the depth image.")
 
 
 def enrichDatabaseStep(tictactoe):
@@ -89,14 +128,15 @@ def enrichDatabaseStep(tictactoe):
     return
 
 
-def difficultyStep(tictactoe):
+def difficultyStep(tictactoe, registry: StrategyRegistry):
     """
     Ask the user to choose the difficulty of Emio's strategy
     """
+    choices = ", ".join(f"{key}: {entry.name}" for key, entry in registry.entries.items())
     answer = ""
-    while answer not in [item.value for item in Strategies]: 
-        answer = input("Choose a difficulty for the game (r: random, e: easy, h: hard, i: impossible) : ").lower()
-    tictactoe.chosenStrategy = tictactoe.strategies.get(answer)
+    while answer not in registry.keys(): 
+        answer = input(f"Choose a difficulty for the game ({choices}) : ").lower()
+    tictactoe.chosenStrategy = registry.get(answer)
 
 
 def startNewGameStep():
@@ -192,6 +232,7 @@ def main():
     Main function to run the TicTacToe game 
     """
 
+    registry = createDefaultRegistry()
     dhresults = DHResults()
     tictactoe = TicTacToe(boardState=[[0, 0, 0],
                                       [0, 0, 0],
@@ -199,15 +240,21 @@ def main():
                           dhresults=dhresults)
    
     # User choices
-    # calibrationStep(tictactoe)
+    isCalibrated = calibrationStep(tictactoe)
+    planeCalibrationStep(tictactoe, saveCalibration=isCalibrated)
     # enrichDatabaseStep(tictactoe)
-    difficultyStep(tictactoe)
+    difficultyStep(tictactoe, registry)
 
     # Game loop
     gameLoop(tictactoe, dhresults)
         
+    # Export the decision latencies of the strategies
+    statsPath = os.path.join(os.path.dirname(__file__), "strategy_stats.json")
+    registry.exportStats(statsPath)
+    logger.info(f"Strategies decision latencies saved in {statsPath}")
+
     # Cleanup
-    DarkHelp.DestroyDarkHelpNN(dhresults.dh)
+    dhresults.detector.close()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
-
-from module.board import Board, PlayZone, StorageZone, Results
+from module.board import Board, BitBoard, BoardPool, PlayZone, StorageZone, Results, CellState, getCellBit
+from module.board import Board, BitBoard, BoardPool, PlayZone, StorageZone, Results, CellState
+import itertools
+import numpy as np
 import pytest
 
 def test_board_initialization():
@@ -156,4 +158,185 @@ def test_winner():
                         [2, 2, i]])
         assert board.hasWinner()
         assert board.getWinner() == i
-    
\ No newline at end of file
+    
+
+def test_bitboard_matches_board():
+    """
+    Test that the bitboard backend gives the same results as the array backend on every 3x3 state.
+    """
+    for cells in itertools.product([CellState.DOG.value, CellState.CAT.value, CellState.EMPTY.value], repeat=9):
+        state = np.array(cells).reshape(3, 3)
+        board = Board(state)
+        bitboard = BitBoard(state)
+        assert bitboard.getWinner() == board.getWinner()
+        assert (bitboard.state == state).all()
+        assert bitboard.isEqual(state)
+
+
+def test_bitboard_set_cell():
+    board = BitBoard()
+    assert not board.hasWinner()
+
+    for j in range(3):
+        board.setCell(0, j, CellState.CAT.value)
+    assert board.getWinner() == Results.CAT.value
+
+    board.setCell(0, 1, CellState.EMPTY.value)
+    assert not board.hasWinner()
+    assert board.state[0][1] == CellState.EMPTY.value
+    assert BitBoard.fromMasks(*board.masks).isEqual(board.state)
+
+
+def test_bitboard_play_undo():
+    """
+    Test that play and undo only change the masks, and that the state follows them.
+    """
+    board = BitBoard()
+    board.play(0, 0, CellState.DOG.value)
+    board.play(1, 1, CellState.DOG.value)
+    board.play(2, 2, CellState.DOG.value)
+    assert board.masks == [getCellBit(0, 0) | getCellBit(1, 1) | getCellBit(2, 2), 0]
+    assert board.getCell(1, 1) == CellState.DOG.value
+    assert board.state[2][2] == CellState.DOG.value
+    assert board.getWinner() == Results.DOG.value
+
+    assert board.undo() == (2, 2)
+    assert not board.hasWinner()
+    assert board.state[2][2] == CellState.EMPTY.value
+
+    # The state is read-only, the writes go through setCell or load
+    with pytest.raises(ValueError):
+        board.state[0][1] = CellState.CAT.value
+
+
+def test_push_pop():
+    """
+    Test that moves played with push are undone by pop, on both backends.
+    """
+    for boardClass in [Board, BitBoard]:
+        board = boardClass()
+        board.push(0, 0, CellState.CAT.value)
+        board.push(1, 1, CellState.CAT.value)
+        board.push(2, 2, CellState.CAT.value)
+        assert board.getWinner() == Results.CAT.value
+
+        assert board.pop() == (2, 2)
+        assert not board.hasWinner()
+        board.pop()
+        board.pop()
+        assert board.isEqual(Board().state)
+
+
+def test_board_pool():
+    pool = BoardPool()
+    state = [[0, 1, 2],
+             [2, 2, 2],
+             [0, 2, 2]]
+    with pool.scratch(state) as board:
+        assert board.isEqual(np.array(state))
+        board.push(1, 1, CellState.DOG.value)
+    assert len(pool.boards[3]) == 1
+
+    # The same board is reused, emptied
+    with pool.scratch() as reused:
+        assert reused is board
+        assert reused.isEqual(Board().state)
+        assert not reused.moves
+
+
+def test_get_winners():
+    """
+    Test that the vectorized winner detection matches getWinner on every 3x3 state.
+    """
+    states = np.array(list(itertools.product([0, 1, 2], repeat=9))).reshape(-1, 3, 3)
+    winners = Board.getWinners(states)
+    assert winners.shape == (len(states),)
+    for state, winner in zip(states, winners):
+        assert winner == Board(state).getWinner()
+
+    assert Board.getWinners(np.empty((0, 3, 3), dtype=int)).shape == (0,)
+
+
+def test_larger_board():
+    """
+    Test the 4x4 board with 4 in a row.
+    """
+    board = Board(size=4)
+    assert board.winLength == 4
+    assert board.playZone == PlayZone.forSize(4)
+    assert len(board.storage) == 16
+
+    for i in range(4):
+        for j in range(4):
+            x, z = board.cellIndicesToPosition(i, j)
+            assert board.positionToCellIndices(x, z) == (i, j)
+
+    for index in range(16):
+        x, z = board.storageIndexToPosition(index)
+        assert board.isInStorageZone(x, z)
+        assert board.positionToStorageIndex(x, z) == index
+
+    board.push(0, 3, CellState.DOG.value)
+    board.push(1, 2, CellState.DOG.value)
+    board.push(2, 1, CellState.DOG.value)
+    assert not board.hasWinner()
+    board.push(3, 0, CellState.DOG.value)
+    assert board.getWinner() == Results.DOG.value
+    assert Board.getWinners(board.state[np.newaxis])[0] == Results.DOG.value
+
+    board = Board(size=5)
+    for j in range(4):
+        board.push(2, j + 1, CellState.CAT.value)
+    assert board.getWinner() == Results.CAT.value
+
+
+def test_storage_distance_table():
+    """
+    Test that the nearest empty storage slot of the distance table matches a brute force search.
+    """
+    for size in [3, 4]:
+        board = Board(size=size)
+        table = board.getStorageDistanceTable()
+        assert table is Board(size=size).getStorageDistanceTable() # Built once per geometry
+
+        for occupied in [[], [0, 1, 5], list(range(1, 4 * size))]:
+            board.clearStorage()
+            for k in occupied:
+                board.setStorage(k, CellState.CAT.value)
+
+            for i in range(size):
+                for j in range(size):
+                    cell = np.array(board.cellIndicesToPosition(i, j))
+                    distances = [np.linalg.norm(cell - board.storageIndexToPosition(k)) if board.storage[k] == CellState.EMPTY.value else np.inf
+                                 for k in range(4 * size)]
+                    k = table.getNearestEmptySlot(i, j, board.storageMask)
+                    assert distances[k] == min(distances)
+
+        board.setStorage(0, CellState.DOG.value)
+        assert table.getNearestEmptySlot(0, 0, board.storageMask) is None
+        board.setStorage(0, CellState.EMPTY.value)
+        assert table.getNearestEmptySlot(0, 0, board.storageMask) == 0
+
+
+@pytest.mark.parametrize("size", [3, 4, 5])
+def test_vectorized_zones(size):
+    board = Board(size=size)
+    # Grid over the storage zone, with every cell and zone boundary, and a few invalid positions
+    xs = np.unique(np.concatenate([np.arange(board.storageZone.xmin - 10, board.storageZone.xmax + 11, 2.5),
+                                   [board.playZone.xmin, board.playZone.xmax, board.storageZone.xmin, board.storageZone.xmax]]))
+    zs = np.unique(np.concatenate([np.arange(board.storageZone.zmin - 10, board.storageZone.zmax + 11, 2.5),
+                                   [board.playZone.zmin, board.playZone.zmax, board.storageZone.zmin, board.storageZone.zmax]]))
+    x, z = [array.flatten() for array in np.meshgrid(xs, zs)]
+    x, z = np.append(x, [np.nan, 0.]), np.append(z, [0., np.nan])
+
+    inPlayZone = board.areInPlayZone(x, z)
+    inStorageZone = board.areInStorageZone(x, z)
+    i, j = board.positionsToCellIndices(x, z)
+    storageIndices = board.positionsToStorageIndices(x, z)
+    for k in range(len(x)):
+        assert inPlayZone[k] == board.isInPlayZone(x[k], z[k])
+        assert inStorageZone[k] == board.isInStorageZone(x[k], z[k])
+        cell = board.positionToCellIndices(x[k], z[k])
+        assert (i[k], j[k]) == ((-1, -1) if cell == (None, None) else cell)
+        storageIndex = board.positionToStorageIndex(x[k], z[k])
+        assert storageIndices[k] == (-1 if storageIndex is None else storageIndex)
@@ -0,0 +1,76 @@
+from module.board import Board
+from module.calibrationcache import CalibrationCache, getDepthSignature, getImageSignature
+from module.homography import Homography
+from module.projection import CameraProjection
+import json
+import numpy as np
+
+
+def getCache(depth, color):
+    projection = CameraProjection.fromIntrinsics(610., 605., 320., 240.)
+    board = Board()
+    key = (board.size, (-45, -45, 45, 45), (-75, -75, 75, 75))
+    slots = np.arange(12, dtype=np.int32).reshape(3, 4)
+    return CalibrationCache(projection=projection, image=getImageSignature(color), depth=getDepthSignature(depth),
+                            homography=Homography(np.eye(3)), roi=(30, 30, 400, 450),
+                            rasters={key: (board.size, slots)})
+
+
+def getScene(generator):
+    """
+    Textured color image of a static scene, with features larger than the subsampling of the signatures
+    """
+    blocks = generator.integers(0, 256, size=(30, 40, 3))
+    return np.kron(blocks, np.ones((16, 16, 1))).astype(np.uint8)
+
+
+def test_calibration_cache_save_load(tmp_path):
+    depth = np.full((480, 640), 500, dtype=np.uint16)
+    color = getScene(np.random.default_rng(0))
+    cache = getCache(depth, color)
+    path = str(tmp_path / "calibration_cache.npz")
+    cache.save(path)
+
+    loaded = CalibrationCache.load(path)
+    assert np.allclose(loaded.projection.matrix, cache.projection.matrix)
+    assert np.allclose(loaded.homography.matrix, np.eye(3))
+    assert np.allclose(loaded.image, cache.image)
+    assert loaded.roi == (30, 30, 400, 450)
+    assert list(loaded.rasters.keys()) == list(cache.rasters.keys())
+    size, slots = next(iter(loaded.rasters.values()))
+    assert size == 3 and (slots == np.arange(12).reshape(3, 4)).all()
+
+    # Caches of another version are ignored
+    with np.load(path) as data:
+        arrays = dict(data)
+    header = json.loads(str(arrays["header"]))
+    header["version"] = -1
+    arrays["header"] = np.array(json.dumps(header))
+    np.savez(path, **arrays)
+    assert CalibrationCache.load(path) is None
+    assert CalibrationCache.load(str(tmp_path / "missing.npz")) is None
+
+
+def test_calibration_cache_validate():
+    generator = np.random.default_rng(0)
+    depth = (500 + generator.integers(0, 200, size=(480, 640))).astype(np.uint16)
+    color = getScene(generator)
+    cache = getCache(depth, color)
+
+    assert cache.validate(color, depth)
+
+    # Pawns and the robot moved on a part of the table, the lighting changed
+    changed = depth.copy()
+    changed[100:200, 100:200] -= 40
+    moved = color.copy()
+    moved[100:200, 100:200] = 255 - moved[100:200, 100:200]
+    moved[300:400, 400:500] = 0
+    assert cache.validate(moved, changed)
+    assert cache.validate((color * 0.8 + 20).astype(np.uint8), depth)
+
+    # The camera moved
+    assert not cache.validate(color, depth + 30)
+    shifted = np.roll(color, (12, -8), axis=(0, 1))
+    assert not cache.validate(shifted, depth)
+    assert not cache.validate(color, None)
+    assert not cache.validate(None, depth)
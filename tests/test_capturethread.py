@@ -0,0 +1,57 @@
+from module.capturethread import CaptureThread
+import numpy as np
+import pytest
+
+
+class FakeCamera:
+    """
+    Camera returning frames filled with the number of updates
+    """
+    def __init__(self):
+        self.nbUpdates = 0
+        self.frame = None
+        self.depth_frame = None
+        self.trackers_pos = []
+
+    def update(self):
+        self.nbUpdates += 1
+        self.frame = np.full((4, 4, 3), self.nbUpdates, dtype=np.uint8)
+        self.depth_frame = np.full((4, 4), self.nbUpdates, dtype=np.uint16)
+        self.trackers_pos = [[self.nbUpdates, 0, 0], [0, 0, self.nbUpdates]]
+
+
+def test_latest_frame_wins():
+    capture = CaptureThread(FakeCamera())
+    assert capture.getLatestFrame() is None
+
+    for _ in range(3):
+        camera = capture.camera
+        camera.update()
+        capture.publish(camera.frame, camera.depth_frame, camera.trackers_pos)
+    frame = capture.getLatestFrame()
+    assert frame.index == 2
+    assert (frame.color == 3).all() and (frame.depth == 3).all()
+    assert frame.markers == ((3, 0, 0), (0, 0, 3))
+
+    # The published frames are copies, not views of the camera buffers
+    camera.frame[:] = 0
+    assert (frame.color == 3).all()
+    with pytest.raises(ValueError):
+        frame.depth[0, 0] = 0
+
+
+def test_capture_thread():
+    capture = CaptureThread(FakeCamera())
+    capture.start()
+    try:
+        first = capture.waitForFrame()
+        assert first is not None
+        second = capture.waitForFrame(first.index)
+        assert second.index > first.index and second.timestamp >= first.timestamp
+
+        with capture.paused() as camera:
+            nbUpdates = camera.nbUpdates
+            assert capture.waitForFrame(capture.getLatestFrame().index, timeout=0.05).color[0, 0, 0] == nbUpdates
+    finally:
+        capture.stop()
+    assert not capture.is_alive()
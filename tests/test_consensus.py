@@ -0,0 +1,82 @@
+from module.consensus import DetectionConsensus
+import numpy as np
+
+DOG, CAT, EMPTY, HAND = 0, 1, 2, 3
+
+
+def getConsensus(**kwargs):
+    return DetectionConsensus(nbClasses=4, trackedClasses=(DOG, CAT), **kwargs)
+
+
+def getBoxes(centers):
+    xydwh = np.zeros((len(centers), 5))
+    xydwh[:, 0:2] = centers
+    return xydwh
+
+
+def test_stable_after_agreeing_frames():
+    consensus = getConsensus(nbFrames=3)
+    cls = np.array([DOG, CAT, EMPTY])
+    xydwh = getBoxes([[100, 100], [200, 100], [150, 150]])
+    assert not consensus.push(cls, xydwh, timestamp=0.)
+    assert not consensus.push(cls, xydwh + 2, timestamp=0.1)
+    assert consensus.push(cls, xydwh - 2, timestamp=0.2)
+
+    # The history is kept: one more agreeing frame is enough
+    assert consensus.push(cls, xydwh, timestamp=0.3)
+
+
+def test_disagreeing_frames():
+    consensus = getConsensus(nbFrames=3)
+    cls = np.array([DOG, CAT])
+    xydwh = getBoxes([[100, 100], [200, 100]])
+    consensus.push(cls, xydwh, timestamp=0.)
+    consensus.push(cls, xydwh, timestamp=0.1)
+
+    # Different number of cats
+    assert not consensus.push(np.array([DOG, CAT, CAT]), getBoxes([[100, 100], [200, 100], [50, 50]]), timestamp=0.2)
+    # Same histogram, but a pawn moved
+    consensus.push(cls, xydwh, timestamp=0.3)
+    consensus.push(cls, xydwh, timestamp=0.4)
+    assert not consensus.push(cls, getBoxes([[100, 100], [260, 100]]), timestamp=0.5)
+    # Same positions, but the classes are swapped
+    consensus.push(cls, xydwh, timestamp=0.6)
+    consensus.push(cls, xydwh, timestamp=0.7)
+    assert not consensus.push(cls[::-1], xydwh, timestamp=0.8)
+
+
+def test_old_frames_are_ignored():
+    consensus = getConsensus(nbFrames=2, maxAge=1.)
+    cls = np.array([DOG])
+    xydwh = getBoxes([[100, 100]])
+    consensus.push(cls, xydwh, timestamp=0.)
+    assert not consensus.push(cls, xydwh, timestamp=2.)
+    assert consensus.push(cls, xydwh, timestamp=2.5)
+
+
+def test_more_boxes_than_the_buffers():
+    consensus = getConsensus(nbFrames=2, maxBoxes=2)
+    cls = np.array([DOG, CAT, DOG, CAT, HAND])
+    xydwh = getBoxes([[0, 0], [50, 0], [100, 0], [150, 0], [0, 100]])
+    consensus.push(cls, xydwh, timestamp=0.)
+    assert consensus.push(cls, xydwh, timestamp=0.1)
+    assert consensus.push(np.array([], dtype=int), np.empty((0, 5)), timestamp=0.2) is False
+
+
+def test_refreshed_frame_does_not_count():
+    consensus = getConsensus(nbFrames=3)
+    cls = np.array([DOG, CAT])
+    xydwh = getBoxes([[100, 100], [200, 100]])
+    assert not consensus.isStable()
+    assert not consensus.refresh(timestamp=0.)
+
+    # One prediction reused by the motion gate cannot fill the window by itself
+    assert not consensus.push(cls, xydwh, timestamp=0.)
+    assert not consensus.refresh(timestamp=0.1)
+    assert not consensus.refresh(timestamp=0.2)
+    assert not consensus.refresh(timestamp=0.3)
+
+    assert not consensus.push(cls, xydwh, timestamp=0.4)
+    assert consensus.push(cls, xydwh, timestamp=0.5)
+    # Once stable, the reused prediction keeps the window stable
+    assert consensus.refresh(timestamp=0.6)
@@ -0,0 +1,53 @@
+from module.depthestimator import DepthEstimator, DepthEstimators
+import numpy as np
+
+
+def getDepthImage():
+    generator = np.random.default_rng(0)
+    depthImage = generator.integers(300, 600, size=(480, 640)).astype(np.uint16)
+    depthImage[generator.random((480, 640)) < 0.1] = 0 # Invalid depths
+    return depthImage
+
+
+def test_median_matches_numpy():
+    # Boxes of gridSize x gridSize pixels: every pixel is sampled once
+    depthImage = getDepthImage()
+    bounds = np.array([[10, 20, 26, 36], [100, 200, 116, 216], [600, 460, 616, 476]])
+    depths = DepthEstimator(DepthEstimators.MEDIAN, gridSize=16).estimate(depthImage, bounds)
+
+    for (x1, y1, x2, y2), depth in zip(bounds, depths):
+        values = depthImage[y1:y2, x1:x2].flatten()
+        assert depth == np.median(values[values > 0])
+
+
+def test_trimmed_mean():
+    depthImage = getDepthImage()
+    bounds = np.array([[50, 50, 58, 58]])
+    depth = DepthEstimator(DepthEstimators.TRIMMED_MEAN, gridSize=8, trim=0.25).estimate(depthImage, bounds)[0]
+
+    values = np.sort(depthImage[50:58, 50:58].flatten())
+    values = values[values > 0]
+    cut = int(0.25 * len(values))
+    assert np.isclose(depth, values[cut:len(values) - cut].mean())
+
+
+def test_center_percentile_ignores_the_border():
+    depthImage = np.full((100, 100), 900, dtype=np.uint16)
+    depthImage[40:60, 40:60] = 400
+    depth = DepthEstimator(DepthEstimators.CENTER_PERCENTILE, centerFraction=0.5, percentile=90).estimate(depthImage, [[30, 30, 70, 70]])
+    assert depth[0] == 400
+
+
+def test_invalid_and_growing_boxes():
+    depthImage = np.zeros((100, 100), dtype=np.uint16)
+    depthImage[:, 50:] = 500
+    estimator = DepthEstimator()
+
+    depths = estimator.estimate(depthImage, [[0, 0, 40, 40], [60, 60, 90, 90], [10, 10, 10, 20]])
+    assert np.isnan(depths[0]) and depths[1] == 500 and np.isnan(depths[2])
+
+    bounds = np.tile([60, 60, 90, 90], (200, 1)) # More boxes than the initial capacity
+    out = np.empty((200, 5))
+    estimator.estimate(depthImage, bounds, out=out[:, 2])
+    assert (out[:, 2] == 500).all()
+    assert len(estimator.estimate(depthImage, np.empty((0, 4)))) == 0
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+cv = pytest.importorskip("cv2")
+from module.detectors import Detector, DetectorConfig, benchmarkDetector
+from module.detectorbenchmark import getDetectionAgreement, selectConfiguration
+
+
+def getDetections(cls, centers):
+    rect = np.zeros((len(cls), 4))
+    rect[:, 2:4] = 20
+    rect[:, 0:2] = np.array(centers, dtype=float).reshape(-1, 2) - 10
+    return np.array(cls, dtype=np.int64), np.ones(len(cls)), rect
+
+
+def test_detection_agreement():
+    reference = getDetections([0, 1, 2], [[100, 100], [200, 100], [150, 150]])
+    assert getDetectionAgreement(reference, reference) == 1.
+    assert getDetectionAgreement(reference, getDetections([0, 1, 2], [[105, 100], [200, 95], [150, 150]])) == 1.
+    # A missed box and a box of the wrong class
+    assert np.isclose(getDetectionAgreement(reference, getDetections([0, 0], [[100, 100], [200, 100]])), 2 * 1 / 5)
+    assert getDetectionAgreement(getDetections([], []), getDetections([], [])) == 1.
+    assert getDetectionAgreement(reference, getDetections([], [])) == 0.
+
+
+def test_select_and_save_configuration(tmp_path):
+    results = [{"config": {"tiles": True}, "latency_ms": 30., "agreement": 1.},
+               {"config": {"tiles": False}, "latency_ms": 10., "agreement": 0.97},
+               {"config": {"tiles": False}, "latency_ms": 5., "agreement": 0.6}]
+    assert selectConfiguration(results, minAgreement=0.95) is results[1]
+    assert selectConfiguration(results, minAgreement=1.1) is results[0]
+
+    path = str(tmp_path / "detector_config.json")
+    assert DetectorConfig.load(path) == DetectorConfig()
+    config = DetectorConfig(detector="opencv", threshold=0.25, tiles=False)
+    config.save(path, results=results)
+    assert DetectorConfig.load(path) == config
+
+
+def test_benchmark_detector():
+    class CountingDetector(Detector):
+        def __init__(self):
+            self.batches = []
+
+        def predict(self, images):
+            self.batches.append(len(images))
+            return [getDetections([0], [[image.mean(), 0]]) for image in images]
+
+    images = [np.full((4, 4, 3), k, dtype=np.uint8) for k in range(5)]
+    detector = CountingDetector()
+    latency, detections = benchmarkDetector(detector, images, batchSize=2, repeats=2)
+    assert latency >= 0
+    assert detector.batches == [2] + [2, 2, 1] * 2 # Warm up, then the repeats
+    assert [rect[0, 0] + 10 for _, _, rect in detections] == [0, 1, 2, 3, 4]
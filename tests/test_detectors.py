@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+cv = pytest.importorskip("cv2")
+from module.detectors import Detector, RegionOfInterest, decodeYoloOutputs
+
+
+def test_decode_yolo_outputs():
+    nbClasses = 4
+    # Two YOLO layers, a batch of two images
+    first = np.zeros((2, 3, 5 + nbClasses), dtype=np.float32)
+    first[0, 1] = [0.5, 0.5, 0.2, 0.1, 0.9, 0.0, 0.8, 0.1, 0.0]
+    first[1, 2] = [0.25, 0.75, 0.1, 0.1, 0.9, 0.2, 0.0, 0.0, 0.3] # below the threshold
+    second = np.zeros((2, 2, 5 + nbClasses), dtype=np.float32)
+    second[1, 0] = [0.1, 0.2, 0.2, 0.2, 0.9, 0.0, 0.0, 0.0, 0.7]
+
+    detections = decodeYoloOutputs([first.reshape(-1, 5 + nbClasses), second], 2, nbClasses, threshold=0.35)
+    cls, conf, boxes = detections[0]
+    assert cls.tolist() == [1] and np.isclose(conf[0], 0.8)
+    assert np.allclose(boxes[0], [0.4, 0.45, 0.2, 0.1])
+    cls, conf, boxes = detections[1]
+    assert cls.tolist() == [3] and np.allclose(boxes[0], [0., 0.1, 0.2, 0.2])
+
+
+def test_incomplete_detector():
+    class IncompleteDetector(Detector):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        IncompleteDetector()
+
+
+def test_region_of_interest_mask():
+    """
+    Test that the detectors see the region at its place and scale, black elsewhere, as the masked baseline frame
+    """
+    roi = RegionOfInterest()
+    image = np.random.default_rng(0).integers(1, 256, size=(480, 640, 3)).astype(np.uint8)
+    baseline = np.zeros((480, 640), dtype=np.uint8)
+    cv.rectangle(baseline, (roi.x1, roi.y1), (roi.x2, roi.y2), 255, -1)
+    baseline = cv.bitwise_and(image, image, mask=baseline)
+
+    masked = roi.mask(image)
+    assert masked.shape == image.shape and (masked == baseline).all()
+    assert (masked != 0).any(axis=2).sum() == roi.width * roi.height
+
+    # Only the region is written into a previous output
+    assert roi.mask(255 - image, out=masked) is masked
+    assert (masked[roi.slices] == 255 - image[roi.slices]).all()
+    assert (masked[:roi.y1] == 0).all() and (masked[:, roi.x2 + 1:] == 0).all()
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2") # module.detectors
+
+from module.board import Board
+from module.detectors import RegionOfInterest
+from module.homography import Homography, SlotRaster, getBoardPlaneHeight
+from module.projection import CameraProjection
+from module.scene import SceneSnapshot
+
+
+def getProjection():
+    # Camera above the table, looking down with a tilt, the simulation y axis is the height
+    angle = np.radians(60)
+    transform = np.eye(4)
+    transform[:3, :3] = [[1, 0, 0],
+                         [0, np.cos(angle), -np.sin(angle)],
+                         [0, np.sin(angle), np.cos(angle)]]
+    transform[:3, 3] = [0., 300., -250.]
+    return CameraProjection.fromIntrinsics(610., 605., 215., 240., transform)
+
+
+def test_homography_from_projection():
+    projection = getProjection()
+    pixels = np.array([[100., 120.], [215., 240.], [380., 400.]])
+    homography = Homography.fromProjection(projection, planeHeight=-10.)
+
+    # Depth of each pixel on the plane y = -10
+    A = projection.matrix
+    depths = (-10. - A[1, 3]) / (pixels @ A[1, :2] + A[1, 2])
+    positions = projection.project(np.column_stack([pixels, depths, np.zeros((3, 2))]))
+    assert np.allclose(positions[:, 1], -10.)
+    assert np.allclose(homography.apply(pixels), positions[:, 0::2])
+
+    assert np.allclose(Homography.fromDict(homography.toDict()).matrix, homography.matrix)
+
+
+def test_slot_raster():
+    board = Board()
+    homography = Homography.fromProjection(getProjection(), planeHeight=-10.)
+    raster = SlotRaster.build(homography, board, RegionOfInterest())
+
+    roi = RegionOfInterest()
+    assert raster.slots.shape == (roi.height, roi.width)
+    generator = np.random.default_rng(0)
+    pixels = generator.uniform([roi.x1, roi.y1], [roi.x2 + 1, roi.y2 + 1], size=(500, 2))
+    pixels = np.vstack([pixels, [[0., 0.], [639., 479.]]]) # outside of the ROI
+    cells, storageIndices = raster.lookup(pixels)
+
+    x, z = homography.apply(np.trunc(pixels)).T
+    i, j = board.positionsToCellIndices(x, z)
+    expectedStorage = board.positionsToStorageIndices(x, z)
+    inside = np.arange(len(pixels)) < 500
+    assert (cells[inside, 0] == i[inside]).all() and (cells[inside, 1] == j[inside]).all()
+    assert (storageIndices[inside] == expectedStorage[inside]).all()
+    assert (cells[~inside] == -1).all() and (storageIndices[~inside] == -1).all()
+    assert (cells[:, 0] >= 0).any() and (storageIndices >= 0).any()
+
+
+def test_scene_with_raster():
+    board = Board()
+    homography = Homography.fromProjection(getProjection(), planeHeight=-10.)
+    raster = SlotRaster.build(homography, board, RegionOfInterest())
+
+    pixels = np.argwhere(raster.slots >= 0)[::97][:, ::-1] + [RegionOfInterest().x1, RegionOfInterest().y1]
+    positions = homography.apply(pixels)
+    classes = np.zeros(len(pixels), dtype=np.int64)
+    conf = np.ones(len(pixels))
+    scene = SceneSnapshot.build(0, classes, conf, positions, board, pixels=pixels.astype(float), raster=raster)
+    expected = SceneSnapshot.build(0, classes, conf, positions, board)
+    assert (scene.cells == expected.cells).all()
+    assert (scene.storageIndices == expected.storageIndices).all()
+    assert (scene.inPlayZone == expected.inPlayZone).all()
+
+
+def test_board_plane_height():
+    board = Board()
+    slots = np.array([board.storageIndexToPosition(k) for k in range(5)])
+    positions = np.column_stack([slots[:, 0], [-10., -12., -9., -11., -10.], slots[:, 1]])
+    assert getBoardPlaneHeight(positions, board) == -10.
+
+    # Not enough pawns on the storage slots
+    inPlayZone = np.array([[0., -10., 0.]] * 4)
+    assert getBoardPlaneHeight(np.vstack([positions[:3], inPlayZone]), board) is None
+    # A pawn held above the table
+    held = positions.copy()
+    held[2, 1] = 40.
+    assert getBoardPlaneHeight(held, board) is None
@@ -0,0 +1,28 @@
+from module.motiongate import MotionGate
+import numpy as np
+
+
+def test_motion_gate():
+    gate = MotionGate(factor=4, refreshPeriod=2.)
+    generator = np.random.default_rng(0)
+    image = generator.integers(0, 256, size=(420, 370, 3)).astype(np.uint8)
+
+    assert not gate.isUnchanged(image, now=0.)  # First image
+    assert gate.isUnchanged(image, now=0.5)
+
+    # Sensor noise is ignored
+    noisy = np.clip(image.astype(int) + generator.integers(-3, 4, size=image.shape), 0, 255).astype(np.uint8)
+    assert gate.isUnchanged(noisy, now=1.)
+
+    # A cube moved
+    moved = image.copy()
+    moved[100:140, 100:140] = 255 - moved[100:140, 100:140]
+    assert not gate.isUnchanged(moved, now=1.5)
+    assert gate.isUnchanged(moved, now=1.6)
+
+    # Forced prediction after the refresh period
+    assert not gate.isUnchanged(moved, now=3.6)
+    assert gate.nbPredictions == 3 and gate.nbSkipped == 3
+
+    gate.reset()
+    assert not gate.isUnchanged(moved, now=3.7)
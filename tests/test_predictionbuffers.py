@@ -0,0 +1,77 @@
+from module.predictionbuffers import PredictionBuffers
+import numpy as np
+
+
+def getBaselinePredictions(rect, imageShape):
+    """
+    Centers and bounds computed box by box, as DHResults.update did before the buffers
+    """
+    xydwh, bounds = [], []
+    for x, y, w, h in rect:
+        x = x + w / 2
+        y = y + h / 2
+        xydwh.append([x, y, w, h])
+        bounds.append([max(0, int(x - w / 2)), max(0, int(y - h / 2)),
+                       min(imageShape[1], int(x + w / 2)), min(imageShape[0], int(y + h / 2))])
+    return np.array(xydwh).reshape(-1, 4), np.array(bounds).reshape(-1, 4)
+
+
+def getRandomPredictions(generator, n):
+    cls = generator.integers(0, 4, size=n)
+    conf = generator.random(n)
+    rect = np.column_stack([generator.uniform(-20, 640, size=n), generator.uniform(-20, 480, size=n),
+                            generator.uniform(1, 80, size=(n, 2))])
+    return cls, conf, rect
+
+
+def test_prediction_buffers_match_baseline():
+    generator = np.random.default_rng(0)
+    cls, conf, rect = getRandomPredictions(generator, 20)
+    predictions = PredictionBuffers()
+    predictions.fill(cls, conf, rect, (480, 640))
+
+    xydwh, bounds = getBaselinePredictions(rect, (480, 640))
+    n = predictions.count
+    assert n == 20
+    assert (predictions.cls[:n] == cls).all() and (predictions.conf[:n] == conf).all()
+    assert np.allclose(predictions.xydwh[:n, [0, 1, 3, 4]], xydwh)
+    assert (predictions.bounds[:n] == bounds).all()
+
+
+def test_prediction_buffers_grow():
+    generator = np.random.default_rng(1)
+    predictions = PredictionBuffers(capacity=4)
+    buffer = predictions.xydwh
+    predictions.fill(*getRandomPredictions(generator, 3), (480, 640))
+    assert predictions.xydwh is buffer
+
+    cls, conf, rect = getRandomPredictions(generator, 10)
+    predictions.fill(cls, conf, rect, (480, 640))
+    assert predictions.count == 10 and predictions.capacity >= 10
+    assert (predictions.cls[:10] == cls).all()
+    assert (predictions.bounds[:10] == getBaselinePredictions(rect, (480, 640))[1]).all()
+
+
+def test_prediction_buffers_empty():
+    predictions = PredictionBuffers()
+    predictions.fill(np.empty(0), np.empty(0), np.empty((0, 4)), (480, 640))
+    assert predictions.count == 0
+    assert predictions.xydwh[:predictions.count].shape == (0, 5)
+    assert predictions.bounds[:predictions.count].shape == (0, 4)
+
+
+def test_prediction_buffers_offset():
+    """
+    Test that the boxes detected in a crop of the image map back to the coordinates of the full image
+    """
+    generator = np.random.default_rng(2)
+    cls, conf, rect = getRandomPredictions(generator, 10)
+    full = PredictionBuffers()
+    full.fill(cls, conf, rect, (480, 640))
+
+    x1, y1 = 30, 30
+    crop = PredictionBuffers()
+    crop.fill(cls, conf, rect - [x1, y1, 0, 0], (480, 640), offset=(x1, y1))
+    assert np.allclose(crop.rect[:10], rect)
+    assert np.allclose(crop.xydwh[:10, [0, 1, 3, 4]], full.xydwh[:10, [0, 1, 3, 4]])
+    assert (crop.bounds[:10] == full.bounds[:10]).all()
@@ -0,0 +1,38 @@
+from module.projection import CameraProjection
+import numpy as np
+
+
+def getTransform():
+    # Rotation of 30 degrees around y and a translation, in mm
+    angle = np.radians(30)
+    transform = np.eye(4)
+    transform[:3, :3] = [[np.cos(angle), 0, np.sin(angle)],
+                         [0, 1, 0],
+                         [-np.sin(angle), 0, np.cos(angle)]]
+    transform[:3, 3] = [10., -200., 35.]
+    return transform
+
+
+def imageToSimulation(x, y, depth, fx=610., fy=605., cx=322., cy=241.):
+    point = np.array([(x - cx) / fx * depth, (y - cy) / fy * depth, depth, 1.])
+    return (getTransform() @ point)[:3].tolist()
+
+
+def test_projection_from_intrinsics():
+    projection = CameraProjection.fromIntrinsics(610., 605., 322., 241., getTransform())
+    xydwh = np.array([[100.7, 200.2, 450., 20, 20],
+                      [320., 240., 500., 20, 20],
+                      [600., 30., 0., 20, 20]]) # invalid depth
+    positions = projection.project(xydwh)
+    for (x, y, d, _, _), position in zip(xydwh[:2], positions[:2]):
+        assert np.allclose(position, imageToSimulation(int(x), int(y), d))
+    assert np.isnan(positions[2]).all()
+    assert projection.projectToPlane(xydwh).shape == (3, 2)
+
+
+def test_fitted_projection():
+    projection = CameraProjection.fit(imageToSimulation)
+    reference = CameraProjection.fromIntrinsics(610., 605., 322., 241., getTransform())
+    assert np.allclose(projection.matrix, reference.matrix)
+    assert np.allclose(CameraProjection.fromDict(projection.toDict()).matrix, projection.matrix)
+    assert projection.project(np.empty((0, 5))).shape == (0, 3)
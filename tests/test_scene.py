@@ -0,0 +1,64 @@
+from module.board import Board, CellState
+from module.scene import SceneSnapshot
+import numpy as np
+import pytest
+
+D, C, E = CellState.DOG.value, CellState.CAT.value, CellState.EMPTY.value
+HAND = 3
+
+
+def test_scene_snapshot():
+    board = Board()
+    storagePosition = board.storageIndexToPosition(5)
+    classes = np.array([D, C, E, D, C, HAND, D])
+    conf = np.array([0.9, 0.9, 0.9, 0.5, 0.9, 0.9, 0.9])
+    positions = np.array([board.cellIndicesToPosition(0, 0),
+                          board.cellIndicesToPosition(1, 2),
+                          board.cellIndicesToPosition(2, 2),
+                          storagePosition,
+                          storagePosition,
+                          [0., 0.],
+                          [np.nan, np.nan]])
+    scene = SceneSnapshot.build(1, classes, conf, positions, board)
+
+    assert scene.isValid.tolist() == [True] * 6 + [False]
+    assert scene.isPawn.tolist() == [True, True, False, True, True, False, True]
+    assert scene.isConfident.tolist() == [True, True, True, False, True, True, True]
+    assert scene.inPlayZone.tolist() == [True, True, True, False, False, True, False]
+    assert scene.nearPlayZone.tolist() == [True, True, True, False, False, True, True]
+    assert scene.cells[1].tolist() == [1, 2] and scene.cells[3].tolist() == [-1, -1]
+    assert scene.storageIndices.tolist() == [-1, -1, -1, 5, 5, -1, -1]
+
+    expected = np.full((3, 3), E)
+    expected[0, 0], expected[1, 2] = D, C
+    assert (scene.getPlayZoneState(3) == expected).all()
+    out = np.full((3, 3), C)
+    assert scene.getPlayZoneState(3, out=out) is out and (out == expected).all()
+    assert scene.getPlayZonePawns().tolist() == [0, 1]
+    assert scene.getStoragePawns().tolist() == [3, 4]
+
+    # The snapshot is immutable
+    with pytest.raises(ValueError):
+        scene.cls[0] = C
+    classes[0] = C
+    assert scene.cls[0] == D
+
+
+def test_scene_approximate_positions():
+    """
+    Test that the detections without a valid position are only near the play zone if their approximate position is
+    """
+    board = Board()
+    positions = np.array([board.cellIndicesToPosition(0, 0), [np.nan, np.nan], [np.nan, np.nan], [np.nan, np.nan]])
+    approximatePositions = np.array([[500., 500.], board.storageIndexToPosition(0), [50., 0.], [np.nan, np.nan]])
+    scene = SceneSnapshot.build(1, [D, C, C, D], np.full(4, 0.9), positions, board,
+                                approximatePositions=approximatePositions)
+    assert scene.isValid.tolist() == [True, False, False, False]
+    assert scene.nearPlayZone.tolist() == [True, False, True, True]
+    assert (scene.getPlayZoneState(3)[1:] == E).all()
+
+
+def test_empty_scene():
+    scene = SceneSnapshot.build(0, [], [], np.empty((0, 2)), Board())
+    assert len(scene) == 0
+    assert (scene.getPlayZoneState(3) == E).all()
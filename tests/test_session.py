@@ -0,0 +1,103 @@
+from module.capturethread import CaptureThread
+from module.projection import CameraProjection
+from module.session import SessionRecorder, SessionReader, ReplayCamera
+import numpy as np
+import time
+
+
+def recordSession(directory, nbFrames=7, chunkSize=3):
+    projection = CameraProjection.fromIntrinsics(600., 600., 4., 3.)
+    recorder = SessionRecorder(directory, chunkSize=chunkSize, metadata={"camera": "test", "projection": projection.toDict()})
+    for n in range(nbFrames):
+        color = np.full((6, 8, 3), n, dtype=np.uint8)
+        depth = np.full((6, 8), 100 + n, dtype=np.uint16)
+        index = recorder.recordFrame(0.1 * n, color, depth, markers=[[n, 0, 0], [0, 0, n]])
+        xydwh = np.array([[n, n, 100 + n, 10, 10]] * (n % 3), dtype=float)
+        recorder.recordDetections(index, np.arange(n % 3), np.full(n % 3, 0.5), xydwh)
+    recorder.close()
+
+
+def test_record_and_read(tmp_path):
+    recordSession(str(tmp_path))
+    session = SessionReader(str(tmp_path))
+    assert len(session) == 7 and session.metadata["camera"] == "test"
+
+    for n in range(7):
+        timestamp, color, depth, markers = session.getFrame(n)
+        assert timestamp == 0.1 * n
+        assert (color == n).all() and color.shape == (6, 8, 3)
+        assert (depth == 100 + n).all() and depth.dtype == np.uint16
+        assert markers.tolist() == [[n, 0, 0], [0, 0, n]]
+
+        cls, conf, xydwh = session.getDetections(n)
+        assert cls.tolist() == list(range(n % 3))
+        assert (xydwh[:, 2] == 100 + n).all()
+
+
+def test_replay_camera(tmp_path):
+    recordSession(str(tmp_path))
+    camera = ReplayCamera(str(tmp_path))
+    camera.open()
+    for n in range(9):
+        camera.update()
+    # The last frame is kept at the end of the session
+    assert (camera.frame == 6).all() and camera.isFinished()
+    assert np.allclose(camera.image_to_simulation(4, 3, 500.), [0., 0., 500.])
+
+    # The replay camera stands in for the camera of the capture thread
+    capture = CaptureThread(ReplayCamera(str(tmp_path), loop=True))
+    capture.start()
+    try:
+        frame = capture.waitForFrame()
+        assert frame.depth.shape == (6, 8) and len(frame.markers) == 2
+    finally:
+        capture.stop()
+
+
+def replaySession(directory):
+    """
+    Pull the frames of the session through the capture thread, as DHResults.getFrame does
+    """
+    capture = CaptureThread(ReplayCamera(directory), lockstep=True)
+    reader = SessionReader(directory)
+    capture.start()
+    frames, detections = [], []
+    index = -1
+    try:
+        while True:
+            capture.requestFrame()
+            frame = capture.waitForFrame(index)
+            if frame.index == index:
+                assert capture.finished.is_set()
+                break
+            index = frame.index
+            frames.append(int(frame.color[0, 0, 0]))
+            detections.append(reader.getDetections(frames[-1])[0].tolist())
+        nbFrames = capture.nbFrames
+        time.sleep(0.05)
+        assert capture.nbFrames == nbFrames # Nothing is published after the end of the session
+    finally:
+        capture.stop()
+    return frames, detections
+
+
+def test_deterministic_replay(tmp_path):
+    recordSession(str(tmp_path), nbFrames=40, chunkSize=16)
+    first = replaySession(str(tmp_path))
+    second = replaySession(str(tmp_path))
+    assert first == second
+    assert first[0] == list(range(40))
+
+
+def test_replay_finishes(tmp_path):
+    recordSession(str(tmp_path))
+    capture = CaptureThread(ReplayCamera(str(tmp_path), lockstep=False))
+    capture.start()
+    try:
+        assert capture.finished.wait(timeout=1.)
+        capture.join(timeout=1.)
+        assert not capture.is_alive()
+        # Only the new frames of the camera are published
+        assert 1 <= capture.nbFrames <= 7 and (capture.getLatestFrame().color == 6).all()
+    finally:
+        capture.stop()
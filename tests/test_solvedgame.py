@@ -0,0 +1,61 @@
+from module.board import Board, CellState, Results
+from module.solvedgame import SolvedGameTable, GameSolver, OCCUPIED, getMovesOutcomes
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    return SolvedGameTable(str(tmp_path_factory.mktemp("solvedgame") / "solvedgame.npz"))
+
+
+def test_empty_board_is_a_draw(table):
+    for mover in [CellState.DOG.value, CellState.CAT.value]:
+        outcomes = table.getMovesOutcomes(Board().state, mover)
+        assert (outcomes == 0).all()
+
+
+def test_outcomes():
+    # D D .
+    # C C .
+    # . . .
+    D = CellState.DOG.value
+    scores = GameSolver().getMovesScores(0b000000011, 0b000011000, D)
+    outcomes = getMovesOutcomes(scores).reshape(3, 3)
+    assert outcomes[0][2] == 1            # Dog wins now
+    assert outcomes[2][0] == -1           # Cat wins on the next move
+    assert outcomes[0][0] == OCCUPIED
+    assert np.argmax(scores) == 2
+
+
+def test_unreachable_position_is_solved(table):
+    D, C, E = CellState.DOG.value, CellState.CAT.value, CellState.EMPTY.value
+    state = np.array([[D, D, E],
+                      [D, E, E],
+                      [E, E, E]]) # Dog played three times
+    outcomes = table.getMovesOutcomes(state, C)
+    assert (outcomes[outcomes != OCCUPIED] == -1).all()
+
+
+def test_optimal_never_loses(table):
+    """
+    Play the best move of the table against every possible opponent move
+    """
+    def explore(state, mover, emio):
+        winner = Board(state).getWinner()
+        if winner != Results.NONE.value:
+            assert winner != 1 - emio
+            return
+
+        scores = table.getMovesScores(state, mover)
+        moves = list(zip(*np.nonzero(scores != OCCUPIED)))
+        if mover == emio:
+            moves = [move for move in moves if scores[move] == scores.max()]
+        for i, j in moves:
+            state[i][j] = mover
+            explore(state, 1 - mover, emio)
+            state[i][j] = CellState.EMPTY.value
+
+    for emio in [CellState.DOG.value, CellState.CAT.value]:
+        for first in [CellState.DOG.value, CellState.CAT.value]:
+            explore(Board().state, first, emio)
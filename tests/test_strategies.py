@@ -0,0 +1,136 @@
+from module.board import CellState
+from module.strategies import STRATEGIES, Strategies, easyStrategy
+from module.tournament import runTournament, getPercentile, LATENCY_BINS
+import numpy as np
+import pytest
+
+D, C, E = CellState.DOG.value, CellState.CAT.value, CellState.EMPTY.value
+
+
+@pytest.mark.parametrize("strategy", list(STRATEGIES.values()))
+def test_strategies_play_empty_cells(strategy):
+    state = np.array([[D, C, E],
+                      [C, D, E],
+                      [E, E, E]])
+    for _ in range(20):
+        i, j = strategy(state, C, D)
+        assert state[i][j] == E
+
+    assert strategy(np.array([[D, C, D],
+                              [D, C, C],
+                              [C, D, D]]), C, D) is None
+
+
+def test_easy_wins_then_blocks():
+    state = np.array([[D, D, E],
+                      [C, C, E],
+                      [E, E, E]])
+    assert easyStrategy(state, C, D) == (1, 2) # Win
+    state[1][1] = E
+    assert easyStrategy(state, C, D) == (0, 2) # Block
+
+
+def test_tournament():
+    results, latencies, _ = runTournament(50, nbProcesses=1, chunkSize=20)
+    impossible = Strategies.IMPOSSIBLE.value
+    for (first, second), result in results.items():
+        assert result["wins"] + result["losses"] + result["draws"] == 50
+        if first == impossible:
+            assert result["losses"] == 0
+        if second == impossible:
+            assert result["wins"] == 0
+    assert latencies[impossible].sum() > 0
+    assert LATENCY_BINS[0] < getPercentile(latencies[impossible], 50) < LATENCY_BINS[-1]
+
+
+def test_strategies_import_without_robot_dependencies():
+    """
+    The strategies must be importable without Sofa, OpenCV or DarkHelp.
+    """
+    import os
+    import subprocess
+    import sys
+    code = ("import sys, module.strategies, module.tournament; "
+            "assert not {'Sofa', 'cv2', 'DarkHelp', 'emioapi'} & set(sys.modules)")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+
+
+def test_search():
+    from module.strategies import searchStrategy
+
+    state = np.full((4, 4), E)
+    state[0, :3] = C
+    state[1, :2] = D
+    state[2, 0] = D
+    assert searchStrategy(state, C, D, timeBudget=0.5) == (0, 3) # Win
+    assert searchStrategy(state, D, C, timeBudget=0.5) == (0, 3) # Block
+
+    # On the 3x3 board the search plays as well as the solved game
+    results, _, _ = runTournament(20, nbProcesses=1, chunkSize=20)
+    assert results[(Strategies.IMPOSSIBLE.value, Strategies.SEARCH.value)]["draws"] == 20
+
+
+def test_registry():
+    import time
+    from module.strategyregistry import StrategyRegistry, createDefaultRegistry
+
+    def slowStrategy(state, myColor, theirColor):
+        time.sleep(0.2)
+        return (0, 0)
+
+    registry = StrategyRegistry()
+    registry.register("x", "slow", slowStrategy, budget=0.01, fallback=lambda state, myColor, theirColor: (2, 2))
+    assert registry.get("unknown") is None
+
+    strategy = registry.get("x")
+    state = np.full((3, 3), E)
+    assert strategy(state, D, C) == (2, 2)
+    assert strategy(state, D, C) == (2, 2) # Still running, the fallback is played right away
+    time.sleep(0.3)
+
+    # The full duration of the slow decision is recorded, the fallback moves separately
+    stats = registry.getStats()["x"]
+    assert stats["count"] == 1
+    assert stats["max_ms"] >= 200
+    assert stats["overruns"] == 2
+    assert stats["fallback_max_ms"] < 100
+    assert sum(stats["fallback_histogram"]) == 2
+
+    registry = createDefaultRegistry()
+    assert set(registry.keys()) == {s.value for s in Strategies}
+    strategy = registry.get(Strategies.IMPOSSIBLE.value)
+    assert strategy(state, D, C) is not None
+    assert registry.getStats()[Strategies.IMPOSSIBLE.value]["count"] == 1
+
+
+@pytest.mark.parametrize("tableLoaded", [True, False])
+def test_optimal_fallback_never_loses(monkeypatch, tableLoaded):
+    """
+    Test that the fallback of the optimal strategies never loses, against every sequence of opponent moves,
+    with the solved game table and with the search used before the table is loaded.
+    """
+    from module import strategies
+    from module.board import Board, Results
+    from module.strategies import optimalFallbackStrategy
+
+    if tableLoaded:
+        strategies.getSolvedGameTable()
+    else:
+        monkeypatch.setattr(strategies, "solvedGameTable", None)
+
+    def explore(board, mover, fallbackColor):
+        winner = board.getWinner()
+        if winner != Results.NONE.value:
+            assert winner != 1 - fallbackColor
+            return
+        if mover == fallbackColor:
+            moves = [optimalFallbackStrategy(board.state.copy(), mover, 1 - mover)]
+        else:
+            moves = [(i, j) for i in range(3) for j in range(3) if board.getCell(i, j) == E]
+        for i, j in moves:
+            board.push(i, j, mover)
+            explore(board, 1 - mover, fallbackColor)
+            board.pop()
+
+    for first in (D, C):
+        explore(Board(), first, D)
@@ -0,0 +1,56 @@
+from module.board import CellState
+from module.strategycache import StrategyCache, getCanonicalForm, SYMMETRIES
+import numpy as np
+
+D, C, E = CellState.DOG.value, CellState.CAT.value, CellState.EMPTY.value
+
+
+def evaluateCells(state, myColor, theirColor):
+    """
+    Scores depending on the position of the cell, to check the remapping
+    """
+    scores = np.arange(9).reshape(3, 3) * 10
+    scores[np.asarray(state) != E] = -1
+    return scores
+
+
+def test_canonical_form_is_invariant():
+    state = np.array([[D, E, E],
+                      [E, C, E],
+                      [E, E, D]])
+    _, code, _ = getCanonicalForm(state, C, D)
+    for symmetry in SYMMETRIES:
+        transformed = state.flatten()[symmetry].reshape(3, 3)
+        assert getCanonicalForm(transformed, C, D)[1] == code
+
+    # Swapping the colors of the board and of the players gives the same position
+    swapped = np.where(state == D, C, np.where(state == C, D, E))
+    assert getCanonicalForm(swapped, D, C)[1] == code
+
+
+def test_scores_are_remapped():
+    cache = StrategyCache(evaluateCells)
+    state = np.array([[E, E, D],
+                      [E, E, E],
+                      [C, E, E]])
+    for symmetry in SYMMETRIES:
+        transformed = state.flatten()[symmetry].reshape(3, 3)
+        scores = cache.getMovesScores(transformed, D, C)
+        assert (scores[transformed != E] == -1).all()
+        assert sorted(scores[transformed == E]) == sorted(cache.getMovesScores(state, D, C)[state == E])
+
+    assert cache.misses == 1
+    assert cache.hits == 2 * len(SYMMETRIES) - 1
+
+
+def test_eviction():
+    cache = StrategyCache(evaluateCells, maxSize=2)
+    states = [np.full((3, 3), E) for _ in range(3)]
+    states[1][1][1] = D
+    states[2][0][0] = D
+    for state in states:
+        cache.getMovesScores(state, D, C)
+    assert len(cache.entries) == 2
+
+    cache.getMovesScores(states[0], D, C)
+    assert cache.misses == 4
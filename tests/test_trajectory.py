@@ -0,0 +1,27 @@
+from module.trajectory import Trajectory, Waypoint
+import pytest
+
+
+def test_trajectory():
+    waypoints = [Waypoint(position=(0., -230., 0.), opening=40.),
+                 Waypoint(position=(0., -290., 0.), settle=True, minSteps=70, withPI=True),
+                 Waypoint(opening=15., settle=True)]
+    trajectory = Trajectory(waypoints, blendRadius=10., openingTolerance=3.)
+    assert len(trajectory) == 3 and trajectory.current is waypoints[0]
+
+    # Transit waypoints are reached within the blend radius, once the gripper is almost open
+    assert not trajectory.isBlendReached([0., -215., 0.])
+    assert not trajectory.isBlendReached([5., -225., 0.], openingGap=10.)
+    assert trajectory.isBlendReached([5., -225., 0.], openingGap=-2.)
+
+    assert trajectory.advance() is waypoints[1]
+    assert trajectory.advance() is waypoints[2]
+    assert trajectory.isLast()
+    assert trajectory.isBlendReached([100., 0., 0.], openingGap=1.)
+    assert trajectory.advance() is None
+    assert trajectory.current is waypoints[2]
+
+
+def test_empty_trajectory():
+    with pytest.raises(ValueError):
+        Trajectory([])